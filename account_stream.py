@@ -0,0 +1,288 @@
+import itertools
+import json
+import logging
+import queue
+import threading
+import time
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+POSITION_DTYPE = np.dtype([("ticket", "i8"), ("volume", "f8"), ("sl", "f8"), ("tp", "f8")])
+ORDER_DTYPE = np.dtype([("ticket", "i8"), ("volume", "f8"), ("sl", "f8"), ("tp", "f8"), ("price", "f8")])
+POSITION_TYPE_BUY = 0
+
+# Event types
+OPENED = "opened"
+PARTIALLY_CLOSED = "partially_closed"
+MODIFIED = "modified"
+CLOSED = "closed"
+PLACED = "order_placed"
+ORDER_MODIFIED = "order_modified"
+REMOVED = "order_removed"  # filled, cancelled or expired
+
+
+def position_record(position):
+    return {
+        "ticket": position.ticket,
+        "symbol": position.symbol,
+        "type": "buy" if position.type == POSITION_TYPE_BUY else "sell",
+        "volume": position.volume,
+        "price_open": position.price_open,
+        "sl": position.sl,
+        "tp": position.tp,
+        "magic": position.magic,
+        "comment": position.comment,
+    }
+
+
+def order_record(order):
+    return {
+        "ticket": order.ticket,
+        "symbol": order.symbol,
+        "type": order.type,
+        "volume": order.volume_current,
+        "price_open": order.price_open,
+        "sl": order.sl,
+        "tp": order.tp,
+        "magic": order.magic,
+        "comment": order.comment,
+    }
+
+
+def to_array(items, dtype, volume="volume", price=None):
+    """Pack the compared fields of positions or orders into a structured array sorted by ticket."""
+    fields = ["ticket", volume, "sl", "tp"] + ([price] if price else [])
+    array = np.array([tuple(getattr(item, name) for name in fields) for item in items], dtype=dtype)
+    return np.sort(array, order="ticket")
+
+
+def diff(old, new):
+    """
+    Compare two ticket-sorted snapshot arrays.
+
+    Returns (added, removed, old_common, new_common) as index arrays: added into new, removed
+    into old, and the aligned indices of the tickets present in both.
+    """
+    _, old_common, new_common = np.intersect1d(old["ticket"], new["ticket"], assume_unique=True,
+                                               return_indices=True)
+    added = np.flatnonzero(~np.isin(new["ticket"], old["ticket"], assume_unique=True))
+    removed = np.flatnonzero(~np.isin(old["ticket"], new["ticket"], assume_unique=True))
+    return added, removed, old_common, new_common
+
+
+class SnapshotDiffer:
+    """
+    Turns successive positions_get()/orders_get() snapshots into change events.
+
+    The compared fields of each snapshot are packed into a structured array sorted by ticket, so
+    a comparison is a handful of vectorised operations regardless of how many positions are open.
+    Full records are only built for the tickets that changed.
+    """
+
+    def __init__(self):
+        self.positions = np.zeros(0, dtype=POSITION_DTYPE)
+        self.orders = np.zeros(0, dtype=ORDER_DTYPE)
+        self.position_records = {}  # ticket -> record of every open position
+        self.order_records = {}  # ticket -> record of every pending order
+
+    def update(self, positions, orders):
+        """Take the next snapshot and return the list of events since the previous one."""
+        events = []
+        new = to_array(positions, POSITION_DTYPE)
+        by_ticket = {position.ticket: position for position in positions}
+        added, removed, old_common, new_common = diff(self.positions, new)
+        for index in removed:
+            ticket = int(self.positions["ticket"][index])
+            events.append({"event": CLOSED, **self.position_records.pop(ticket)})
+        for index in added:
+            ticket = int(new["ticket"][index])
+            record = self.position_records[ticket] = position_record(by_ticket[ticket])
+            events.append({"event": OPENED, **record})
+        old, now = self.positions[old_common], new[new_common]
+        reduced = now["volume"] < old["volume"]
+        moved = (now["sl"] != old["sl"]) | (now["tp"] != old["tp"])
+        for index in np.flatnonzero(reduced | moved):
+            ticket = int(now["ticket"][index])
+            record = self.position_records[ticket] = position_record(by_ticket[ticket])
+            if reduced[index]:
+                events.append({"event": PARTIALLY_CLOSED, **record, "previous_volume": float(old["volume"][index])})
+            if moved[index]:
+                events.append({"event": MODIFIED, **record, "previous_sl": float(old["sl"][index]),
+                               "previous_tp": float(old["tp"][index])})
+        self.positions = new
+
+        new = to_array(orders, ORDER_DTYPE, volume="volume_current", price="price_open")
+        by_ticket = {order.ticket: order for order in orders}
+        added, removed, old_common, new_common = diff(self.orders, new)
+        for index in removed:
+            events.append({"event": REMOVED, **self.order_records.pop(int(self.orders["ticket"][index]))})
+        for index in added:
+            ticket = int(new["ticket"][index])
+            record = self.order_records[ticket] = order_record(by_ticket[ticket])
+            events.append({"event": PLACED, **record})
+        old, now = self.orders[old_common], new[new_common]
+        changed = np.flatnonzero(
+            (now["volume"] != old["volume"]) | (now["sl"] != old["sl"]) | (now["tp"] != old["tp"])
+            | (now["price"] != old["price"])
+        )
+        for index in changed:
+            ticket = int(now["ticket"][index])
+            record = self.order_records[ticket] = order_record(by_ticket[ticket])
+            events.append({"event": ORDER_MODIFIED, **record})
+        self.orders = new
+        return events
+
+    def state(self):
+        return {"positions": list(self.position_records.values()), "orders": list(self.order_records.values())}
+
+
+class Subscription(queue.Queue):
+    """A subscriber's event queue, flagged once an event could not be delivered."""
+
+    def __init__(self, maxsize):
+        super().__init__(maxsize)
+        self.overflowed = False
+
+
+class AccountStream:
+    """
+    Polls positions and pending orders at a fixed rate and fans the changes out to subscribers.
+
+    Every subscriber gets a bounded queue; one that falls behind loses events (counted in
+    dropped) and is told to resynchronise, rather than slowing the poller or the other subscribers.
+    The terminal is polled once per interval however many subscribers there are, and not at all
+    while there are none; the first subscriber triggers a fresh snapshot.
+    """
+
+    def __init__(self, mt5, interval=0.5, max_subscribers=50, subscriber_queue=1000):
+        self.mt5 = mt5
+        self.interval = interval
+        self.max_subscribers = max_subscribers
+        self.subscriber_queue = subscriber_queue
+        self.differ = SnapshotDiffer()
+        self._subscribers = set()
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._active = threading.Event()  # set while there is at least one subscriber
+        self._thread = None
+        self.snapshots = 0
+        self.published = 0
+        self.dropped = 0
+        self.last_snapshot_seconds = 0.0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="account-stream", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stopping.set()
+        self._active.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        with self._lock:
+            for subscriber in self._subscribers:
+                try:
+                    subscriber.put_nowait(None)
+                except queue.Full:
+                    subscriber.overflowed = True
+
+    def _run(self):
+        while not self._stopping.is_set():
+            if not self._active.wait(self.interval) or self._stopping.is_set():
+                continue
+            try:
+                self.poll_once()
+            except Exception as e:
+                log.exception("Account stream poll failed: %s", e)
+            self._stopping.wait(self.interval)
+
+    def poll_once(self):
+        started = time.perf_counter()
+        positions = self.mt5.positions_get()
+        orders = self.mt5.orders_get()
+        if positions is None or orders is None:
+            log.error("Account snapshot failed, error code = %s", self.mt5.last_error())
+            return
+        with self._lock:
+            events = self.differ.update(positions, orders)
+            for event in events:
+                event["id"] = next(self._sequence)
+                self._publish(event)
+        self.snapshots += 1
+        self.last_snapshot_seconds = time.perf_counter() - started
+
+    def _publish(self, event):
+        for subscriber in self._subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                self.dropped += 1
+                subscriber.overflowed = True
+        self.published += 1
+
+    def subscribe(self):
+        """Return (queue, snapshot event) for a new subscriber, or None when the subscriber limit is reached."""
+        if not self._subscribers:
+            # Nothing was polled while nobody listened, so bring the state up to date first
+            self.poll_once()
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            subscriber = Subscription(self.subscriber_queue)
+            self._subscribers.add(subscriber)
+            self._active.set()
+            return subscriber, {"event": "snapshot", "id": next(self._sequence), **self.differ.state()}
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            if not self._subscribers:
+                self._active.clear()
+
+    def stream(self, keepalive=15.0):
+        """Server-Sent Events generator: the current state, then every change as it is detected."""
+        subscription = self.subscribe()
+        if subscription is None:
+            return None
+        subscriber, snapshot = subscription
+
+        def events():
+            try:
+                yield format_event(snapshot)
+                while True:
+                    try:
+                        event = subscriber.get(timeout=keepalive)
+                    except queue.Empty:
+                        yield ": keepalive\n\n"
+                        continue
+                    if event is None:
+                        return
+                    if subscriber.overflowed:
+                        # Events were lost; the client should rebuild its state from a fresh snapshot
+                        yield format_event({"event": "resync", "id": event["id"]})
+                        return
+                    yield format_event(event)
+            finally:
+                self.unsubscribe(subscriber)
+
+        return events()
+
+    def stats(self):
+        return {
+            "subscribers": len(self._subscribers),
+            "snapshots": self.snapshots,
+            "published": self.published,
+            "dropped": self.dropped,
+            "last_snapshot_seconds": self.last_snapshot_seconds,
+            "positions": len(self.differ.position_records),
+            "orders": len(self.differ.order_records),
+        }
+
+
+def format_event(event):
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event)}\n\n"
@@ -1,11 +1,28 @@
-import json
-import math
-import requests
-import re
-import threading
+import logging
 import time
-from flask import Flask, request
-import MetaTrader5 as mt5
+from flask import Flask, Response, g, request
+import MetaTrader5
+from account_stream import AccountStream
+from signal_parser import default_parser
+from bracket import BracketPlacer
+from coalescer import SignalCoalescer
+from connection import ConnectionSupervisor
+from dedupe import DedupCache
+from fanout import FanoutDispatcher
+from journal import ORDER, SIGNAL, Journal
+from jsonlog import LogWriter, correlation, correlation_id, new_id
+from lot_sizing import LotSizer
+from market_data import MarketData
+from metrics import Registry
+from mt5_executor import MT5Executor
+from notifier import TelegramNotifier
+from order_pipeline import OrderPipeline
+from position_monitor import PositionMonitor
+from triggers import BREAKEVEN
+from risk_book import RiskBook
+from server import WebServer
+from symbol_cache import SymbolCache
+from symbol_resolver import SymbolResolver
 from config import (
     TELEGRAM_TOKEN,
     CHANNEL_USERNAME,
@@ -13,94 +30,421 @@ from config import (
     MT5_SERVER,
     MT5_PASSWORD,
     MT5_PATH,
+    MT5_CONNECT_ATTEMPTS,
+    MT5_HEARTBEAT_INTERVAL,
+    MT5_HEARTBEAT_TIMEOUT,
+    MT5_RECONNECT_BACKOFF_INITIAL,
+    MT5_RECONNECT_BACKOFF_MAX,
     TRADE_RISK,
-    ORDER_TYPE  # Dynamically handle market or limit orders
+    LOT_SIZE_OVERRIDES,
+    SYMBOL_ALIASES,
+    ASSET_CLASSES,
+    ORDER_TYPE,  # Dynamically handle market or limit orders
+    BRACKET_ORDERS,
+    BRACKET_VOLUME_PERCENTS,
+    SYMBOL_CACHE_TTL,
+    TELEGRAM_API_URL,
+    TELEGRAM_QUEUE_SIZE,
+    TELEGRAM_COALESCE_WINDOW,
+    TELEGRAM_TIMEOUT,
+    ASYNC_WEBHOOK,
+    ORDER_QUEUE_SIZE,
+    ORDER_WORKERS,
+    COALESCE_SIGNALS,
+    COALESCE_WINDOW,
+    COALESCE_POLICY,
+    COALESCE_MAX_IN_FLIGHT,
+    COALESCE_MAX_PENDING,
+    COALESCE_WORKERS,
+    ORDER_RATE_LIMIT,
+    ORDER_RATE_BURST,
+    SERVER_HOST,
+    SERVER_PORT,
+    PRODUCTION_SERVER,
+    SERVER_THREADS,
+    SERVER_CONNECTION_LIMIT,
+    SERVER_KEEPALIVE_TIMEOUT,
+    MAX_REQUEST_BODY_SIZE,
+    SHUTDOWN_DRAIN_TIMEOUT,
+    DEDUP_MAX_ENTRIES,
+    DEDUP_TTL,
+    DEDUP_HEADER,
+    DEDUP_WAIT_TIMEOUT,
+    MARKET_DATA_SYMBOLS,
+    MARKET_DATA_INTERVAL,
+    MARKET_DATA_USE_COPY_TICKS,
+    MARKET_DATA_MAX_AGE,
+    TICK_BUFFER_SIZE,
+    TP1_PERCENT_TAKE,
+    TP1_TOLERANCE_CENTS,
+    MONITOR_INTERVAL,
+    TRAILING_STOP_POINTS,
+    TRAILING_STEP_POINTS,
+    ACCOUNT_STREAM_ENABLED,
+    ACCOUNT_STREAM_INTERVAL,
+    ACCOUNT_STREAM_MAX_SUBSCRIBERS,
+    ACCOUNT_STREAM_QUEUE_SIZE,
+    ACCOUNT_STREAM_KEEPALIVE,
+    JOURNAL_PATH,
+    JOURNAL_COMMIT_INTERVAL,
+    JOURNAL_COMPACT_INTERVAL,
+    JOURNAL_RETENTION_DAYS,
+    FANOUT_ACCOUNTS,
+    FANOUT_MT5_MODULE,
+    LOG_PATH,
+    LOG_LEVEL,
+    LOG_LEVELS,
+    LOG_SAMPLING,
+    LOG_MAX_BYTES,
+    LOG_BACKUP_COUNT,
+    LOG_CONSOLE,
+    LOG_QUEUE_SIZE,
+    RISK_LIMITS_ENABLED,
+    RISK_MAX_POSITIONS,
+    RISK_MAX_OPEN_RISK,
+    RISK_MAX_CURRENCY_EXPOSURE,
+    RISK_MAX_CLASS_EXPOSURE,
+    RISK_MIN_MARGIN_LEVEL,
+    RISK_RESYNC_INTERVAL
 )
 
+log = logging.getLogger(__name__)
+
 class TradingBot:
     def __init__(self):
+        started = time.perf_counter()
+        self.log_writer = LogWriter(
+            LOG_PATH,
+            level=LOG_LEVEL,
+            levels=LOG_LEVELS,
+            sampling=LOG_SAMPLING,
+            max_bytes=LOG_MAX_BYTES,
+            backup_count=LOG_BACKUP_COUNT,
+            console=LOG_CONSOLE,
+            queue_size=LOG_QUEUE_SIZE,
+        )
+        self.log_writer.start()
         self.app = Flask(__name__)
+        self.executor = MT5Executor(MetaTrader5)
+        self.executor.start()
+        self.mt5 = self.executor.proxy()
+        self.connection = ConnectionSupervisor(
+            self.executor,
+            {"path": MT5_PATH, "login": MT5_LOGIN, "server": MT5_SERVER, "password": MT5_PASSWORD},
+            heartbeat_interval=MT5_HEARTBEAT_INTERVAL,
+            heartbeat_timeout=MT5_HEARTBEAT_TIMEOUT,
+            backoff_initial=MT5_RECONNECT_BACKOFF_INITIAL,
+            backoff_max=MT5_RECONNECT_BACKOFF_MAX,
+        )
         self.setup_mt5()
+        self.symbols = SymbolCache(self.mt5, ttl=SYMBOL_CACHE_TTL)
+        self.resolver = SymbolResolver(self.mt5, self.symbols, SYMBOL_ALIASES, ASSET_CLASSES, LOT_SIZE_OVERRIDES)
+        # Also applied by each fan-out worker to its own account
+        risk_limits = {
+            "max_positions": RISK_MAX_POSITIONS,
+            "max_open_risk": RISK_MAX_OPEN_RISK,
+            "max_currency_exposure": RISK_MAX_CURRENCY_EXPOSURE,
+            "class_limits": RISK_MAX_CLASS_EXPOSURE,
+            "min_margin_level": RISK_MIN_MARGIN_LEVEL,
+            "resync_interval": RISK_RESYNC_INTERVAL,
+        }
+        self.risk = RiskBook(self.mt5, self.symbols, self.resolver.classes, **risk_limits)
+        self.preload()
+        self.connection.on_connect.append(self.preload)
+        self.notifier = TelegramNotifier(
+            TELEGRAM_TOKEN,
+            CHANNEL_USERNAME,
+            base_url=TELEGRAM_API_URL,
+            max_queue=TELEGRAM_QUEUE_SIZE,
+            coalesce_window=TELEGRAM_COALESCE_WINDOW,
+            timeout=TELEGRAM_TIMEOUT,
+        )
+        self.notifier.start()
+        self.market_data = MarketData(
+            self.mt5,
+            capacity=TICK_BUFFER_SIZE,
+            interval=MARKET_DATA_INTERVAL,
+            use_copy_ticks=MARKET_DATA_USE_COPY_TICKS,
+            max_age=MARKET_DATA_MAX_AGE,
+        )
+        for symbol in MARKET_DATA_SYMBOLS:
+            self.market_data.subscribe(symbol)
+        self.market_data.start()
         self.app.route("/webhook", methods=["POST"])(self.webhook)
-        self.order_threads = {}
-        self.forex_symbols = ['EURUSD', 'USDCAD', 'USDJPY', 'US100']
-        self.stocks_symbols = ['PFE', 'BAC', 'AMZN', 'GOOG', 'NVDA', 'WMT', 'ZM', 'T', 'BABA']
-        self.gold_silver_symbol = ['XAUUSD', 'XAGUSD']
-        self.btc_symbol = ['BTCUSD']
-        self.eth_symbol = ['ETHUSD']
-        self.ltc_symbol = [ 'LTCUSD', 'ADAUSD']
+        self.app.route("/orders/<signal_id>", methods=["GET"])(self.order_status)
+        self.parser = default_parser()
+        self.dedup = DedupCache(max_entries=DEDUP_MAX_ENTRIES, ttl=DEDUP_TTL)
+        self.pipeline = OrderPipeline(self.handle_signal, max_queue=ORDER_QUEUE_SIZE, workers=ORDER_WORKERS)
+        if ASYNC_WEBHOOK:
+            self.pipeline.start()
+        self.coalescer = None
+        if COALESCE_SIGNALS:
+            self.coalescer = SignalCoalescer(
+                self.handle_coalesced,
+                window=COALESCE_WINDOW,
+                policy=COALESCE_POLICY,
+                key=self.coalesce_key,
+                max_in_flight=COALESCE_MAX_IN_FLIGHT,
+                max_pending=COALESCE_MAX_PENDING,
+                rate=ORDER_RATE_LIMIT,
+                burst=ORDER_RATE_BURST,
+                workers=COALESCE_WORKERS,
+            )
+            self.coalescer.start()
+        self.journal = Journal(
+            JOURNAL_PATH,
+            commit_interval=JOURNAL_COMMIT_INTERVAL,
+            retention=JOURNAL_RETENTION_DAYS * 86400,
+            compact_interval=JOURNAL_COMPACT_INTERVAL,
+        )
+        self.journal.start()
+        self.monitor = PositionMonitor(
+            self.mt5,
+            self.symbols,
+            self.send_telegram_message,
+            quotes=self.get_quote,
+            interval=MONITOR_INTERVAL,
+            tp1_percent=TP1_PERCENT_TAKE,
+            journal=self.journal,
+            tp1_tolerance=TP1_TOLERANCE_CENTS / 100,
+            trail_points=TRAILING_STOP_POINTS,
+            trail_step_points=TRAILING_STEP_POINTS,
+        )
+        self.monitor.resume()
+        self.market_data.listeners.append(self.monitor.on_quote)
+        self.monitor.start()
+        self.lot_sizer = LotSizer(self.symbols, self.resolver.classes, LOT_SIZE_OVERRIDES)
+        self.brackets = BracketPlacer(self.executor, self.symbols, BRACKET_VOLUME_PERCENTS)
+        self.setup_metrics()
+        self.fanout = None
+        self.fanout_monitors = {}
+        if FANOUT_ACCOUNTS:
+            self.fanout = FanoutDispatcher(
+                FANOUT_ACCOUNTS,
+                mt5_module=FANOUT_MT5_MODULE,
+                order_type=ORDER_TYPE,
+                aliases=SYMBOL_ALIASES,
+                asset_classes=ASSET_CLASSES,
+                overrides=LOT_SIZE_OVERRIDES,
+                default_risk=TRADE_RISK,
+                risk_limits=risk_limits if RISK_LIMITS_ENABLED else None,
+            )
+            self.fanout.start()
+            self.fanout_monitors = {name: self.fanout_monitor(name) for name, ok in self.fanout.ready.items() if ok}
+        self.app.route("/fanout", methods=["GET"])(self.fanout_stats)
+        self.account_stream = AccountStream(
+            self.mt5,
+            interval=ACCOUNT_STREAM_INTERVAL,
+            max_subscribers=ACCOUNT_STREAM_MAX_SUBSCRIBERS,
+            subscriber_queue=ACCOUNT_STREAM_QUEUE_SIZE,
+        )
+        if ACCOUNT_STREAM_ENABLED:
+            self.account_stream.start()
+        self.app.route("/events", methods=["GET"])(self.events)
+        if RISK_LIMITS_ENABLED:
+            self.risk.start()
+        self.connection.start()
+        self.startup_seconds = time.perf_counter() - started
+        log.info("Ready in %.2fs", self.startup_seconds)
+
+    def setup_metrics(self):
+        """Create the latency histograms and counters exposed at /metrics."""
+        self.metrics = Registry()
+        self.request_latency = self.metrics.histogram(
+            "mt5_bot_request_seconds", "HTTP request latency by endpoint", ("endpoint",))
+        self.stage_latency = self.metrics.histogram(
+            "mt5_bot_stage_seconds", "Time spent in each stage of the webhook-to-fill path", ("stage",))
+        self.mt5_wait = self.metrics.histogram(
+            "mt5_bot_mt5_queue_wait_seconds", "Time MT5 commands wait for the executor thread", ("command",))
+        self.mt5_exec = self.metrics.histogram(
+            "mt5_bot_mt5_exec_seconds", "Time MT5 commands take in the terminal", ("command",))
+        self.order_retcodes = self.metrics.counter(
+            "mt5_bot_order_retcodes_total", "Broker retcodes returned by order_send", ("retcode",))
+        self.rejections = self.metrics.counter(
+            "mt5_bot_rejections_total", "Signals rejected before reaching the broker or by it", ("reason",))
+        self.metrics.register_collector(self.collect_metrics)
+        self.executor.observer = self.observe_mt5_command
+        self.app.before_request(self.start_request_timer)
+        self.app.after_request(self.observe_request)
+        self.app.route("/metrics", methods=["GET"])(self.metrics_endpoint)
+
+    def observe_mt5_command(self, name, wait, execution):
+        self.mt5_wait.observe(wait, name)
+        self.mt5_exec.observe(execution, name)
+
+    @staticmethod
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    def observe_request(self, response):
+        started = g.get("request_started")
+        if started is not None:
+            self.request_latency.observe(time.perf_counter() - started, request.endpoint or "unknown")
+        return response
+
+    def collect_metrics(self):
+        """Export counters that components keep for themselves."""
+        yield "mt5_bot_parsed_total", "counter", "Messages parsed by format", [
+            ({"format": name}, count) for name, count in self.parser.parsed.items()]
+        yield "mt5_bot_parse_failures_total", "counter", "Messages that could not be parsed by format", [
+            ({"format": name}, count) for name, count in self.parser.failures.items()]
+        yield "mt5_bot_queue_depth", "gauge", "Items waiting in internal queues", [
+            ({"queue": "mt5_executor"}, self.executor.queue_depth),
+            ({"queue": "telegram"}, self.notifier.queue_depth),
+            ({"queue": "orders"}, self.pipeline.queue_depth),
+            ({"queue": "log"}, self.log_writer.queue.qsize()),
+        ]
+        yield "mt5_bot_log_records_dropped_total", "counter", "Log records dropped because the writer fell behind", [
+            ({}, self.log_writer.dropped)]
+        connection = self.connection.stats()
+        yield "mt5_bot_mt5_connected", "gauge", "Whether the terminal answered the last heartbeat", [
+            ({}, int(connection["connected"]))]
+        yield "mt5_bot_mt5_reconnects_total", "counter", "Reconnects after a failed heartbeat", [
+            ({}, connection["reconnects"])]
+        yield "mt5_bot_mt5_heartbeat_failures_total", "counter", "Heartbeats that failed", [
+            ({}, connection["heartbeat_failures"])]
+        yield "mt5_bot_startup_seconds", "gauge", "Cold start to ready, and its initialize() part", [
+            ({"stage": "ready"}, self.startup_seconds),
+            ({"stage": "connect"}, connection["connect_seconds"]),
+        ]
+        yield "mt5_bot_mt5_reconnect_seconds", "gauge", "Time to reconnect and pre-load", [
+            ({"stat": "last"}, connection["last_reconnect_seconds"]),
+            ({"stat": "max"}, connection["max_reconnect_seconds"]),
+        ]
+        notifier = self.notifier.stats()
+        yield "mt5_bot_telegram_messages_total", "counter", "Telegram messages by outcome", [
+            ({"outcome": outcome}, notifier[outcome])
+            for outcome in ("sent_messages", "dropped", "failed", "rate_limited")]
+        yield "mt5_bot_order_queue_rejected_total", "counter", "Signals refused because the order queue was full", [
+            ({}, self.pipeline.rejected_full)]
+        dedup = self.dedup.stats()
+        yield "mt5_bot_dedup_lookups_total", "counter", "Signal deduplication lookups by result", [
+            ({"result": "hit"}, dedup["hits"]), ({"result": "miss"}, dedup["misses"])]
+        yield "mt5_bot_dedup_evictions_total", "counter", "Signals evicted from the deduplication cache", [
+            ({}, dedup["evictions"])]
+        yield "mt5_bot_dedup_entries", "gauge", "Signals held in the deduplication cache", [({}, dedup["entries"])]
+        yield "mt5_bot_symbol_cache_lookups_total", "counter", "Symbol cache lookups by result", [
+            ({"result": "hit"}, self.symbols.hits), ({"result": "miss"}, self.symbols.misses)]
+        yield "mt5_bot_symbol_resolver_fallbacks_total", "counter", "Tickers resolved by asking the terminal", [
+            ({}, self.resolver.fallbacks)]
+        journal = self.journal.stats()
+        yield "mt5_bot_journal_events_total", "counter", "Journal events by outcome", [
+            ({"outcome": "written"}, journal["written"]), ({"outcome": "failed"}, journal["failed"]),
+            ({"outcome": "compacted"}, journal["compacted"])]
+        yield "mt5_bot_journal_commits_total", "counter", "Journal group commits", [({}, journal["commits"])]
+        risk = self.risk.stats()
+        yield "mt5_bot_risk_open_risk", "gauge", "Loss if every open stop loss is hit, from the risk book", [
+            ({}, risk["open_risk"])]
+        yield "mt5_bot_risk_margin", "gauge", "Used margin according to the risk book", [({}, risk["margin"])]
+        yield "mt5_bot_risk_currency_exposure", "gauge", "Net notional per currency", [
+            ({"currency": currency}, value) for currency, value in risk["by_currency"].items()]
+        yield "mt5_bot_risk_class_exposure", "gauge", "Gross notional per asset class", [
+            ({"asset_class": asset_class}, value) for asset_class, value in risk["by_class"].items()]
+        yield "mt5_bot_risk_rejections_total", "counter", "Orders refused by the pre-trade risk limits by limit", [
+            ({"limit": limit}, count) for limit, count in risk["rejected"].items()]
+        yield "mt5_bot_risk_check_seconds", "gauge", "Duration of the pre-trade risk check", [
+            ({"stat": "last"}, risk["last_check_seconds"]),
+            ({"stat": "avg"}, risk["avg_check_seconds"]),
+        ]
+        if self.coalescer is not None:
+            coalescer = self.coalescer.stats()
+            yield "mt5_bot_coalescer_signals_total", "counter", "Signals through the coalescing stage by outcome", [
+                ({"outcome": "received"}, coalescer["received"]),
+                ({"outcome": "rejected"}, coalescer["rejected"]),
+            ]
+            yield "mt5_bot_coalescer_batches_total", "counter", "Coalesced batches by outcome", [
+                ({"outcome": "closed"}, coalescer["batches"]),
+                ({"outcome": "ordered"}, coalescer["orders"]),
+                ({"outcome": "netted"}, coalescer["netted"]),
+            ]
+            yield "mt5_bot_coalescer_throttled_total", "counter", "Times the order rate limit delayed a batch", [
+                ({}, coalescer["throttled"])]
+            yield "mt5_bot_coalescer_pending", "gauge", "Signals waiting in coalescing windows or for the broker", [
+                ({}, coalescer["pending"])]
+        stream = self.account_stream.stats()
+        yield "mt5_bot_event_subscribers", "gauge", "Open /events streams", [({}, stream["subscribers"])]
+        yield "mt5_bot_account_events_total", "counter", "Account change events by outcome", [
+            ({"outcome": "published"}, stream["published"]), ({"outcome": "dropped"}, stream["dropped"])]
+        yield "mt5_bot_account_snapshot_seconds", "gauge", "Duration of the last positions/orders snapshot and diff", [
+            ({}, stream["last_snapshot_seconds"])]
+        monitor = self.monitor.stats()
+        yield "mt5_bot_managed_positions", "gauge", "Positions managed by the position monitor", [
+            ({}, monitor["managed_positions"])]
+        yield "mt5_bot_monitor_cycle_seconds", "gauge", "Position monitor cycle duration", [
+            ({"stat": "last"}, monitor["last_cycle_seconds"]),
+            ({"stat": "max"}, monitor["max_cycle_seconds"]),
+            ({"stat": "avg"}, monitor["avg_cycle_seconds"]),
+        ]
+        yield "mt5_bot_pending_triggers", "gauge", "Price triggers waiting for the market", [
+            ({}, monitor["pending_triggers"])]
+        yield "mt5_bot_triggers_fired_total", "counter", "Price triggers fired", [({}, monitor["triggers_fired"])]
+        yield "mt5_bot_trigger_latency_seconds", "gauge", "Quote-to-action trigger latency", [
+            ({"stat": "last"}, monitor["last_trigger_seconds"]),
+            ({"stat": "max"}, monitor["max_trigger_seconds"]),
+            ({"stat": "avg"}, monitor["avg_trigger_seconds"]),
+        ]
+
+    def metrics_endpoint(self):
+        """Prometheus scrape endpoint."""
+        return Response(self.metrics.render(), mimetype="text/plain; version=0.0.4")
 
     def setup_mt5(self):
-        """Initialize MetaTrader 5 connection using credentials from the config."""
-        if not mt5.initialize(
-                path=MT5_PATH,
-                login=MT5_LOGIN,
-                server=MT5_SERVER,
-                password=MT5_PASSWORD
-        ):
-            print("initialize() failed, error code =", mt5.last_error())
+        """Initialize MetaTrader 5 connection using credentials from the config, retrying with backoff."""
+        if not self.connection.connect(MT5_CONNECT_ATTEMPTS):
+            log.critical("MetaTrader 5 did not initialize after %d attempts", MT5_CONNECT_ATTEMPTS)
+            self.log_writer.stop()
             quit()
+        log.info("MetaTrader 5 initialized in %.2fs", self.connection.connect_seconds)
 
-    def calculate_lot_size(self, entry_price, stop_loss, symbol):
-        """Calculate lot size based on risk management, stop loss, and config-based risk."""
-        contract_size = mt5.symbol_info(symbol).trade_contract_size
-        print(f"Contract size is: {contract_size}")
-        risk_ticks = abs(entry_price - stop_loss)
-        trade_risk = TRADE_RISK
-        if risk_ticks == 0:
-            raise ValueError("Stop loss distance is too small, unable to calculate risk")
-
-        # lot_size = trade_risk / risk_ticks
-        x = trade_risk / risk_ticks
-        lot_size = x / contract_size
-        symbol = symbol.strip()
-        if symbol in self.forex_symbols:
-            final_lot_size = lot_size
-            print(f"Matched Forex symbol: {symbol}")
-        elif symbol in self.stocks_symbols:
-            # final_lot_size = math.floor(lot_size)
-            # final_lot_size = float("{:.2f}".format(final_lot_size))
-            lot_size = 100.00
-            print(f"Matched Stock symbol: {symbol}")
-        elif symbol in self.gold_silver_symbol:
-            final_lot_size = lot_size
-            print(f"Matched Gold symbol: {symbol}")
-        elif symbol in self.btc_symbol:
-            lot_size = 0.09
-            print(f"Matched BTC symbol: {symbol}")
-        elif symbol in self.ltc_symbol:
-            lot_size = 30.0
-            print(f"Matched LTC symbol: {symbol}")
-        elif symbol in self.eth_symbol:
-            lot_size = 1.5
-            print(f"Matched ETH symbol: {symbol}")
+    def preload(self):
+        """Load account info, symbol metadata and Market Watch so the first trade after a (re)connect skips them."""
+        self.account = self.mt5.account_info()
+        if self.account is None:
+            log.error("account_info() failed, error code = %s", self.mt5.last_error())
         else:
-            final_lot_size = lot_size
-            print(f"No match found. Using default lot size: {final_lot_size}")
-
-        LOT_PRECISION = 2
-        lot_size = round(lot_size, LOT_PRECISION)
+            log.info("Logged in to account %s, balance %s %s", self.account.login, self.account.balance,
+                     self.account.currency)
+        self.symbols.warm()
+        self.resolver.build()
+        self.resolver.preselect()
+        self.risk.resync()
+
+    def calculate_lot_size(self, entry_price, stop_loss, symbol, risk=TRADE_RISK):
+        """Calculate lot size based on risk management, stop loss, and config-based risk."""
+        lot_size = self.lot_sizer.size_one(entry_price, stop_loss, symbol, risk)
+        asset_class = self.lot_sizer.asset_class(symbol)
+        log.info("Lot size for %s (%s): %s", symbol, asset_class or "no asset class match", lot_size,
+                 extra={"symbol": symbol, "lot_size": lot_size, "risk": risk})
         return lot_size
 
-    @staticmethod
-    def format_price(price, symbol):
+    def format_price(self, price, symbol):
         """Format price to match the symbol's precision."""
-        symbol_info = mt5.symbol_info(symbol)
+        symbol_info = self.symbols.get(symbol)
         return round(price, symbol_info.digits)
 
-    @staticmethod
-    def send_telegram_message(message):
-        """Send a message to a Telegram channel."""
-        url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-        payload = {"chat_id": CHANNEL_USERNAME, "text": message}
-        requests.post(url, json=payload)
+    def get_quote(self, symbol):
+        """Latest bid/ask from the market data buffer, falling back to a direct tick request."""
+        self.market_data.subscribe(symbol)
+        quote = self.market_data.latest(symbol)
+        if quote is None:
+            quote = self.mt5.symbol_info_tick(symbol)
+        return quote
+
+    def send_telegram_message(self, message):
+        """Queue a message for the Telegram channel without waiting for delivery."""
+        if not self.notifier.notify(message):
+            log.warning("Telegram queue is full, message dropped.")
 
-    def place_order(self, action, symbol, entry_price, lot_size, tp_levels, stop_loss):
+    def place_order(self, action, symbol, entry_price, lot_size, tp_levels, stop_loss, signal_format=""):
         """Place an order using MetaTrader 5 with error handling."""
-        order_type = mt5.ORDER_TYPE_BUY if action.lower() == 'buy' else mt5.ORDER_TYPE_SELL
-        ticks = mt5.symbol_info_tick(symbol)
+        # Journaled with each order so reports can attribute the position to its signal
+        signal_details = {"format": signal_format, "entry_price": entry_price, "stop_loss": stop_loss,
+                          "signal_id": correlation_id.get()}
+        order_type = self.mt5.ORDER_TYPE_BUY if action.lower() == 'buy' else self.mt5.ORDER_TYPE_SELL
+        with self.stage_latency.time("quote"):
+            ticks = self.get_quote(symbol)
         order_request = {
-            "action": mt5.TRADE_ACTION_DEAL,
+            "action": self.mt5.TRADE_ACTION_DEAL,
             "symbol": symbol,
             "volume": lot_size,
             "type": order_type,
@@ -110,213 +454,336 @@ class TradingBot:
             "deviation": 20,
             "magic": 123456,
             "comment": "MB_Strategy",
-            "type_time": mt5.ORDER_TIME_GTC,
-            "type_filling": mt5.ORDER_FILLING_IOC,
+            "type_time": self.mt5.ORDER_TIME_GTC,
+            "type_filling": self.mt5.ORDER_FILLING_IOC,
         }
-        result = mt5.order_send(order_request)
-        if result.retcode == mt5.TRADE_RETCODE_DONE:
-            print(f"Order placed successfully: {result.order}")
+        if BRACKET_ORDERS and len(tp_levels) > 1:
+            return self.place_bracket(action, order_request, tp_levels, signal_details)
+        with self.stage_latency.time("order_send"):
+            result = self.mt5.order_send(order_request)
+        self.order_retcodes.inc(str(result.retcode) if result is not None else "none")
+        self.journal.record(
+            ORDER,
+            getattr(result, "order", None),
+            symbol=symbol,
+            action=action,
+            volume=lot_size,
+            price=getattr(result, "price", None),
+            retcode=getattr(result, "retcode", None),
+            **signal_details,
+        )
+        if result.retcode == self.mt5.TRADE_RETCODE_DONE:
+            self.risk.add(result.order, symbol, action, result.volume or lot_size,
+                          result.price or order_request["price"], stop_loss)
+            log.info("Order placed successfully: %s", result.order,
+                     extra={"ticket": result.order, "symbol": symbol, "volume": lot_size, "price": result.price})
             if tp_levels:
-                # Start a thread to monitor and adjust the order
-                self.order_threads[result.order] = threading.Thread(
-                    target=self.monitor_order,
-                    args=(result.order, symbol, tp_levels, stop_loss)
-                )
-                self.order_threads[result.order].start()
+                # Hand the position to the shared monitor for TP1 and break-even management
+                self.monitor.register(result.order, symbol, tp_levels, result.price or order_request["price"],
+                                      side=action, volume=lot_size)
             return {"status": "success", "order_id": result.order}, 200
         else:
-            print("Order placement failed:", result.retcode)
+            log.error("Order placement failed: %s", result.retcode, extra={"symbol": symbol, "retcode": result.retcode})
+            self.rejections.inc("broker")
             return {"status": "error", "message": "Order placement failed"}, 500
 
-    def monitor_order(self, order_id, symbol, tp_levels, entry_price):
-        """Monitor the order, take 50% at TP1, then modify to TP2 with SL at entry."""
-        tp1_reached = False
-
-        while not tp1_reached:
-            time.sleep(1)
-            positions = mt5.positions_get(ticket=order_id)
-
-            if not positions:
-                print(f"Order {order_id} not found.")
-                break
-
-            position = positions[0]
-            current_price = mt5.symbol_info_tick(symbol).bid
-
-            # Check if TP1 is reached
-            if current_price >= tp_levels[0] - 0.1:
-                tp1_reached = True
-                print(f"TP1 reached for order {order_id}. Taking 50% profit and adjusting position.")
-
-                # Calculate half volume, check against minimum volume requirement
-                volume_half = round(position.volume / 2, 2)  # Adjust to precision allowed
-                min_volume = mt5.symbol_info(symbol).volume_min
-
-                if volume_half < min_volume:
-                    print(f"Cannot close 50% of position {order_id} - volume below minimum required ({min_volume}).")
-                    break
-
-                # Prepare request to close 50% of the position
-                close_request = {
-                    "action": mt5.TRADE_ACTION_DEAL,
-                    "position": order_id,
-                    "symbol": symbol,
-                    "volume": volume_half,
-                    "type": mt5.ORDER_TYPE_SELL if position.type == mt5.ORDER_TYPE_BUY else mt5.ORDER_TYPE_BUY,
-                    "price": current_price,
-                    "deviation": 20,
-                    "magic": 234000,
-                    "comment": "Partial close at TP1",
+    def place_bracket(self, action, order_request, tp_levels, signal_details=None):
+        """
+        Open one position per TP level, each with its own TP, and report how long all legs took.
+
+        The legs after the first are handed to the monitor, which moves their SL to entry once TP1 is reached.
+        """
+        legs, timings = self.brackets.place(order_request, tp_levels)
+        self.stage_latency.observe(timings["check_seconds"], "bracket_check")
+        self.stage_latency.observe(timings["send_seconds"], "bracket_send")
+        summary = {
+            "legs": [
+                {
+                    "tp": leg.tp,
+                    "volume": leg.volume,
+                    "order_id": getattr(leg.result, "order", None),
+                    "retcode": getattr(leg.result or leg.check, "retcode", None),
                 }
-                close_result = mt5.order_send(close_request)
-
-                if close_result.retcode == mt5.TRADE_RETCODE_DONE:
-                    print(f"50% of position {order_id} closed successfully at TP1.")
-
-                    # Modify the remaining position: set SL to entry, TP to TP2
-                    modify_request = {
-                        "action": mt5.TRADE_ACTION_SLTP,
-                        "position": order_id,
-                        "sl": entry_price,
-                        "tp": tp_levels[1] if len(tp_levels) > 1 else None,
-                    }
-                    modify_result = mt5.order_send(modify_request)
-
-                    if modify_result.retcode == mt5.TRADE_RETCODE_DONE:
-                        self.send_telegram_message(f"Order {order_id} modified to TP2 with SL at entry.")
-                    else:
-                        print(f"Failed to modify order {order_id}. Error: {modify_result.retcode}, {mt5.last_error()}")
-                else:
-                    print(
-                        f"Failed to close 50% of position {order_id}. Error: {close_result.retcode}, {mt5.last_error()}")
+                for leg in legs
+            ],
+            "check_ms": timings["check_seconds"] * 1e3,
+            "send_ms": timings["send_seconds"] * 1e3,
+            "total_ms": timings["total_seconds"] * 1e3,
+        }
+        if any(leg.result is None for leg in legs):
+            log.error("Bracket order check failed: %s", [getattr(leg.check, "comment", None) for leg in legs])
+            self.rejections.inc("order_check")
+            return dict(summary, status="error", message="Order check failed"), 400
+
+        for leg in legs:
+            self.order_retcodes.inc(str(leg.result.retcode))
+            if leg.result.retcode == self.mt5.TRADE_RETCODE_DONE:
+                self.risk.add(leg.result.order, leg.request["symbol"], action, leg.volume,
+                              leg.result.price or leg.request["price"], leg.request["sl"])
+                if leg is not legs[0]:
+                    # The TP1 leg closes at the broker; the others only need their stop moved to entry
+                    self.monitor.register(leg.result.order, leg.request["symbol"], [tp_levels[0], leg.tp],
+                                          leg.result.price or leg.request["price"], side=action,
+                                          volume=leg.volume, stage=BREAKEVEN)
+            self.journal.record(
+                ORDER,
+                getattr(leg.result, "order", None),
+                symbol=leg.request["symbol"],
+                action=action,
+                volume=leg.volume,
+                price=getattr(leg.result, "price", None),
+                retcode=getattr(leg.result, "retcode", None),
+                **(signal_details or {}),
+            )
+        placed = sum(leg.result.retcode == self.mt5.TRADE_RETCODE_DONE for leg in legs)
+        log.info("Bracket placed %d/%d legs in %.1f ms", placed, len(legs), summary["total_ms"],
+                 extra={"tickets": [leg["order_id"] for leg in summary["legs"]]})
+        if placed < len(legs):
+            self.rejections.inc("broker")
+            return dict(summary, status="error", message="Some bracket legs failed"), 500
+        return dict(summary, status="success"), 200
+
+    def order_status(self, signal_id):
+        """Report where an asynchronously accepted signal is in the order pipeline."""
+        record = self.pipeline.get(signal_id)
+        if record is None:
+            return {"status": "error", "message": f"Unknown signal {signal_id}"}, 404
+        return record.as_dict(), 200
 
     def webhook(self):
         """Handles incoming webhooks and processes the trading order."""
-        message = request.data.decode("utf-8")
-        print("Webhook message received:", message)
-        self.send_telegram_message(message)
+        # Every record logged for this signal, down to the position monitor's actions, carries its ID
+        with correlation(new_id()):
+            return self.handle_webhook()
 
-        action, symbol, entry_price, tp_levels, stop_loss = self.parse_plain_text_message(message)
-
-        if not action or not symbol or entry_price is None or stop_loss is None:
+    def handle_webhook(self):
+        """Parse, deduplicate and trade one webhook message."""
+        message = request.data.decode("utf-8")
+        log.info("Webhook message received", extra={"raw_message": message})
+        if self.coalescer is None:
+            # With coalescing, one message is posted per batch instead
+            with self.stage_latency.time("telegram"):
+                self.send_telegram_message(message)
+
+        with self.stage_latency.time("parse"):
+            signal = self.parser.parse(message)
+        if signal is None:
+            self.rejections.inc("parse")
             return {"status": "error", "message": "Failed to parse the message"}, 400
+        self.journal.record(
+            SIGNAL,
+            action=signal.action,
+            symbol=signal.symbol,
+            entry_price=signal.entry_price,
+            stop_loss=signal.stop_loss,
+            tp_levels=signal.tp_levels,
+            format=signal.format,
+            signal_id=correlation_id.get(),
+        )
+
+        key = self.dedup.key_for(signal, request.headers.get(DEDUP_HEADER))
+        future, first = self.dedup.claim(key)
+        if not first:
+            log.info("Duplicate %s %s signal, answering with the first response.", signal.action, signal.symbol)
+            try:
+                body, status = future.result(timeout=DEDUP_WAIT_TIMEOUT)
+            except Exception:
+                return {"status": "error", "message": "Duplicate of a signal that is still being processed"}, 409
+            return body, status, {"Idempotent-Replayed": "true"}
 
-        symbol = symbol.replace("USDT", "USD")
-        if symbol == "US500":
-            symbol = "US500.cash"
-        elif symbol == "US100":
-            symbol = "US100.cash"
-
-        entry_price = self.format_price(entry_price, symbol)
-        stop_loss = self.format_price(stop_loss, symbol)
-        if tp_levels:
-            tp_levels = [self.format_price(tp, symbol) for tp in tp_levels]
-
-        symbol_info = mt5.symbol_info(symbol)
+        try:
+            body, status = self.submit_signal(signal, message)
+        except Exception as e:
+            self.dedup.forget(key)
+            future.set_exception(e)
+            raise
+        if status in (429, 503):
+            # Nothing was sent to the broker, so a resend should be tried again
+            self.dedup.forget(key)
+        future.set_result((body, status))
+        return body, status
+
+    def submit_signal(self, signal, message=None):
+        """Queue the signal in asynchronous mode, otherwise trade it before answering."""
+        if self.coalescer is not None:
+            future = self.coalescer.submit(signal, message)
+            if future is None:
+                self.rejections.inc("backpressure")
+                return {"status": "error", "message": f"Too many pending signals for {signal.symbol}"}, 429
+            if ASYNC_WEBHOOK:
+                record = self.pipeline.track(signal, future, correlation_id.get())
+                return {"status": "accepted", "signal_id": record.signal_id}, 202
+            return future.result()
+
+        if ASYNC_WEBHOOK:
+            record = self.pipeline.submit(signal, correlation_id.get())
+            if record is None:
+                self.rejections.inc("queue_full")
+                return {"status": "error", "message": "Order queue is full"}, 503
+            return {"status": "accepted", "signal_id": record.signal_id}, 202
+
+        return self.handle_signal(signal)
+
+    def handle_signal(self, signal, weight=1):
+        """Trade a parsed signal on this account, or on every configured account in fan-out mode."""
+        if self.fanout is not None:
+            return self.fanout_signal(signal, weight)
+        return self.process_signal(signal, weight)
+
+    def coalesce_key(self, signal):
+        """Coalesce by broker symbol, so US500 and US500.cash alerts share a window."""
+        resolved = self.resolver.resolve(signal.symbol)
+        return resolved.symbol if resolved is not None else signal.symbol.upper()
+
+    def handle_coalesced(self, signal, weight, messages):
+        """Trade the order a coalesced batch was reduced to, with one Telegram post for the batch."""
+        message = messages[0] or f"{signal.action} {signal.symbol}"
+        if len(messages) > 1:
+            message += (f"\n\n{len(messages)} signals for {signal.symbol} merged ({COALESCE_POLICY}), "
+                        f"risk x{weight}")
+        self.send_telegram_message(message)
+        return self.handle_signal(signal, weight)
+
+    def fanout_signal(self, signal, weight=1):
+        """Send a parsed signal to every account worker in parallel and report per-account fills."""
+        result = self.fanout.dispatch(signal, weight)
+        accounts = result["accounts"]
+        for name, account in accounts.items():
+            if account["status"] == 200:
+                self.register_fill(name, account["result"], signal)
+        log.info("Fan-out of %s to %d accounts, skew %.1f ms", signal.symbol, len(accounts), result["skew_ms"])
+        ok = accounts and all(account["status"] == 200 for account in accounts.values())
+        return result, 200 if ok else 500
+
+    def fanout_monitor(self, name):
+        """Position monitor for one fan-out account, acting on it through the account's worker."""
+        terminal = self.fanout.terminal(name)
+        monitor = PositionMonitor(
+            terminal,
+            SymbolCache(terminal, ttl=SYMBOL_CACHE_TTL),
+            lambda message: self.send_telegram_message(f"[{name}] {message}"),
+            interval=MONITOR_INTERVAL,
+            tp1_percent=TP1_PERCENT_TAKE,
+            journal=self.journal,
+            tp1_tolerance=TP1_TOLERANCE_CENTS / 100,
+            trail_points=TRAILING_STOP_POINTS,
+            trail_step_points=TRAILING_STEP_POINTS,
+            account=name,
+        )
+        monitor.resume()
+        monitor.start()
+        return monitor
+
+    def register_fill(self, name, fill, signal):
+        """Journal a fan-out account's fill and hand the position to that account's monitor."""
+        self.journal.record(
+            ORDER,
+            fill["order_id"],
+            account=name,
+            symbol=fill["symbol"],
+            action=fill["action"],
+            volume=fill["volume"],
+            price=fill["price"],
+            retcode=self.mt5.TRADE_RETCODE_DONE,
+            format=signal.format,
+            entry_price=signal.entry_price,
+            stop_loss=fill["sl"],
+            signal_id=correlation_id.get(),
+        )
+        if fill["tp_levels"]:
+            self.fanout_monitors[name].register(fill["order_id"], fill["symbol"], fill["tp_levels"], fill["price"],
+                                                side=fill["action"], volume=fill["volume"])
+
+    def fanout_stats(self):
+        """Report fill latency per account and skew between accounts."""
+        if self.fanout is None:
+            return {"status": "error", "message": "Fan-out mode is not enabled"}, 404
+        return self.fanout.stats(), 200
+
+    def events(self):
+        """Server-Sent Events stream of position and pending order changes, starting with a snapshot."""
+        if not ACCOUNT_STREAM_ENABLED:
+            return {"status": "error", "message": "The account event stream is not enabled"}, 404
+        stream = self.account_stream.stream(keepalive=ACCOUNT_STREAM_KEEPALIVE)
+        if stream is None:
+            return {"status": "error", "message": "Too many event stream subscribers"}, 503
+        return Response(stream, mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    def process_signal(self, signal, weight=1):
+        """Resolve the symbol, size the position and send the order for a parsed signal."""
+        resolved = self.resolver.resolve(signal.symbol)
+        if resolved is None:
+            log.warning("Unknown symbol %s", signal.symbol)
+            self.rejections.inc("unknown_symbol")
+            return {"status": "error", "message": f"Symbol {signal.symbol} is not found"}, 400
+        symbol = resolved.symbol
+
+        entry_price = self.format_price(signal.entry_price, symbol)
+        stop_loss = self.format_price(signal.stop_loss, symbol)
+        tp_levels = [self.format_price(tp, symbol) for tp in signal.tp_levels]
+
+        symbol_info = self.symbols.get(symbol)
         if symbol_info is None or not symbol_info.visible:
-            if not mt5.symbol_select(symbol, True):
-                print(f"Failed to select symbol {symbol}")
+            with self.stage_latency.time("symbol_select"):
+                selected = self.mt5.symbol_select(symbol, True)
+            if not selected:
+                log.warning("Failed to select symbol %s", symbol)
+                self.rejections.inc("symbol_select")
                 return {"status": "error", "message": f"Failed to select symbol {symbol}"}, 400
-
-        lot_size = self.calculate_lot_size(entry_price, stop_loss, symbol)
-
-        return self.place_order(action, symbol, entry_price, lot_size, tp_levels, stop_loss)
-
-    import re
-    import json
-
-    def parse_plain_text_message(self, message):
-        """Parse plain text message to extract trading parameters based on Type 1 and Type 2 formats."""
+            self.symbols.mark_visible(symbol)
+
+        with self.stage_latency.time("lot_sizing"):
+            lot_size = self.calculate_lot_size(entry_price, stop_loss, symbol, TRADE_RISK * weight)
+
+        if not RISK_LIMITS_ENABLED:
+            return self.place_order(signal.action, symbol, entry_price, lot_size, tp_levels, stop_loss, signal.format)
+        with self.stage_latency.time("risk_check"):
+            reservation, breach = self.risk.reserve(symbol, signal.action, lot_size, entry_price, stop_loss)
+        if breach is not None:
+            log.warning("Order refused by risk limits: %s", breach, extra={"symbol": symbol, "lot_size": lot_size})
+            self.rejections.inc("risk_limit")
+            return {"status": "error", "message": breach}, 400
         try:
-            action, symbol, entry_price, tp_levels, stop_loss = None, None, None, [], None
-
-            if re.search(r"TP-levels", message, re.IGNORECASE):
-                action_match = re.search(r"(Buy|Sell)", message, re.IGNORECASE)
-                action = action_match.group(0).capitalize() if action_match else None
-                symbol_match = re.search(r",\s*([A-Z]+[A-Z0-9]*)", message)
-                symbol = symbol_match.group(1) if symbol_match else None
-                entry_price_match = re.search(r"price\s*=\s*([\d.]+)", message)
-                entry_price = float(entry_price_match.group(1)) if entry_price_match else None
-                tp_levels_match = re.findall(r"TP-levels\s*:\s*([\d.]+)", message)
-                tp_levels = [float(tp) for tp in tp_levels_match] if tp_levels_match else []
-                sl_match = re.search(r"SL\s*:\s*([\d.]+)", message)
-                stop_loss = float(sl_match.group(1)) if sl_match else None
-
-            elif re.search(r"Smart Signal Alert!", message, re.IGNORECASE):
-                action_match = re.search(r"(Buy|Sell)", message, re.IGNORECASE)
-                action = action_match.group(1).capitalize() if action_match else None
-                symbol_match = re.search(r"(BTCUSDT|[A-Z]{6})", message)
-                symbol = symbol_match.group(1) if symbol_match else None
-                entry_price_match = re.search(r"Entry:\s*([\d.]+)", message)
-                entry_price = float(entry_price_match.group(1)) if entry_price_match else None
-                tp_levels_match = re.findall(r"TP(\d):\s*([\d.]+)", message)
-                tp_levels = [float(tp[1]) for tp in tp_levels_match] if tp_levels_match else []
-                sl_match = re.search(r"SL\s*:\s*([\d.]+)", message)
-                stop_loss = float(sl_match.group(1)) if sl_match else None
-
-            elif re.search(r"(Long entry|Short entry)", message, re.IGNORECASE):
-                action_match = re.search(r"(Long|Short) entry", message, re.IGNORECASE)
-                action = "Buy" if action_match.group(1).lower() == "long" else "Sell"
-                symbol_match = re.search(r"Symbol:\s*([A-Z]+)", message)
-                symbol = symbol_match.group(1) if symbol_match else None
-                entry_price_match = re.search(r"Entry price:\s*([\d.]+)", message)
-                entry_price = float(entry_price_match.group(1)) if entry_price_match else None
-                tp_levels_match = re.findall(r"TP\d:\s*([\d.]+)", message)
-                tp_levels = [float(tp) for tp in tp_levels_match] if tp_levels_match else []
-                sl_match = re.search(r"SL:\s*([\d.]+)", message)
-                stop_loss = float(sl_match.group(1)) if sl_match else None
-
-            elif re.search(r"Symbol:", message, re.IGNORECASE) and not re.search(r"Direction:", message, re.IGNORECASE):
-                symbol_match = re.search(r"Symbol:\s*([A-Z]+)", message)
-                json_start = message.find("{")
-                if symbol_match and json_start != -1:
-                    symbol = symbol_match.group(1)
-                    json_part = message[json_start:]
-                    json_data = json.loads(json_part)
-                    action = "Buy" if json_data.get('side', '').upper() == "LONG" else "Sell"
-                    entry_price = float(json_data.get('entry', None))
-                    tp_levels = [
-                        float(json_data.get(f'tp{i}', None)) for i in range(1, 5)
-                        if json_data.get(f'tp{i}', None)
-                    ]
-                    stop_loss = float(json_data.get('stop', None))
-                else:
-                    print("Unknown message format:", message)
-                    return None, None, None, None, None
-
-            elif re.search(r"Direction:", message, re.IGNORECASE):
-                symbol_match = re.search(r"Symbol:\s*([A-Z0-9]+)", message)
-                action_match = re.search(r"Direction:\s*(Buy|Sell)", message, re.IGNORECASE)
-                if symbol_match and action_match:
-                    symbol = symbol_match.group(1)
-                    action = action_match.group(1).capitalize()
-                    entry_price_match = re.search(r"Entry:\s*([\d.]+)", message)
-                    entry_price = float(entry_price_match.group(1)) if entry_price_match else None
-                    tp1_match = re.search(r"TP1:\s*([\d.]+)", message)
-                    tp2_match = re.search(r"TP2:\s*([\d.]+)", message)
-                    if tp1_match:
-                        tp_levels.append(float(tp1_match.group(1)))
-                    if tp2_match:
-                        tp_levels.append(float(tp2_match.group(1)))
-                    sl_match = re.search(r"SL:\s*([\d.]+)", message)
-                    stop_loss = float(sl_match.group(1)) if sl_match else None
-                else:
-                    print("Unknown Type 4 message format:", message)
-                    return None, None, None, None, None
-
-            else:
-                print("Unknown message format:", message)
-                return None, None, None, None, None
-
-            return action, symbol, entry_price, tp_levels, stop_loss
-
-        except Exception as e:
-            print(f"Failed to parse message: {e} for message: {message}")
-            return None, None, None, None, None
+            return self.place_order(signal.action, symbol, entry_price, lot_size, tp_levels, stop_loss, signal.format)
+        finally:
+            self.risk.release(reservation)
+
+    def shutdown(self, timeout=30.0):
+        """Finish queued orders, then stop the background workers and close the MT5 connection."""
+        deadline = time.monotonic() + timeout
+        self.connection.stop()
+        if self.coalescer is not None:
+            self.coalescer.stop(max(0.0, deadline - time.monotonic()))
+        self.pipeline.stop(max(0.0, deadline - time.monotonic()))
+        self.monitor.stop()
+        self.account_stream.stop()
+        self.risk.stop()
+        for monitor in self.fanout_monitors.values():
+            monitor.stop()
+        if self.fanout is not None:
+            self.fanout.stop()
+        self.market_data.stop()
+        self.notifier.stop()
+        self.journal.stop()
+        self.mt5.shutdown()
+        self.executor.stop()
+        self.log_writer.stop()
 
     def run(self):
-        """Start the Flask app."""
-        self.app.run(host="0.0.0.0", port=80)
+        """Serve the app with the production server, or Flask's development server if configured."""
+        if not PRODUCTION_SERVER:
+            self.app.run(host=SERVER_HOST, port=SERVER_PORT)
+            return
+        WebServer(
+            self,
+            host=SERVER_HOST,
+            port=SERVER_PORT,
+            threads=SERVER_THREADS,
+            connection_limit=SERVER_CONNECTION_LIMIT,
+            keepalive_timeout=SERVER_KEEPALIVE_TIMEOUT,
+            max_body_size=MAX_REQUEST_BODY_SIZE,
+            drain_timeout=SHUTDOWN_DRAIN_TIMEOUT,
+        ).serve_forever()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,345 @@
+"""
+Backtest the TP1 partial-close strategy over historical bars or ticks.
+
+Each signal fills at the open of the first bar after it arrives. The position is then managed the way
+PositionMonitor manages it live: once price comes within the tolerance of TP1, part of the position is
+closed, and the rest runs to TP2 with its stop moved to the fill price. A bar that touches both levels
+is counted as hitting the stop first.
+
+Run from the repository root:
+    python backtest.py signals.jsonl --bars history/ --risk 25 50 100 --tp1-percent 30 50 70 --workers 4
+    python backtest.py signals.jsonl --store bars/ --timeframe M1
+"""
+import argparse
+import importlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from bar_store import TIMEFRAME_SECONDS, BarStore
+from config import ASSET_CLASSES, LOT_SIZE_OVERRIDES, SYMBOL_ALIASES, TP1_PERCENT_TAKE, TP1_TOLERANCE_CENTS, TRADE_RISK
+from lot_sizing import LotSizer
+from signal_parser import default_parser
+from symbol_cache import SymbolCache
+from symbol_resolver import SymbolResolver
+
+BAR_DTYPE = np.dtype([("time", "f8"), ("open", "f8"), ("high", "f8"), ("low", "f8"), ("close", "f8")])
+
+OUTCOMES = ("unfilled", "open", "stop_loss", "tp1_breakeven", "tp1_tp2", "tp1_open")
+UNFILLED, OPEN, STOP_LOSS, TP1_BREAKEVEN, TP1_TP2, TP1_OPEN = range(len(OUTCOMES))
+
+
+def load_bars(path):
+    """
+    Load bars from a .npy array saved from mt5.copy_rates_* or mt5.copy_ticks_*, or a CSV file with a
+    header row naming time, open, high, low and close (or time_msc and bid for ticks).
+    """
+    if path.endswith(".npy"):
+        data = np.load(path)
+    else:
+        data = np.genfromtxt(path, delimiter=",", names=True)
+    if "bid" in data.dtype.names:
+        return bars_from_ticks(data)
+    bars = np.empty(len(data), dtype=BAR_DTYPE)
+    for name in BAR_DTYPE.names:
+        bars[name] = data[name]
+    return bars
+
+
+def bars_from_columns(columns):
+    """Copy the column views of a BarStore range into a bar array."""
+    bars = np.empty(len(columns["time"]), dtype=BAR_DTYPE)
+    for name in BAR_DTYPE.names:
+        bars[name] = columns[name]
+    return bars
+
+
+def bars_from_ticks(ticks):
+    """Treat each tick as a bar whose open, high, low and close are its bid."""
+    bars = np.empty(len(ticks), dtype=BAR_DTYPE)
+    bars["time"] = ticks["time_msc"] / 1000.0 if "time_msc" in ticks.dtype.names else ticks["time"]
+    for name in ("open", "high", "low", "close"):
+        bars[name] = ticks["bid"]
+    return bars
+
+
+def load_signals(path, parser=None, resolver=None):
+    """
+    Parse a JSONL file of {"time": epoch seconds or ISO 8601, "message": alert text} into (time, Signal)
+    pairs, with tickers mapped to broker symbols when a SymbolResolver is given.
+    """
+    parser = parser or default_parser()
+    signals = []
+    with open(path, encoding="utf-8") as lines:
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            stamp = item["time"]
+            if isinstance(stamp, str):
+                stamp = datetime.fromisoformat(stamp).timestamp()
+            signal = parser.parse(item.get("message") or item["body"])
+            if signal is not None:
+                resolved = resolver.resolve(signal.symbol) if resolver is not None else None
+                if resolved is not None:
+                    signal.symbol = resolved.symbol
+                signals.append((float(stamp), signal))
+    return signals
+
+
+def _scan(values, starts, levels, width, limits):
+    """First index in [start, limit) of each row, at most width long, where values >= level."""
+    index = starts[:, np.newaxis] + np.arange(width)
+    hit = (values[np.minimum(index, len(values) - 1)] >= levels[:, np.newaxis]) & (index < limits[:, np.newaxis])
+    return hit.any(axis=1), starts + hit.argmax(axis=1)
+
+
+def first_crossing(values, starts, levels, block=64):
+    """
+    Return, for each row, the first index i >= starts[row] with values[i] >= levels[row], or len(values).
+
+    Each row scans the rest of its own block, then searches the per-block maxima (recursively, with
+    the same function) for the first block that reaches its level and scans only that block. A row
+    costs a few blocks of work per level of the hierarchy however far away its crossing is.
+    """
+    n = len(values)
+    result = np.full(len(starts), n, dtype=np.int64)
+    rows = np.flatnonzero(starts < n)
+    if not len(rows):
+        return result
+    if n <= block:
+        found, at = _scan(values, starts[rows], levels[rows], n, np.full(len(rows), n))
+        result[rows[found]] = at[found]
+        return result
+
+    found, at = _scan(values, starts[rows], levels[rows], block, (starts[rows] // block + 1) * block)
+    result[rows[found]] = at[found]
+    rows = rows[~found]
+    if len(rows):
+        maxima = np.maximum.reduceat(values, np.arange(0, n, block))
+        hit_block = first_crossing(maxima, starts[rows] // block + 1, levels[rows], block)
+        reached = hit_block < len(maxima)
+        rows, begin = rows[reached], hit_block[reached] * block
+        found, at = _scan(values, begin, levels[rows], block, np.minimum(begin + block, n))
+        result[rows[found]] = at[found]
+    return result
+
+
+def simulate_paths(bars, times, sides, stops, tp1, tp2, tolerance):
+    """
+    Walk every signal on one symbol through fill, TP1 and its exit.
+
+    sides is +1 for buys and -1 for sells. Prices are handled in signed form (side * price) so that
+    both sides use the same "crosses upwards" search: highs are favourable for buys and lows for sells.
+    Returns (outcome, leg1, leg2, exit_time), where leg1 and leg2 are the price moves earned per unit
+    by the part closed at TP1 and by the remainder. Without a TP1 fill the two legs are equal.
+    """
+    n = len(bars)
+    count = len(times)
+    outcome = np.full(count, UNFILLED, dtype=np.int8)
+    leg1 = np.zeros(count)
+    leg2 = np.zeros(count)
+    exit_time = np.asarray(times, dtype=float).copy()
+    if n == 0:
+        return outcome, leg1, leg2, exit_time
+
+    start = np.searchsorted(bars["time"], times, side="right")
+    last_close = bars["close"][-1]
+    for side, favourable, adverse in ((1, bars["high"], -bars["low"]), (-1, -bars["low"], bars["high"])):
+        rows = np.flatnonzero((sides == side) & (start < n))
+        if not len(rows):
+            continue
+        begin = start[rows]
+        opens = side * bars["open"]
+        fill = opens[begin]
+
+        sl_at = first_crossing(adverse, begin, -side * stops[rows])
+        tp1_at = first_crossing(favourable, begin, side * tp1[rows] - tolerance)
+        took_tp1 = tp1_at < sl_at
+        stopped = ~took_tp1 & (sl_at < n)
+
+        after = np.where(took_tp1, tp1_at + 1, n)
+        has_tp2 = ~np.isnan(tp2[rows])
+        be_at = first_crossing(adverse, after, -fill)
+        tp2_at = first_crossing(favourable, np.where(has_tp2, after, n), np.where(has_tp2, side * tp2[rows], np.inf))
+
+        # Exits fill at their level, or at the bar open when price gapped through it
+        sl_exit = np.minimum(side * stops[rows], opens[np.minimum(sl_at, n - 1)])
+        tp1_exit = np.maximum(side * tp1[rows] - tolerance, opens[np.minimum(tp1_at, n - 1)])
+        tp2_exit = np.maximum(side * np.nan_to_num(tp2[rows]), opens[np.minimum(tp2_at, n - 1)])
+        be_exit = np.minimum(fill, opens[np.minimum(be_at, n - 1)])
+        end = side * last_close
+
+        hit_tp2 = took_tp1 & (tp2_at < be_at)
+        hit_be = took_tp1 & ~hit_tp2 & (be_at < n)
+        second = np.select([hit_tp2, hit_be], [tp2_exit, be_exit], end)
+        first = np.select([took_tp1, stopped], [tp1_exit, sl_exit], end)
+
+        outcome[rows] = np.select(
+            [hit_tp2, hit_be, took_tp1, stopped],
+            [TP1_TP2, TP1_BREAKEVEN, TP1_OPEN, STOP_LOSS],
+            OPEN,
+        )
+        leg1[rows] = first - fill
+        leg2[rows] = np.where(took_tp1, second, first) - fill
+        exit_bar = np.select([hit_tp2, hit_be, took_tp1, stopped], [tp2_at, be_at, n - 1, sl_at], n - 1)
+        exit_time[rows] = bars["time"][exit_bar]
+    return outcome, leg1, leg2, exit_time
+
+
+def _simulate_symbol(task):
+    """Process pool entry point: (bars, times, sides, stops, tp1, tp2, tolerance) -> simulate_paths()."""
+    return simulate_paths(*task)
+
+
+class Backtester:
+    """
+    Replays parsed signals against per-symbol bar arrays.
+
+    The price path of each signal depends only on the TP1 tolerance, so paths are simulated once per
+    tolerance (one process pool task per symbol) and every risk and TP1 percentage is then evaluated
+    with array arithmetic over those paths.
+    """
+
+    def __init__(self, signals, bars, symbols, asset_classes=None, overrides=None, workers=1):
+        self.bars = bars  # symbol -> BAR_DTYPE array, sorted by time
+        self.symbols = symbols
+        self.workers = workers
+        self.lot_sizer = LotSizer(symbols, asset_classes or {}, overrides)
+        self.skipped = {}
+
+        usable = []
+        for stamp, signal in signals:
+            if signal.symbol not in bars:
+                reason = "no_bars"
+            elif symbols.get(signal.symbol) is None:
+                reason = "unknown_symbol"
+            elif signal.entry_price == signal.stop_loss or not signal.tp_levels:
+                reason = "invalid_levels"
+            else:
+                usable.append((stamp, signal))
+                continue
+            self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+        self.times = np.array([stamp for stamp, _ in usable], dtype=float)
+        self.symbol_names = np.array([signal.symbol for _, signal in usable], dtype=str)
+        self.sides = np.array([1 if signal.action.lower() == "buy" else -1 for _, signal in usable], dtype=np.int8)
+        self.entries = np.array([signal.entry_price for _, signal in usable], dtype=float)
+        self.stops = np.array([signal.stop_loss for _, signal in usable], dtype=float)
+        self.tp1 = np.array([signal.tp_levels[0] for _, signal in usable], dtype=float)
+        self.tp2 = np.array([signal.tp_levels[1] if len(signal.tp_levels) > 1 else np.nan
+                             for _, signal in usable], dtype=float)
+        self.contract_size = np.array([symbols.get(name).trade_contract_size for name in self.symbol_names])
+        self.volume_min = np.array([symbols.get(name).volume_min for name in self.symbol_names])
+
+    def paths(self, tolerance):
+        """Simulate every signal at one TP1 tolerance; returns (outcome, leg1, leg2, exit_time) arrays."""
+        groups = [np.flatnonzero(self.symbol_names == name) for name in np.unique(self.symbol_names)]
+        tasks = [
+            (self.bars[self.symbol_names[rows[0]]], self.times[rows], self.sides[rows],
+             self.stops[rows], self.tp1[rows], self.tp2[rows], tolerance)
+            for rows in groups
+        ]
+        if self.workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(_simulate_symbol, tasks))
+        else:
+            results = [simulate_paths(*task) for task in tasks]
+
+        count = len(self.times)
+        outcome, leg1, leg2, exit_time = (np.zeros(count, np.int8), np.zeros(count), np.zeros(count), np.zeros(count))
+        for rows, (o, l1, l2, t) in zip(groups, results):
+            outcome[rows], leg1[rows], leg2[rows], exit_time[rows] = o, l1, l2, t
+        return outcome, leg1, leg2, exit_time
+
+    def sweep(self, risks, tp1_percents, tolerances):
+        """Evaluate every combination of risk, TP1 percentage and TP1 tolerance; returns one dict per combination."""
+        if not len(self.times):
+            return []
+        risks = np.asarray(risks, dtype=float)
+        lots = self.lot_sizer.size(self.entries, self.stops, self.symbol_names, risks)  # (risks, signals)
+        results = []
+        for tolerance in tolerances:
+            outcome, leg1, leg2, exit_time = self.paths(tolerance)
+            filled = outcome != UNFILLED
+            order = np.argsort(exit_time[filled], kind="stable")
+            counts = {name: int((outcome == code).sum()) for code, name in enumerate(OUTCOMES)}
+            for percent in tp1_percents:
+                # Mirrors PositionMonitor: a partial volume below volume_min is not closed by the bot,
+                # so the broker-side TP at TP1 closes the whole position instead
+                part = np.round(lots * percent / 100, 2)
+                fraction = np.where(part >= self.volume_min, part / lots, 1.0)
+                pnl = lots * self.contract_size * (fraction * leg1 + (1 - fraction) * leg2)
+                pnl = pnl[:, filled][:, order]
+                equity = np.cumsum(pnl, axis=1)
+                drawdown = (np.maximum.accumulate(np.maximum(equity, 0), axis=1) - equity).max(axis=1, initial=0)
+                for i, risk in enumerate(risks):
+                    gains = pnl[i][pnl[i] > 0].sum()
+                    losses = -pnl[i][pnl[i] < 0].sum()
+                    results.append({
+                        "risk": float(risk),
+                        "tp1_percent": percent,
+                        "tolerance": tolerance,
+                        "trades": int(filled.sum()),
+                        "net_pnl": float(pnl[i].sum()),
+                        "win_rate": float((pnl[i] > 0).mean()) if pnl.shape[1] else 0.0,
+                        "profit_factor": float(gains / losses) if losses else float("inf"),
+                        "max_drawdown": float(drawdown[i]),
+                        "outcomes": counts,
+                    })
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("signals", help="JSONL file of {\"time\", \"message\"} objects")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--bars", help="directory of <SYMBOL>.npy or <SYMBOL>.csv bar or tick files")
+    source.add_argument("--store", help="bar store directory kept by bar_store.py")
+    parser.add_argument("--timeframe", default="M1", choices=sorted(TIMEFRAME_SECONDS),
+                        help="timeframe read from the bar store")
+    parser.add_argument("--risk", type=float, nargs="+", default=[TRADE_RISK])
+    parser.add_argument("--tp1-percent", type=float, nargs="+", default=[TP1_PERCENT_TAKE])
+    parser.add_argument("--tolerance", type=float, nargs="+", default=[TP1_TOLERANCE_CENTS / 100],
+                        help="distance before TP1 at which the partial close triggers, in price units")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--mt5-module", default="MetaTrader5",
+                        help="module providing symbol specifications, e.g. mt5_sim for offline runs")
+    args = parser.parse_args()
+
+    bars = {}
+    if args.store:
+        store = BarStore(args.store)
+        for name in os.listdir(args.store):
+            if os.path.isdir(os.path.join(args.store, name, args.timeframe)):
+                bars[name] = bars_from_columns(store.range(name, args.timeframe))
+    else:
+        for filename in os.listdir(args.bars):
+            name, extension = os.path.splitext(filename)
+            if extension in (".npy", ".csv"):
+                bars[name] = load_bars(os.path.join(args.bars, filename))
+
+    mt5 = importlib.import_module(args.mt5_module)
+    if not mt5.initialize():
+        raise SystemExit(f"initialize() failed, error code = {mt5.last_error()}")
+    symbols = SymbolCache(mt5)
+    symbols.warm()
+    resolver = SymbolResolver(mt5, symbols, SYMBOL_ALIASES, ASSET_CLASSES, LOT_SIZE_OVERRIDES)
+    resolver.build()
+
+    backtester = Backtester(load_signals(args.signals, resolver=resolver), bars, symbols,
+                            asset_classes=resolver.classes, overrides=LOT_SIZE_OVERRIDES, workers=args.workers)
+    if backtester.skipped:
+        print("Skipped signals:", backtester.skipped)
+    for row in backtester.sweep(args.risk, args.tp1_percent, args.tolerance):
+        print(f"risk {row['risk']:>8.2f}  tp1 {row['tp1_percent']:>5.1f}%  tolerance {row['tolerance']:<8g} "
+              f"trades {row['trades']:>6}  net {row['net_pnl']:>12.2f}  win {row['win_rate']:6.1%}  "
+              f"pf {row['profit_factor']:6.2f}  max dd {row['max_drawdown']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
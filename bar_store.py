@@ -0,0 +1,199 @@
+"""
+Local store of historical bars, one append-only file per column under <root>/<SYMBOL>/<TIMEFRAME>/.
+
+Sync fetches only the bars after the last stored one; readers memory-map the column files and get
+views by time range without copying. Keep it current from a scheduler:
+    python bar_store.py sync --symbols EURUSD XAUUSD --timeframes M1 H1 --days 365
+"""
+import argparse
+import importlib
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from config import BAR_STORE_DAYS, BAR_STORE_PATH, BAR_STORE_SYMBOLS, BAR_STORE_TIMEFRAMES
+from jsonlog import LogWriter
+
+log = logging.getLogger(__name__)
+
+COLUMNS = (("time", "i8"), ("open", "f8"), ("high", "f8"), ("low", "f8"), ("close", "f8"),
+           ("tick_volume", "u8"), ("spread", "i4"), ("real_volume", "u8"))
+TIMEFRAME_SECONDS = {"M1": 60, "M5": 300, "M15": 900, "M30": 1800, "H1": 3600, "H4": 14400, "D1": 86400,
+                     "W1": 604800}
+
+
+class BarSeries:
+    """
+    The bars of one symbol and timeframe, stored column by column.
+
+    The time column is written last on append, and its length is the series length, so a reader in
+    another process never sees a row whose other columns are not on disk yet.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._maps = {}
+        self._mapped_rows = -1
+        self._lock = threading.Lock()
+
+    def _file(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    def __len__(self):
+        try:
+            return os.path.getsize(self._file("time")) // 8
+        except FileNotFoundError:
+            return 0
+
+    @property
+    def last_time(self):
+        """Open time of the newest stored bar, or None if the series is empty."""
+        rows = len(self)
+        if not rows:
+            return None
+        with open(self._file("time"), "rb") as column:
+            column.seek((rows - 1) * 8)
+            return int(np.frombuffer(column.read(8), dtype="i8")[0])
+
+    def append(self, rates):
+        """Append the rows of a copy_rates_* array that are newer than the last stored bar. Returns the count."""
+        last = self.last_time
+        if last is not None:
+            rates = rates[rates["time"] > last]
+        if not len(rates):
+            return 0
+        with self._lock:
+            rows = len(self)
+            for name, dtype in COLUMNS[1:] + COLUMNS[:1]:
+                path = self._file(name)
+                with open(path, "ab") as column:
+                    # Drop a tail left by an append that was interrupted before the time column was written
+                    column.truncate(rows * np.dtype(dtype).itemsize)
+                    column.write(np.ascontiguousarray(rates[name], dtype=dtype).tobytes())
+        return len(rates)
+
+    def columns(self):
+        """Memory-mapped, read-only views of every column, remapped when the series has grown."""
+        rows = len(self)
+        with self._lock:
+            if rows != self._mapped_rows:
+                self._maps = {
+                    name: np.memmap(self._file(name), dtype=dtype, mode="r", shape=(rows,)) if rows
+                    else np.zeros(0, dtype=dtype)
+                    for name, dtype in COLUMNS
+                }
+                self._mapped_rows = rows
+            return self._maps
+
+    def range(self, start=None, end=None):
+        """Zero-copy views of every column for bars opening in [start, end), in epoch seconds."""
+        columns = self.columns()
+        times = columns["time"]
+        first = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+        last = len(times) if end is None else int(np.searchsorted(times, end, side="left"))
+        return {name: column[first:last] for name, column in columns.items()}
+
+
+class BarStore:
+    """Per-symbol, per-timeframe BarSeries under one directory, with incremental sync from the terminal."""
+
+    def __init__(self, root, chunk_bars=100000):
+        self.root = root
+        self.chunk_bars = chunk_bars  # bars requested per copy_rates_range call
+        self._series = {}
+
+    def series(self, symbol, timeframe):
+        key = (symbol, timeframe)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = BarSeries(os.path.join(self.root, symbol, timeframe))
+        return series
+
+    def range(self, symbol, timeframe, start=None, end=None):
+        return self.series(symbol, timeframe).range(start, end)
+
+    def sync(self, mt5, symbol, timeframe, since):
+        """
+        Fetch the bars after the last stored one (or from since for a new series) up to now.
+
+        A bar that has not closed yet (open time plus the timeframe is in the future) is left for the
+        next sync; while the market is closed, the newest bar the terminal returns is complete and kept.
+        Returns the number of bars appended.
+        """
+        series = self.series(symbol, timeframe)
+        seconds = TIMEFRAME_SECONDS[timeframe]
+        mt5_timeframe = getattr(mt5, f"TIMEFRAME_{timeframe}")
+        last = series.last_time
+        start = since if last is None else last + seconds
+        now = int(time.time())
+        appended = 0
+        while start <= now:
+            end = min(start + self.chunk_bars * seconds, now)
+            rates = mt5.copy_rates_range(symbol, mt5_timeframe, int(start), int(end))
+            if rates is None:
+                log.error("copy_rates_range(%s, %s) failed, error code = %s", symbol, timeframe, mt5.last_error(),
+                          extra={"symbol": symbol, "timeframe": timeframe})
+                break
+            rates = rates[rates["time"] + seconds <= now]
+            appended += series.append(rates)
+            start = end + 1
+        return appended
+
+    def sync_all(self, mt5, symbols, timeframes, days):
+        since = int(time.time()) - int(days * 86400)
+        totals = {}
+        for symbol in symbols:
+            for timeframe in timeframes:
+                started = time.perf_counter()
+                totals[(symbol, timeframe)] = appended = self.sync(mt5, symbol, timeframe, since)
+                stored = len(self.series(symbol, timeframe))
+                log.info("%s %s: %d new bars, %d stored, %.2fs", symbol, timeframe, appended, stored,
+                         time.perf_counter() - started,
+                         extra={"symbol": symbol, "timeframe": timeframe, "appended": appended, "stored": stored})
+        return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("sync", "info"))
+    parser.add_argument("--root", default=BAR_STORE_PATH)
+    parser.add_argument("--symbols", nargs="+", default=BAR_STORE_SYMBOLS)
+    parser.add_argument("--timeframes", nargs="+", default=BAR_STORE_TIMEFRAMES, choices=sorted(TIMEFRAME_SECONDS))
+    parser.add_argument("--days", type=float, default=BAR_STORE_DAYS, help="history to fetch for a new series")
+    parser.add_argument("--mt5-module", default="MetaTrader5",
+                        help="module providing the terminal connection, e.g. mt5_sim for offline runs")
+    args = parser.parse_args()
+
+    log_writer = LogWriter()
+    log_writer.start()
+    try:
+        run(args)
+    finally:
+        log_writer.stop()
+
+
+def run(args):
+    store = BarStore(args.root)
+    if args.command == "info":
+        for symbol in args.symbols:
+            for timeframe in args.timeframes:
+                series = store.series(symbol, timeframe)
+                log.info("%s %s: %d bars, last %s", symbol, timeframe, len(series), series.last_time,
+                         extra={"symbol": symbol, "timeframe": timeframe, "stored": len(series)})
+        return
+
+    mt5 = importlib.import_module(args.mt5_module)
+    if not mt5.initialize():
+        raise SystemExit(f"initialize() failed, error code = {mt5.last_error()}")
+    try:
+        store.sync_all(mt5, args.symbols, args.timeframes, args.days)
+    finally:
+        mt5.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Check BarStore against the simulated MetaTrader5 module.
+
+A sync into an empty store must hold exactly the bars a direct copy_rates_range returns, minus the
+bar that is still forming; a second sync must add nothing; while the market is closed the newest
+bar is complete and must be kept; and an append that was interrupted after some columns but
+before the time column must be truncated by the next append.
+
+Run from the repository root:
+    python -m benchmarks.bar_store_check --timeframe H1 --days 30
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import mt5_sim
+from bar_store import COLUMNS, TIMEFRAME_SECONDS, BarStore
+
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f"FAILED: {message}")
+    print(f"ok    {message}")
+
+
+def check_sync(mt5, store, symbol, timeframe, since):
+    seconds = TIMEFRAME_SECONDS[timeframe]
+    appended = store.sync(mt5, symbol, timeframe, since)
+    now = int(time.time())
+    direct = mt5.copy_rates_range(symbol, getattr(mt5, f"TIMEFRAME_{timeframe}"), since, now)
+    forming = now // seconds * seconds
+    expected = direct[direct["time"] < forming]
+    stored = store.range(symbol, timeframe)
+
+    check(appended == len(expected), f"sync appended {appended} bars, copy_rates_range has {len(expected)} closed")
+    check(all(np.array_equal(stored[name], expected[name]) for name, _ in COLUMNS),
+          "range() matches copy_rates_range column by column")
+    check(store.series(symbol, timeframe).last_time == forming - seconds, "the forming bar is left out")
+    check(store.sync(mt5, symbol, timeframe, since) == 0, "a second sync adds no bars")
+
+
+class ClosedMarket:
+    """The simulator as seen while the market is closed: no bars open at or after closed_at."""
+
+    def __init__(self, mt5, closed_at):
+        self.mt5 = mt5
+        self.closed_at = closed_at
+
+    def __getattr__(self, name):
+        return getattr(self.mt5, name)
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        rates = self.mt5.copy_rates_range(symbol, timeframe, date_from, date_to)
+        return None if rates is None else rates[rates["time"] < self.closed_at]
+
+
+def check_closed_market(mt5, store, symbol, timeframe, since):
+    seconds = TIMEFRAME_SECONDS[timeframe]
+    closed_at = int(time.time()) // seconds * seconds - 3 * seconds
+    store.sync(ClosedMarket(mt5, closed_at), symbol, timeframe, since)
+    check(store.series(symbol, timeframe).last_time == closed_at - seconds,
+          "with the market closed, the last complete bar is kept")
+
+
+def check_interrupted_append(store, symbol, timeframe):
+    series = store.series(symbol, timeframe)
+    rows = len(series)
+    last = {name: np.array(column[-1:]) for name, column in series.range().items()}
+
+    # An append that died after writing some value columns: the time column, and so the length, is unchanged
+    for name in ("open", "high"):
+        with open(series._file(name), "ab") as column:
+            column.write(b"\xff" * 11)
+    check(len(series) == rows, "a partial append does not change the series length")
+
+    rates = np.zeros(1, dtype=[(name, dtype) for name, dtype in COLUMNS])
+    for name, _ in COLUMNS:
+        rates[name] = last[name]
+    rates["time"] += TIMEFRAME_SECONDS[timeframe]
+    check(series.append(rates) == 1, "the next append adds its bar")
+    sizes = {name: os.path.getsize(series._file(name)) // np.dtype(dtype).itemsize for name, dtype in COLUMNS}
+    check(set(sizes.values()) == {rows + 1}, f"every column holds {rows + 1} rows after the append")
+    stored = series.range()
+    check(all(stored[name][-1] == rates[name][0] for name, _ in COLUMNS), "the appended bar reads back intact")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbol", default="EURUSD")
+    parser.add_argument("--timeframe", default="H1", choices=sorted(TIMEFRAME_SECONDS))
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("--chunk-bars", type=int, default=100, help="small, so that sync spans several requests")
+    args = parser.parse_args()
+
+    mt5 = mt5_sim.SimulatedMT5()
+    mt5.initialize()
+    with tempfile.TemporaryDirectory() as root:
+        store = BarStore(root, chunk_bars=args.chunk_bars)
+        since = int(time.time() - args.days * 86400)
+        check_sync(mt5, store, args.symbol, args.timeframe, since)
+        check_interrupted_append(store, args.symbol, args.timeframe)
+    with tempfile.TemporaryDirectory() as root:
+        check_closed_market(mt5, BarStore(root, chunk_bars=args.chunk_bars), args.symbol, args.timeframe, since)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Check that SignalCoalescer windows stay open for their full length while an earlier batch is in flight.
+
+With a 0.3 s window and a handler that takes 0.2 s, signals at 0, 0.35 and 0.55 s must be traded as
+two batches: the first alone, the second two merged. Neither a completing batch nor a throttle
+wakeup may close a later window early.
+
+Run from the repository root:
+    python -m benchmarks.coalescer_check
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+from coalescer import MAX_RISK, SignalCoalescer
+
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f"FAILED: {message}")
+    print(f"ok    {message}")
+
+
+def main():
+    started = time.monotonic()
+    calls = []
+    lock = threading.Lock()
+
+    def handler(signal, weight, messages):
+        with lock:
+            calls.append((round(time.monotonic() - started, 1), weight, len(messages)))
+        time.sleep(0.2)
+        return {"status": "success"}, 200
+
+    coalescer = SignalCoalescer(handler, window=0.3, policy=MAX_RISK, max_in_flight=1, rate=100, burst=100)
+    coalescer.start()
+    signal = SimpleNamespace(symbol="EURUSD", action="Buy")
+    futures = []
+    for at in (0.0, 0.35, 0.55):
+        time.sleep(max(0.0, started + at - time.monotonic()))
+        futures.append(coalescer.submit(signal))
+    for future in futures:
+        future.result(timeout=5)
+    coalescer.stop()
+
+    print(f"      batches (start s, weight, signals): {calls}")
+    check(len(calls) == 2, "three signals are traded as two batches")
+    check(calls[1][1:] == (2, 2), "the signals at 0.35 s and 0.55 s are merged")
+    check(calls[1][0] >= 0.6, "the second batch waits for its own window to close")
+
+    # A batch waiting for a rate token at 0.8 s must not close the window opened at 0.7 s
+    calls.clear()
+    started = time.monotonic()
+    coalescer = SignalCoalescer(handler, window=0.3, policy=MAX_RISK, max_in_flight=4, rate=2, burst=1)
+    coalescer.start()
+    futures = []
+    for at in (0.0, 0.35, 0.7, 0.85):
+        time.sleep(max(0.0, started + at - time.monotonic()))
+        futures.append(coalescer.submit(signal))
+    for future in futures:
+        future.result(timeout=5)
+    coalescer.stop()
+
+    print(f"      batches (start s, weight, signals): {calls}")
+    check([call[1:] for call in calls] == [(1, 1), (1, 1), (2, 2)], "throttle wakeups do not split a window")
+
+
+if __name__ == "__main__":
+    main()
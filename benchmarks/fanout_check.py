@@ -0,0 +1,84 @@
+"""
+Check that fan-out fills are journaled, managed by the position monitor and held to the risk limits.
+
+app4.TradingBot runs with two fan-out accounts whose workers each use their own simulated terminal
+(mt5_sim). One signal must open a position on both accounts, record an ORDER event per account
+and register each position with that account's monitor; a TP1 trigger must partially close the
+position through the account's worker; and with RISK_MAX_POSITIONS = 1 a second signal must be
+refused by each worker's risk book.
+
+Run from the repository root:
+    python -m benchmarks.fanout_check
+"""
+import os
+import tempfile
+import time
+
+import mt5_sim
+
+MESSAGE = "Smart Signal Alert!\nBuy EURUSD\nEntry: 1.08512\nTP1: 1.09010\nTP2: 1.09530\nSL: 1.08020"
+
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f"FAILED: {message}")
+    print(f"ok    {message}")
+
+
+def main():
+    import config
+    root = tempfile.mkdtemp()
+    config.TELEGRAM_API_URL = "http://127.0.0.1:9"
+    config.JOURNAL_PATH = os.path.join(root, "journal.db")
+    config.LOG_PATH = os.path.join(root, "bot.log")
+    config.LOG_CONSOLE = False
+    config.FANOUT_ACCOUNTS = [{"name": "a", "risk": 50}, {"name": "b", "risk": 100}]
+    config.FANOUT_MT5_MODULE = "mt5_sim"
+    config.RISK_LIMITS_ENABLED = True
+    config.RISK_MAX_POSITIONS = 1
+    mt5_sim.install(mt5_sim.SimulatedMT5())
+    import app4
+
+    bot = app4.TradingBot()
+    try:
+        client = bot.app.test_client()
+        response = client.post("/webhook", data=MESSAGE)
+        accounts = response.get_json()["accounts"]
+        check(response.status_code == 200 and set(accounts) == {"a", "b"}, "the signal fills on both accounts")
+
+        orders = {}
+        deadline = time.monotonic() + 5
+        while len(orders) < 2 and time.monotonic() < deadline:
+            time.sleep(0.1)  # the journal commits in the background
+            orders = {payload.get("account"): ticket for _, ticket, payload in bot.journal.events(app4.ORDER)}
+        check(orders == {name: account["result"]["order_id"] for name, account in accounts.items()},
+              "one ORDER event is journaled per account")
+
+        managed = {name: [item.ticket for item in monitor.managed()] for name, monitor in bot.fanout_monitors.items()}
+        check(managed == {name: [ticket] for name, ticket in orders.items()},
+              "each position is registered with its account's monitor")
+
+        monitor = bot.fanout_monitors["a"]
+        terminal = bot.fanout.terminal("a")
+        volume = terminal.positions_get(ticket=orders["a"])[0].volume
+        tp1 = accounts["a"]["result"]["tp_levels"][0]
+        monitor.on_quote(accounts["a"]["result"]["symbol"], tp1 + 0.0001, tp1 + 0.0002)
+        deadline = time.monotonic() + 5
+        partial = []
+        while not partial and time.monotonic() < deadline:
+            time.sleep(0.1)
+            deals = terminal.history_deals_get(0, time.time() + 60) or ()
+            partial = [deal for deal in deals if deal.comment == "Partial close at TP1"]
+        check(len(partial) == 1 and partial[0].volume == round(volume / 2, 2),
+              "TP1 closes half of the fan-out position through its worker")
+
+        response = client.post("/webhook", data=MESSAGE, headers={"Idempotency-Key": "second"})
+        accounts = response.get_json()["accounts"]
+        check(all(account["status"] == 400 and "positions open" in account["result"]["message"]
+                  for account in accounts.values()), "a second signal is refused by each account's risk book")
+    finally:
+        bot.shutdown()
+
+
+if __name__ == "__main__":
+    main()
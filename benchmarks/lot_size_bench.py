@@ -0,0 +1,64 @@
+"""
+Compare per-signal lot sizing with one batched NumPy pass.
+
+Run from the repository root:
+    python -m benchmarks.lot_size_bench
+"""
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from lot_sizing import LotSizer
+
+SYMBOLS = {
+    "EURUSD": (100000, 0.01, 0.01, 100),
+    "USDJPY": (100000, 0.01, 0.01, 100),
+    "XAUUSD": (100, 0.01, 0.01, 50),
+    "BTCUSD": (1, 0.01, 0.01, 10),
+    "NVDA": (1, 1, 1, 1000),
+}
+ASSET_CLASSES = {"EURUSD": "forex", "USDJPY": "forex", "XAUUSD": "gold_silver", "BTCUSD": "btc", "NVDA": "stocks"}
+OVERRIDES = {"stocks": 100.0, "btc": 0.09}
+
+
+class StaticSymbols:
+    """In-memory stand-in for SymbolCache, so the benchmark measures sizing only."""
+
+    def __init__(self):
+        self._info = {
+            name: SimpleNamespace(trade_contract_size=c, volume_min=vmin, volume_step=step, volume_max=vmax)
+            for name, (c, vmin, step, vmax) in SYMBOLS.items()
+        }
+
+    def get(self, symbol):
+        return self._info.get(symbol)
+
+
+def main(n=10000, profiles=(25, 50, 100)):
+    rng = np.random.default_rng(0)
+    symbols = rng.choice(list(SYMBOLS), n)
+    entries = rng.uniform(1, 2000, n)
+    stops = entries * rng.uniform(0.98, 0.999, n)
+    sizer = LotSizer(StaticSymbols(), ASSET_CLASSES, OVERRIDES)
+
+    started = time.perf_counter()
+    scalar = [
+        [sizer.size_one(e, s, sym, risk) for e, s, sym in zip(entries, stops, symbols)]
+        for risk in profiles
+    ]
+    scalar_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch = sizer.size(entries, stops, symbols, profiles)
+    batch_seconds = time.perf_counter() - started
+
+    assert np.allclose(batch, scalar)
+    signals = n * len(profiles)
+    print(f"{signals} sizings ({n} signals x {len(profiles)} risk profiles)")
+    print(f"scalar: {scalar_seconds * 1e3:9.2f} ms  {scalar_seconds / signals * 1e6:7.2f} us/sizing")
+    print(f"batch:  {batch_seconds * 1e3:9.2f} ms  {batch_seconds / signals * 1e6:7.2f} us/sizing")
+
+
+if __name__ == "__main__":
+    main()
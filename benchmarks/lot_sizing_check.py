@@ -0,0 +1,42 @@
+"""
+Check that LotSizer never sizes a position above its risk amount.
+
+Lots are floored to the volume step: a raw size of 0.135 lots must become 0.13, not 0.14, and a raw
+size that is an exact multiple of the step up to float error (50 / 0.005 / 100000) must stay put.
+
+Run from the repository root:
+    python -m benchmarks.lot_sizing_check
+"""
+import numpy as np
+
+from benchmarks.lot_size_bench import ASSET_CLASSES, OVERRIDES, SYMBOLS, StaticSymbols
+from lot_sizing import LotSizer
+
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f"FAILED: {message}")
+    print(f"ok    {message}")
+
+
+def main():
+    sizer = LotSizer(StaticSymbols(), ASSET_CLASSES, OVERRIDES)
+    contract = SYMBOLS["EURUSD"][0]
+
+    lots = sizer.size_one(1.0850, 1.0813, "EURUSD", 50)
+    check(lots == 0.13, f"0.135 lots is floored to 0.13 (got {lots})")
+    check(lots * contract * (1.0850 - 1.0813) <= 50, "the floored position risks at most the risk amount")
+    check(sizer.size_one(1.0850, 1.0800, "EURUSD", 50) == 0.1, "an exact multiple of the step is kept")
+
+    rng = np.random.default_rng(0)
+    entries = rng.uniform(1.0, 1.2, 10000)
+    stops = entries - rng.uniform(0.0005, 0.02, 10000)
+    risk = 50
+    lots = sizer.size(entries, stops, ["EURUSD"] * len(entries), risk)
+    above_min = lots > SYMBOLS["EURUSD"][1]
+    risked = lots * contract * (entries - stops)
+    check(bool((risked[above_min] <= risk + 1e-6).all()), "no size above volume_min risks more than the risk amount")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Check that a paused MT5Executor holds orders as well as reads until resume().
+
+While ConnectionSupervisor re-initializes the terminal, queued orders must wait rather than run
+against a connection that is shut down; control commands must still get through.
+
+Run from the repository root:
+    python -m benchmarks.mt5_executor_check
+"""
+import time
+
+import mt5_sim
+from mt5_executor import MT5Executor
+
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f"FAILED: {message}")
+    print(f"ok    {message}")
+
+
+def main():
+    sim = mt5_sim.SimulatedMT5(volatility=0)
+    executor = MT5Executor(sim)
+    executor.start()
+    executor.call("initialize")
+    tick = executor.call("symbol_info_tick", "EURUSD")
+
+    executor.pause()
+    order = executor.submit("order_send", {
+        "action": sim.TRADE_ACTION_DEAL, "symbol": "EURUSD", "volume": 0.1, "type": sim.ORDER_TYPE_BUY,
+        "price": tick.ask, "deviation": 20, "magic": 123456,
+    })
+    check_request = executor.submit("order_check", {"symbol": "EURUSD", "volume": 0.1, "type": sim.ORDER_TYPE_BUY})
+    positions = executor.submit("positions_get")
+    control = executor.submit("terminal_info")
+    check(control.result(timeout=2) is not None, "control commands run while paused")
+    time.sleep(0.2)
+    check(not order.done() and not check_request.done(), "order_send and order_check are held while paused")
+    check(not positions.done(), "positions_get is held while paused")
+    check(sim.calls.get("order_send", 0) == 0, "no order reached the terminal while paused")
+
+    executor.resume()
+    result = order.result(timeout=2)
+    check(result is not None and result.retcode == sim.TRADE_RETCODE_DONE, "the held order runs after resume()")
+    check(len(positions.result(timeout=2)) == 1, "positions_get after resume() sees the held order's position")
+    executor.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Micro-benchmark for the signal parser.
+
+Run from the repository root:
+    python -m benchmarks.parser_bench
+"""
+import timeit
+
+from signal_parser import default_parser
+
+SAMPLE_MESSAGES = {
+    "tp_levels": "Buy signal, XAUUSD price = 2650.55 TP-levels: 2660.10 TP-levels: 2671.80 SL: 2640.25",
+    "smart_signal": "Smart Signal Alert!\nBuy EURUSD\nEntry: 1.08512\nTP1: 1.09010\nTP2: 1.09530\nSL: 1.08020",
+    "long_short_entry": "Short entry\nSymbol: BTCUSDT\nEntry price: 65010.5\nTP1: 64000\nTP2: 63000\nSL: 66000",
+    "symbol_json": 'Symbol: ETHUSDT {"side": "LONG", "entry": 3010.5, "tp1": 3100, "tp2": 3200, "stop": 2950}',
+    "direction": "Symbol: US100\nDirection: Sell\nEntry: 20150.5\nTP1: 20050\nTP2: 19950\nSL: 20250",
+}
+
+
+def main(number=20000):
+    parser = default_parser()
+    print(f"{'format':<20}{'us/message':>12}")
+    for name, message in SAMPLE_MESSAGES.items():
+        signal = parser.parse(message)
+        assert signal is not None and signal.format == name, (name, signal)
+        seconds = timeit.timeit(lambda: parser.parse(message), number=number)
+        print(f"{name:<20}{seconds / number * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
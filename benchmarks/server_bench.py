@@ -0,0 +1,140 @@
+"""
+Compare requests per second of the production server and Flask's development server.
+
+Each server runs app4.TradingBot in a child process on the simulated MetaTrader5 module. Concurrent
+clients with keep-alive sessions post webhook signals for a fixed time, each with a fresh
+Idempotency-Key so that no request is answered from the deduplication cache. The child is then
+stopped with SIGTERM, which exercises the graceful shutdown.
+
+In the default synchronous mode every request waits for order_send, so the MT5 executor sets the
+ceiling for both servers; --async-webhook measures the HTTP layer itself.
+
+Run from the repository root:
+    python -m benchmarks.server_bench --clients 32 --duration 10 --async-webhook
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import ThreadingHTTPServer
+
+import requests
+
+import mt5_sim
+from benchmarks.webhook_load import TelegramStandIn
+
+MESSAGE = "Smart Signal Alert!\nBuy EURUSD\nEntry: 1.08512\nTP1: 1.09010\nTP2: 1.09530\nSL: 1.08020"
+
+
+def serve(mode, port, order_latency, async_webhook):
+    """Child process: run the bot on the simulator with the requested server."""
+    telegram = ThreadingHTTPServer(("127.0.0.1", 0), TelegramStandIn)
+    threading.Thread(target=telegram.serve_forever, daemon=True).start()
+
+    import config
+    config.TELEGRAM_API_URL = f"http://127.0.0.1:{telegram.server_port}"
+    config.JOURNAL_PATH = os.path.join(tempfile.mkdtemp(), "journal.db")
+    config.SERVER_HOST = "127.0.0.1"
+    config.SERVER_PORT = port
+    config.PRODUCTION_SERVER = mode == "production"
+    config.ASYNC_WEBHOOK = async_webhook
+    config.LOG_PATH = os.path.join(os.path.dirname(config.JOURNAL_PATH), "bot.log")
+    config.LOG_CONSOLE = False  # the order path logs per request
+    config.LOG_LEVELS = {**config.LOG_LEVELS, "werkzeug": "ERROR", "waitress.queue": "ERROR"}
+    mt5_sim.install(mt5_sim.SimulatedMT5(balance=1e12, latency={"order_send": order_latency}))
+    import app4
+    app4.TradingBot().run()
+
+
+def wait_for_port(port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server did not start on port {port}")
+
+
+def load(port, clients, duration):
+    url = f"http://127.0.0.1:{port}/webhook"
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client():
+        session = requests.Session()
+        local_latencies, local_statuses = [], {}
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                status = session.post(url, data=MESSAGE, headers={"Idempotency-Key": uuid.uuid4().hex}).status_code
+            except requests.RequestException:
+                status = "error"
+            local_latencies.append(time.perf_counter() - started)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1e3,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1e3,
+        "statuses": statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--serve", choices=("production", "development"), help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--order-latency", type=float, default=5, help="simulated order_send latency in ms")
+    parser.add_argument("--async-webhook", action="store_true",
+                        help="answer 202 after parsing, so the server rather than the broker sets the pace")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.order_latency / 1e3, args.async_webhook)
+        return
+
+    for mode in ("development", "production"):
+        child = subprocess.Popen([
+            sys.executable, "-m", "benchmarks.server_bench", "--serve", mode,
+            "--port", str(args.port), "--order-latency", str(args.order_latency),
+        ] + (["--async-webhook"] if args.async_webhook else []))
+        try:
+            wait_for_port(args.port)
+            result = load(args.port, args.clients, args.duration)
+        finally:
+            child.send_signal(signal.SIGTERM)
+            stopped = time.perf_counter()
+            try:
+                child.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                child.kill()
+        print(f"{mode:<12} {result['rps']:8.1f} req/s  p50 {result['p50_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms  "
+              f"statuses {result['statuses']}  shutdown {time.perf_counter() - stopped:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
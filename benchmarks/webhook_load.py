@@ -0,0 +1,114 @@
+"""
+Replay signals against the webhook running on the simulated MetaTrader5 module.
+
+Each line of the signals file is a JSON object with a "message" (or "body") field, or a JSON string.
+Requests are issued open-loop at a fixed rate, and latency is measured from each request's scheduled
+send time, so queueing inside the server shows up in the percentiles.
+
+Run from the repository root:
+    python -m benchmarks.webhook_load --app app4 --rate 200 --count 2000 --order-latency 20
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import mt5_sim
+
+
+class TelegramStandIn(BaseHTTPRequestHandler):
+    """Accepts every sendMessage call so notifications never leave the machine."""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b'{"ok":true}'
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def load_signals(path):
+    messages = []
+    with open(path, encoding="utf-8") as signals:
+        for line in signals:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            messages.append(item if isinstance(item, str) else item.get("message") or item["body"])
+    return messages
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def build_bot(app_module, order_latency, default_latency):
+    telegram = ThreadingHTTPServer(("127.0.0.1", 0), TelegramStandIn)
+    threading.Thread(target=telegram.serve_forever, daemon=True).start()
+
+    import config
+    config.TELEGRAM_API_URL = f"http://127.0.0.1:{telegram.server_port}"
+    mt5_sim.install(mt5_sim.SimulatedMT5(latency={"order_send": order_latency, "default": default_latency}))
+    module = __import__(app_module)
+    return module.TradingBot()
+
+
+def run(bot, messages, rate, count, concurrency):
+    local = threading.local()
+
+    def send(message, scheduled):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = bot.app.test_client()
+        response = client.post("/webhook", data=message.encode("utf-8"))
+        return response.status_code, time.perf_counter() - scheduled
+
+    futures = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i in range(count):
+            scheduled = started + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(send, messages[i % len(messages)], scheduled))
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for _, latency in results]
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    print(f"requests:   {count} at {rate}/s target, {concurrency} client threads")
+    print(f"throughput: {count / elapsed:.1f} req/s")
+    print(f"latency:    p50 {percentile(latencies, 50) * 1e3:.2f} ms  "
+          f"p99 {percentile(latencies, 99) * 1e3:.2f} ms  max {max(latencies) * 1e3:.2f} ms")
+    print(f"statuses:   {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default="app4", choices=("main", "app4"))
+    parser.add_argument("--signals", default="benchmarks/sample_signals.jsonl")
+    parser.add_argument("--rate", type=float, default=100, help="requests per second")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--order-latency", type=float, default=20, help="simulated order_send latency in ms")
+    parser.add_argument("--call-latency", type=float, default=1, help="simulated latency of other calls in ms")
+    args = parser.parse_args()
+
+    bot = build_bot(args.app, args.order_latency / 1e3, args.call_latency / 1e3)
+    run(bot, load_signals(args.signals), args.rate, args.count, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import math
+import time
+from dataclasses import dataclass
+
+ORDER_CHECK_OK = 0  # order_check() retcode when the request would be accepted
+
+
+def split_volume(total, percents, step, volume_min, precision=2):
+    """
+    Split a lot size across TP levels by percentage, one volume per level.
+
+    Volumes are whole multiples of the volume step. When the position is too small to give every
+    level at least volume_min, only the first levels that fit get a leg (their percentages
+    rescaled) and the rest get 0.0. The last leg takes whatever rounding leaves over.
+    """
+    units = int(round(total / step))
+    min_units = max(1, math.ceil(volume_min / step - 1e-9))
+    legs = max(1, min(len(percents), units // min_units))
+    weights = percents[:legs]
+    counts = [max(min_units, math.floor(units * weight / sum(weights))) for weight in weights[:-1]]
+    counts.append(units - sum(counts))
+    while counts[-1] < min_units and legs > 1:
+        largest = max(range(legs - 1), key=counts.__getitem__)
+        if counts[largest] <= min_units:
+            break
+        counts[largest] -= 1
+        counts[-1] += 1
+    return [round(count * step, precision) for count in counts] + [0.0] * (len(percents) - legs)
+
+
+@dataclass(slots=True)
+class BracketLeg:
+    """One child position of a bracket: its TP, its volume and the broker's answers."""
+    tp: float
+    volume: float
+    request: dict
+    check: object = None
+    result: object = None
+
+
+class BracketPlacer:
+    """
+    Opens one position per TP level, each with its own server-side TP.
+
+    All requests are built up front. Every order_check is queued on the MT5 executor before any
+    answer is awaited, and once all of them pass, every order_send is queued the same way, so the
+    legs reach the terminal back-to-back at trade priority.
+    """
+
+    def __init__(self, executor, symbols, percents, precision=2):
+        self.executor = executor
+        self.symbols = symbols
+        self.percents = list(percents)  # share of the lot size per TP level
+        self.precision = precision
+
+    def build(self, request, tp_levels):
+        """Return the legs for an order request; levels beyond the configured percentages get no leg."""
+        levels = tp_levels[:len(self.percents)]
+        meta = self.symbols.get(request["symbol"])
+        step = meta.volume_step or 10.0 ** -self.precision
+        volumes = split_volume(request["volume"], self.percents[:len(levels)], step, meta.volume_min, self.precision)
+        return [
+            BracketLeg(tp, volume, dict(request, volume=volume, tp=tp, comment=f"{request.get('comment', '')} TP{i}"))
+            for i, (tp, volume) in enumerate(zip(levels, volumes), 1)
+            if volume > 0
+        ]
+
+    def place(self, request, tp_levels):
+        """
+        Check and send every leg. Returns (legs, timings) where timings holds check_seconds,
+        send_seconds and total_seconds; nothing is sent if any leg fails its check.
+        """
+        legs = self.build(request, tp_levels)
+        started = time.perf_counter()
+        checks = [self.executor.submit("order_check", leg.request) for leg in legs]
+        for leg, future in zip(legs, checks):
+            leg.check = future.result()
+        checked = time.perf_counter()
+
+        timings = {"check_seconds": checked - started, "send_seconds": 0.0, "total_seconds": checked - started}
+        if any(leg.check is None or leg.check.retcode != ORDER_CHECK_OK for leg in legs):
+            return legs, timings
+
+        sends = [self.executor.submit("order_send", leg.request) for leg in legs]
+        for leg, future in zip(legs, sends):
+            leg.result = future.result()
+        finished = time.perf_counter()
+        timings["send_seconds"] = finished - checked
+        timings["total_seconds"] = finished - started
+        return legs, timings
@@ -0,0 +1,247 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from jsonlog import correlation, correlation_id
+
+log = logging.getLogger(__name__)
+
+FIRST = "first"  # trade the first signal of the window, answer the rest with its result
+NET = "net"  # buys and sells cancel out; the remainder is traded as one order
+MAX_RISK = "max_risk"  # trade the side with more signals, sized for all of them
+POLICIES = (FIRST, NET, MAX_RISK)
+
+
+def merge(signals, policy):
+    """
+    Reduce the signals of one window to (signal, weight), or None when nothing should be traded.
+
+    weight multiplies the risk of the order; the entry, stop and TP levels are those of the first
+    signal on the traded side.
+    """
+    if policy == FIRST:
+        return signals[0], 1
+    buys = [signal for signal in signals if signal.action.lower() == "buy"]
+    sells = [signal for signal in signals if signal.action.lower() != "buy"]
+    if policy == NET:
+        if len(buys) == len(sells):
+            return None
+        side = buys if len(buys) > len(sells) else sells
+        return side[0], abs(len(buys) - len(sells))
+    if policy == MAX_RISK:
+        if len(buys) == len(sells):
+            side = buys if signals[0] in buys else sells
+        else:
+            side = buys if len(buys) > len(sells) else sells
+        return side[0], len(side)
+    raise ValueError(f"Unknown coalescing policy {policy}")
+
+
+class TokenBucket:
+    """Rate limiter allowing rate events per second on average and up to burst at once."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """Take one token. Returns 0.0 on success, otherwise the seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self.rate
+
+
+class _Batch:
+    __slots__ = ("due", "signals", "messages", "futures", "ids")
+
+    def __init__(self, due):
+        self.due = due  # monotonic time at which the window closes
+        self.signals = []
+        self.messages = []
+        self.futures = []
+        self.ids = []  # correlation ID of each signal, bound by the caller of submit()
+
+
+class _Lane:
+    """Per-symbol state: the batch still collecting signals, closed batches waiting, orders at the broker."""
+    __slots__ = ("open", "ready", "in_flight", "pending")
+
+    def __init__(self):
+        self.open = None
+        self.ready = deque()
+        self.in_flight = 0
+        self.pending = 0  # signals accepted but not yet handed to the handler
+
+
+class SignalCoalescer:
+    """
+    Per-symbol coalescing stage in front of the order path.
+
+    The first signal for a symbol opens a window; every signal for that symbol arriving within
+    window seconds joins the same batch. When the window closes the batch is reduced by the policy to
+    at most one order and handler(signal, weight, messages) runs on a worker thread; every signal of
+    the batch gets the handler's (body, status). At most max_in_flight batches per symbol are at
+    the broker at once and a shared token bucket caps the order rate; batches that have to wait stay
+    queued. submit() returns None once max_pending signals of a symbol are waiting, which the
+    webhook answers with 429.
+    """
+
+    def __init__(self, handler, window=0.3, policy=NET, key=None, max_in_flight=1, max_pending=20,
+                 rate=10.0, burst=20, workers=4):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown coalescing policy {policy}")
+        self.handler = handler
+        self.window = window
+        self.policy = policy
+        self.key = key or (lambda signal: signal.symbol.upper())
+        self.max_in_flight = max_in_flight
+        self.max_pending = max_pending
+        self.bucket = TokenBucket(rate, burst)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="coalescer")
+        self._lanes = {}
+        self._timers = []  # heap of (due, sequence, key)
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stopping = False
+        self._thread = None
+        self.received = 0
+        self.batches = 0
+        self.orders = 0
+        self.netted = 0
+        self.rejected = 0
+        self.throttled = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="signal-coalescer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10.0):
+        """Close every open window, run what is queued, then stop."""
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._executor.shutdown(wait=True)
+
+    def submit(self, signal, message=None):
+        """Add a signal to its symbol's window. Returns a Future of (body, status), or None if the lane is full."""
+        key = self.key(signal)
+        with self._lock:
+            if self._stopping:
+                return None
+            lane = self._lanes.get(key)
+            if lane is None:
+                lane = self._lanes[key] = _Lane()
+            if lane.pending >= self.max_pending:
+                self.rejected += 1
+                return None
+            if lane.open is None:
+                lane.open = _Batch(time.monotonic() + self.window)
+                self._schedule(lane.open.due, key)
+            future = Future()
+            lane.open.signals.append(signal)
+            lane.open.messages.append(message)
+            lane.open.futures.append(future)
+            lane.open.ids.append(correlation_id.get())
+            lane.pending += 1
+            self.received += 1
+            return future
+
+    def _schedule(self, due, key):
+        heapq.heappush(self._timers, (due, next(self._sequence), key))
+        self._wakeup.notify()
+
+    def _run(self):
+        with self._lock:
+            while True:
+                if self._stopping:
+                    for key, lane in self._lanes.items():
+                        self._close(key, lane)
+                    if not any(lane.ready for lane in self._lanes.values()):
+                        return
+                    self._wakeup.wait(0.05)
+                    continue
+                now = time.monotonic()
+                while self._timers and self._timers[0][0] <= now:
+                    _, _, key = heapq.heappop(self._timers)
+                    self._close(key, self._lanes[key], now)
+                self._wakeup.wait(self._timers[0][0] - now if self._timers else None)
+
+    def _close(self, key, lane, now=None):
+        """Move the lane's open batch to its ready queue once its window has expired (at once without now)."""
+        if lane.open is not None and (now is None or now >= lane.open.due):
+            lane.ready.append(lane.open)
+            lane.open = None
+            self.batches += 1
+        self._dispatch(key, lane)
+
+    def _dispatch(self, key, lane):
+        """Hand the lane's closed batches to the workers as far as the in-flight and rate limits allow."""
+        while lane.ready and lane.in_flight < self.max_in_flight:
+            delay = self.bucket.take()
+            if delay:
+                self.throttled += 1
+                self._schedule(time.monotonic() + delay, key)
+                return
+            batch = lane.ready.popleft()
+            lane.in_flight += 1
+            lane.pending -= len(batch.signals)
+            self._executor.submit(self._execute, key, lane, batch)
+
+    def _execute(self, key, lane, batch):
+        try:
+            merged = merge(batch.signals, self.policy)
+            if merged is None:
+                self.netted += 1
+                log.info("%d signals for %s netted out", len(batch.signals), key, extra={"signal_ids": batch.ids})
+                result = {"status": "success", "message": "Opposing signals netted out, no order sent"}, 200
+            else:
+                self.orders += 1
+                # The order is logged under the traded signal's ID; the batch record links the others to it
+                with correlation(batch.ids[batch.signals.index(merged[0])]):
+                    if len(batch.signals) > 1:
+                        log.info("%d signals for %s coalesced (%s), risk x%d", len(batch.signals), key, self.policy,
+                                 merged[1], extra={"signal_ids": batch.ids})
+                    result = self.handler(merged[0], merged[1], batch.messages)
+            body, status = result
+            if len(batch.signals) > 1 and isinstance(body, dict):
+                body = dict(body, coalesced=len(batch.signals), policy=self.policy)
+            for future in batch.futures:
+                future.set_result((body, status))
+        except Exception as e:
+            log.exception("Coalesced batch for %s failed: %s", key, e, extra={"signal_ids": batch.ids})
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            with self._lock:
+                lane.in_flight -= 1
+                self._dispatch(key, lane)
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "batches": self.batches,
+            "orders": self.orders,
+            "netted": self.netted,
+            "rejected": self.rejected,
+            "throttled": self.throttled,
+            "pending": sum(lane.pending for lane in list(self._lanes.values())),
+            "in_flight": sum(lane.in_flight for lane in list(self._lanes.values())),
+        }
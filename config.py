@@ -7,15 +7,26 @@ CHANNEL_USERNAME = 'Channel-ID'
 """
 MetaTrader 5 configuration
 """
-MT5_LOGIN = MT5Logon
+MT5_LOGIN = 0  # Account number
 MT5_SERVER = 'Server'
 MT5_PASSWORD = 'Pass'
 MT5_PATH = 'MT5_Path'
+MT5_CONNECT_ATTEMPTS = 5  # initialize() attempts at startup before giving up; 0 keeps trying
+MT5_HEARTBEAT_INTERVAL = 2  # Seconds between terminal_info() checks of the connection
+MT5_HEARTBEAT_TIMEOUT = 5  # Seconds without an answer before the terminal is treated as gone
+MT5_RECONNECT_BACKOFF_INITIAL = 0.5  # First wait between initialize() attempts, in seconds, doubling after each
+MT5_RECONNECT_BACKOFF_MAX = 30  # Longest wait between initialize() attempts, in seconds
 
 """
 RISK
 """
 TRADE_RISK = 50
+LOT_SIZE_OVERRIDES = {  # Fixed lot size per asset class instead of risk-based sizing
+    'stocks': 100.0,
+    'btc': 0.09,
+    'ltc': 30.0,
+    'eth': 1.5,
+}
 
 """
 Order configuration
@@ -23,10 +34,176 @@ Change to 'LIMIT' for limit orders
 """
 ORDER_TYPE = 'MARKET'
 
+"""
+Bracket orders
+Set BRACKET_ORDERS to True to open one position per TP level as soon as the signal arrives, each with
+its own TP on the broker, instead of one position that is partially closed at TP1. Once TP1 is
+reached, the position monitor moves the SL of the remaining positions to entry
+"""
+BRACKET_ORDERS = False
+BRACKET_VOLUME_PERCENTS = [50, 50]  # Share of the lot size for the TP1, TP2, ... positions
+
+"""
+Symbols
+Incoming tickers match broker symbols case-insensitively, with or without the broker's suffix
+(US100 -> US100.cash) and with USDT quotes read as USD (BTCUSDT -> BTCUSD).
+SYMBOL_ALIASES maps anything else; ASSET_CLASSES decides which LOT_SIZE_OVERRIDES entry applies.
+"""
+SYMBOL_ALIASES = {
+    'US500': 'US500.cash',
+    'US100': 'US100.cash',
+}
+ASSET_CLASSES = {
+    'forex': ['EURUSD', 'USDCAD', 'USDJPY'],
+    'indices': ['US100.cash', 'US500.cash'],
+    'stocks': ['PFE', 'BAC', 'AMZN', 'GOOG', 'NVDA', 'WMT', 'ZM', 'T', 'BABA'],
+    'gold_silver': ['XAUUSD', 'XAGUSD'],
+    'btc': ['BTCUSD'],
+    'ltc': ['LTCUSD', 'ADAUSD'],
+    'eth': ['ETHUSD'],
+}
+
+"""
+Webhook mode
+Set ASYNC_WEBHOOK to True to answer 202 with a signal ID as soon as the message is parsed,
+and track the order at /orders/<signal_id>
+"""
+ASYNC_WEBHOOK = False
+ORDER_QUEUE_SIZE = 100  # Signals waiting for the broker beyond this are answered with 503
+ORDER_WORKERS = 1  # Threads taking signals off the queue
+
+"""
+Signal coalescing
+Signals for the same symbol arriving within COALESCE_WINDOW seconds are traded as one order
+"""
+COALESCE_SIGNALS = False
+COALESCE_WINDOW = 0.3  # Seconds a symbol's first signal waits for others to join it
+COALESCE_POLICY = 'net'  # 'first' trades the first signal, 'net' nets buys against sells, 'max_risk' sizes for the larger side
+COALESCE_MAX_IN_FLIGHT = 1  # Orders per symbol at the broker at once
+COALESCE_MAX_PENDING = 20  # Signals waiting per symbol before new ones are answered with 429
+COALESCE_WORKERS = 4  # Threads sending coalesced orders
+ORDER_RATE_LIMIT = 10  # Orders per second sent to the broker across all symbols
+ORDER_RATE_BURST = 20  # Orders that may be sent at once before the rate limit applies
+
 """
 Take Profit / Stop Loss management
 """
 TP1_PERCENT_TAKE = 50  # Take 50% at TP1
 TP1_TOLERANCE_CENTS = 5  # Tolerance before TP1, in cents
+MONITOR_INTERVAL = 1  # Seconds between checks of the managed positions against the terminal; TP1 fires on each tick
+TRAILING_STOP_POINTS = 0  # Trail the stop this many points behind the price after TP1; 0 keeps it at entry
+TRAILING_STEP_POINTS = 0  # Minimum stop improvement in points before the stop is moved again
+
+"""
+Account event stream
+Positions and pending orders are polled once per interval while /events has subscribers, and changes
+are pushed to them
+"""
+ACCOUNT_STREAM_ENABLED = True
+ACCOUNT_STREAM_INTERVAL = 0.5  # Seconds between positions_get()/orders_get() snapshots
+ACCOUNT_STREAM_MAX_SUBSCRIBERS = 4  # Each open stream holds one server thread; keep this below SERVER_THREADS
+ACCOUNT_STREAM_QUEUE_SIZE = 1000  # Events buffered per subscriber before it is told to resync
+ACCOUNT_STREAM_KEEPALIVE = 15  # Seconds between keep-alive comments on an idle stream
 
+"""
+Historical bar store
+Kept current with `python bar_store.py sync`; backtests read it with --store
+"""
+BAR_STORE_PATH = 'bars'
+BAR_STORE_SYMBOLS = ['EURUSD', 'XAUUSD', 'US100.cash', 'US500.cash', 'BTCUSD']
+BAR_STORE_TIMEFRAMES = ['M1', 'H1']
+BAR_STORE_DAYS = 365  # History fetched the first time a symbol and timeframe are synced
 
+"""
+Order journal
+Signals, orders and monitored positions are logged here so monitoring resumes after a restart. Events of
+released positions are deleted at startup and every JOURNAL_COMPACT_INTERVAL seconds
+"""
+JOURNAL_PATH = 'journal.db'
+JOURNAL_COMMIT_INTERVAL = 0.05  # Seconds events are gathered into one write
+JOURNAL_COMPACT_INTERVAL = 3600  # 0 disables compaction
+JOURNAL_RETENTION_DAYS = 0  # Days signals and orders are kept for reports; 0 keeps them forever
+
+"""
+Web server
+PRODUCTION_SERVER serves the webhook with waitress; set it to False to use Flask's development server
+"""
+SERVER_HOST = '0.0.0.0'
+SERVER_PORT = 80
+PRODUCTION_SERVER = True
+SERVER_THREADS = 8  # Requests handled concurrently; MT5 calls are still made one at a time
+SERVER_CONNECTION_LIMIT = 100  # Open client connections accepted at once
+SERVER_KEEPALIVE_TIMEOUT = 120  # Seconds an idle keep-alive connection is held open
+MAX_REQUEST_BODY_SIZE = 64 * 1024  # Bytes; larger webhook bodies are refused with 413
+SHUTDOWN_DRAIN_TIMEOUT = 30  # Seconds to finish in-flight requests and queued orders on shutdown
+
+"""
+Signal deduplication
+Alerts resent within DEDUP_TTL seconds (same symbol, side, entry, SL and TPs, or the same
+idempotency header) are answered with the first order's response instead of trading again
+"""
+DEDUP_MAX_ENTRIES = 10000  # Signals remembered; the least recently seen are evicted first
+DEDUP_TTL = 300  # Seconds a signal is remembered
+DEDUP_HEADER = 'Idempotency-Key'  # Request header that overrides the signal-based key
+DEDUP_WAIT_TIMEOUT = 30  # Seconds a duplicate waits for the first order's response
+
+"""
+Symbol metadata cache
+"""
+SYMBOL_CACHE_TTL = 300  # Seconds before cached symbol_info data is refreshed
+
+"""
+Market data
+Symbols listed here are polled from startup; others are added on their first order
+"""
+MARKET_DATA_SYMBOLS = []
+MARKET_DATA_INTERVAL = 0.1  # Seconds between tick polls
+MARKET_DATA_USE_COPY_TICKS = False  # Fetch every tick with copy_ticks_from instead of sampling symbol_info_tick
+MARKET_DATA_MAX_AGE = 2  # Seconds after which a buffered quote is too old to trade on
+TICK_BUFFER_SIZE = 4096  # Ticks kept per symbol
+
+"""
+Telegram notifications
+"""
+TELEGRAM_API_URL = 'https://api.telegram.org'
+TELEGRAM_QUEUE_SIZE = 1000  # Messages beyond this are dropped instead of delaying orders
+TELEGRAM_COALESCE_WINDOW = 0.5  # Seconds to wait for more messages to merge into one post
+TELEGRAM_TIMEOUT = 5  # Seconds before a Telegram request is abandoned
+
+"""
+Multi-account fan-out
+Each signal is parsed once and sent to every account below in parallel, one worker process per account.
+Leave empty to trade only the account configured above.
+Example entry: {'name': 'acct1', 'login': 123, 'server': 'Server', 'password': 'Pass', 'path': 'MT5_Path', 'risk': 50}
+"""
+FANOUT_ACCOUNTS = []
+FANOUT_MT5_MODULE = 'MetaTrader5'  # Module each worker imports for its terminal connection
+
+"""
+Logging
+Records are written as JSON lines by a background thread, rotated by size. LOG_LEVELS overrides the
+level per module (logger name); set 'position_monitor.ticks': 'DEBUG' to log every quote the monitor
+sees. LOG_SAMPLING keeps one record in N from the high-volume loggers listed
+"""
+LOG_PATH = 'bot.log'  # Leave empty to log to the console only
+LOG_LEVEL = 'INFO'
+LOG_LEVELS = {'werkzeug': 'WARNING'}
+LOG_SAMPLING = {'position_monitor.ticks': 100, 'market_data.ticks': 1000}
+LOG_MAX_BYTES = 10 * 1024 * 1024  # Size at which the log file is rotated
+LOG_BACKUP_COUNT = 5  # Rotated files kept
+LOG_CONSOLE = True  # Also write records to standard output
+LOG_QUEUE_SIZE = 10000  # Records waiting for the writer; more are dropped instead of blocking
+
+"""
+Pre-trade risk limits
+Every order is checked against an in-memory book of open positions before it is sent; the book is
+rebuilt from the terminal every RISK_RESYNC_INTERVAL seconds. Amounts are in account currency and
+0 disables a limit. Free margin is always checked while RISK_LIMITS_ENABLED is on
+"""
+RISK_LIMITS_ENABLED = True
+RISK_MAX_POSITIONS = 0  # Open positions at once
+RISK_MAX_OPEN_RISK = 0  # Loss if every open stop loss is hit; a position without a stop counts in full
+RISK_MAX_CURRENCY_EXPOSURE = 0  # Net notional per currency, e.g. long EUR from EURUSD buys
+RISK_MAX_CLASS_EXPOSURE = {}  # Gross notional per asset class, e.g. {'forex': 500000, 'btc': 50000}
+RISK_MIN_MARGIN_LEVEL = 0  # Equity / margin after the trade, in percent
+RISK_RESYNC_INTERVAL = 5  # Seconds between account_info()/positions_get() snapshots
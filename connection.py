@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from tenacity import Retrying, retry_if_result, stop_after_attempt, stop_never, wait_exponential_jitter
+
+log = logging.getLogger(__name__)
+
+
+class ConnectionSupervisor:
+    """
+    Owns the terminal connection: initializes it with backoff and brings it back when it drops.
+
+    A heartbeat thread calls terminal_info() at control priority every heartbeat_interval. When the
+    call fails, times out or reports the terminal offline, the executor is paused so that queued
+    orders wait rather than fail, initialize() is retried with exponential backoff until it succeeds,
+    the executor resumes and every on_connect callback runs (the bots pre-load account info, the
+    symbol cache and Market Watch there).
+    """
+
+    def __init__(self, executor, credentials, heartbeat_interval=2.0, heartbeat_timeout=5.0,
+                 backoff_initial=0.5, backoff_max=30.0):
+        self.executor = executor
+        self.credentials = credentials  # keyword arguments for mt5.initialize()
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.on_connect = []
+        self.connected = False
+        self._stopping = threading.Event()
+        self._thread = None
+        self.connect_seconds = 0.0
+        self.reconnects = 0
+        self.last_reconnect_seconds = 0.0
+        self.max_reconnect_seconds = 0.0
+        self.heartbeats = 0
+        self.heartbeat_failures = 0
+        self.last_heartbeat_seconds = 0.0
+
+    def _call(self, name, *args, **kwargs):
+        return self.executor.submit(name, *args, **kwargs).result(self.heartbeat_timeout)
+
+    def _initialize(self):
+        if self.executor.submit("initialize", **self.credentials).result():
+            return True
+        log.warning("initialize() failed, error code = %s", self._call("last_error"))
+        return False
+
+    def _before_sleep(self, state):
+        log.info("Retrying MetaTrader 5 initialize in %.1fs (attempt %d)", state.next_action.sleep, state.attempt_number)
+
+    def connect(self, attempts=None):
+        """Initialize the terminal at startup, retrying with backoff up to attempts times (forever if None)."""
+        started = time.perf_counter()
+        self.connected = self._retry(attempts)
+        self.connect_seconds = time.perf_counter() - started
+        return self.connected
+
+    def _retry(self, attempts):
+        retrying = Retrying(
+            stop=(stop_after_attempt(attempts) if attempts else stop_never) | (lambda state: self._stopping.is_set()),
+            wait=wait_exponential_jitter(initial=self.backoff_initial, max=self.backoff_max),
+            retry=retry_if_result(lambda connected: not connected),
+            retry_error_callback=lambda state: False,
+            before_sleep=self._before_sleep,
+            sleep=self._stopping.wait,
+        )
+        return retrying(self._initialize)
+
+    def reconnect(self):
+        """Pause trading, re-initialize the terminal, resume and re-run the on_connect callbacks."""
+        started = time.perf_counter()
+        self.connected = False
+        self.executor.pause()
+        log.warning("MetaTrader 5 connection lost, reconnecting with orders held in the queue")
+        try:
+            self._call("shutdown")
+        except Exception as e:
+            log.warning("MetaTrader 5 shutdown before reconnect failed: %s", e)
+        self.connected = self._retry(None)
+        self.executor.resume()
+        if not self.connected:
+            return False
+        self.run_callbacks()
+        elapsed = time.perf_counter() - started
+        self.reconnects += 1
+        self.last_reconnect_seconds = elapsed
+        self.max_reconnect_seconds = max(self.max_reconnect_seconds, elapsed)
+        log.info("MetaTrader 5 reconnected in %.2fs", elapsed)
+        return True
+
+    def run_callbacks(self):
+        for callback in self.on_connect:
+            try:
+                callback()
+            except Exception as e:
+                log.exception("Connection callback failed: %s", e)
+
+    def heartbeat(self):
+        """Return True if the terminal answers terminal_info() and is connected to the trade server."""
+        started = time.perf_counter()
+        try:
+            info = self._call("terminal_info")
+        except FutureTimeout:
+            info = None
+        self.heartbeats += 1
+        self.last_heartbeat_seconds = time.perf_counter() - started
+        if info is None or not info.connected:
+            self.heartbeat_failures += 1
+            return False
+        return True
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="mt5-connection", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopping.wait(self.heartbeat_interval):
+            try:
+                if not self.heartbeat():
+                    self.reconnect()
+            except Exception as e:
+                log.exception("Connection supervisor failed: %s", e)
+
+    def stats(self):
+        return {
+            "connected": self.connected,
+            "connect_seconds": self.connect_seconds,
+            "reconnects": self.reconnects,
+            "last_reconnect_seconds": self.last_reconnect_seconds,
+            "max_reconnect_seconds": self.max_reconnect_seconds,
+            "heartbeats": self.heartbeats,
+            "heartbeat_failures": self.heartbeat_failures,
+            "last_heartbeat_seconds": self.last_heartbeat_seconds,
+        }
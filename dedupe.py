@@ -0,0 +1,79 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+def signal_key(signal):
+    """Canonical digest of the fields that make two alerts the same trade."""
+    canonical = "|".join([
+        signal.symbol.strip().upper(),
+        signal.action.strip().lower(),
+        repr(float(signal.entry_price)),
+        repr(float(signal.stop_loss)),
+        ",".join(repr(float(tp)) for tp in signal.tp_levels),
+    ])
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+
+
+class DedupCache:
+    """
+    Bounded LRU cache of signal responses with a time-to-live.
+
+    The first request for a key claims it and receives a Future to resolve with its response;
+    requests for the same key within the TTL get that Future back and answer with its result,
+    waiting for it if the first order is still in flight. Lookups and inserts are O(1).
+    """
+
+    def __init__(self, max_entries=10000, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, Future)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for(signal, idempotency_key=None):
+        """Use the client's idempotency key when it sends one, otherwise the signal's digest."""
+        if idempotency_key:
+            return "key:" + idempotency_key
+        return signal_key(signal)
+
+    def claim(self, key):
+        """Return (future, True) for the first request with this key, or (existing future, False) for a duplicate."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], False
+
+            self.misses += 1
+            future = Future()
+            self._entries[key] = (now + self.ttl, future)
+            self._entries.move_to_end(key)
+            self._evict(now)
+            return future, True
+
+    def forget(self, key):
+        """Drop a key so that the next request with it is processed again."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _evict(self, now):
+        while self._entries:
+            expires_at, _ = next(iter(self._entries.values()))
+            if len(self._entries) <= self.max_entries and expires_at > now:
+                break
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
@@ -0,0 +1,354 @@
+import importlib
+import itertools
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+
+from lot_sizing import LotSizer
+from risk_book import RiskBook
+from symbol_cache import SymbolCache
+from symbol_resolver import SymbolResolver
+
+log = logging.getLogger(__name__)
+
+_READY = "ready"
+
+# Job kinds a worker accepts
+_SIGNAL = "signal"  # (signal, weight): size and send an order
+_CALL = "call"  # (name, args, kwargs): run mt5.<name>, e.g. for the parent's position monitor
+
+
+def execute_signal(mt5, resolver, lot_sizer, signal, risk, order_type="MARKET", risk_book=None):
+    """
+    Size and send one signal on an already initialized terminal connection. Returns (body, status).
+
+    A successful body describes the fill (order_id, symbol, volume, price, sl, tp_levels), so that
+    the parent can hand the position to its monitor and journal.
+    """
+    symbols = resolver.symbols
+    resolved = resolver.resolve(signal.symbol)
+    info = symbols.get(resolved.symbol) if resolved is not None else None
+    if info is None:
+        return {"status": "error", "message": f"Symbol {signal.symbol} is not found"}, 400
+    symbol = resolved.symbol
+    if not info.visible:
+        if not mt5.symbol_select(symbol, True):
+            return {"status": "error", "message": f"Failed to select symbol {symbol}"}, 400
+        symbols.mark_visible(symbol)
+
+    entry_price = round(signal.entry_price, info.digits)
+    stop_loss = round(signal.stop_loss, info.digits)
+    tp_levels = [round(tp, info.digits) for tp in signal.tp_levels]
+    lot_size = lot_sizer.size_one(entry_price, stop_loss, symbol, risk)
+
+    tick = mt5.symbol_info_tick(symbol)
+    if tick is None:
+        return {"status": "error", "message": "Failed to get tick data"}, 500
+
+    buy = signal.action.lower() == 'buy'
+    if order_type.upper() == 'LIMIT':
+        action = mt5.TRADE_ACTION_PENDING
+        type_ = mt5.ORDER_TYPE_BUY_LIMIT if buy else mt5.ORDER_TYPE_SELL_LIMIT
+        price = entry_price
+    else:
+        action = mt5.TRADE_ACTION_DEAL
+        type_ = mt5.ORDER_TYPE_BUY if buy else mt5.ORDER_TYPE_SELL
+        price = tick.ask if buy else tick.bid
+
+    reservation = None
+    if risk_book is not None:
+        reservation, breach = risk_book.reserve(symbol, signal.action, lot_size, entry_price, stop_loss)
+        if breach is not None:
+            return {"status": "error", "message": breach}, 400
+    try:
+        result = mt5.order_send({
+            "action": action,
+            "symbol": symbol,
+            "volume": lot_size,
+            "type": type_,
+            "price": price,
+            "sl": stop_loss,
+            "tp": tp_levels[0] if tp_levels else None,
+            "deviation": 20,
+            "magic": 123456,
+            "comment": "MB_Strategy",
+            "type_time": mt5.ORDER_TIME_GTC,
+            "type_filling": mt5.ORDER_FILLING_IOC,
+        })
+        if result is None or result.retcode != mt5.TRADE_RETCODE_DONE:
+            return {
+                "status": "error",
+                "message": "Order placement failed",
+                "details": str(result),
+                "mt5_error": str(mt5.last_error()),
+            }, 500
+        if risk_book is not None:
+            risk_book.add(result.order, symbol, signal.action, lot_size, result.price or price, stop_loss)
+    finally:
+        if reservation is not None:
+            risk_book.release(reservation)
+    return {
+        "status": "success",
+        "order_id": result.order,
+        "symbol": symbol,
+        "action": signal.action,
+        "volume": lot_size,
+        "price": result.price or price,
+        "sl": stop_loss,
+        "tp_levels": tp_levels,
+    }, 200
+
+
+def _account_worker(account, mt5_module, order_type, aliases, asset_classes, overrides, default_risk, risk_limits,
+                    inbox, outbox):
+    """Process entry point: own one terminal connection, execute every signal and run the parent's calls on it."""
+    name = account["name"]
+    mt5 = importlib.import_module(mt5_module)
+    if not mt5.initialize(
+            path=account.get("path"),
+            login=account.get("login"),
+            server=account.get("server"),
+            password=account.get("password"),
+    ):
+        outbox.put((_READY, name, {"status": "error", "message": f"initialize() failed: {mt5.last_error()}"},
+                    500, time.time()))
+        return
+
+    symbols = SymbolCache(mt5)
+    symbols.warm()
+    resolver = SymbolResolver(mt5, symbols, aliases, asset_classes, overrides)
+    resolver.build()
+    resolver.preselect()
+    lot_sizer = LotSizer(symbols, resolver.classes, overrides)
+    risk = account.get("risk", default_risk)
+    risk_book = None
+    if risk_limits is not None:
+        risk_book = RiskBook(mt5, symbols, resolver.classes, **risk_limits)
+        next_resync = time.monotonic()
+    outbox.put((_READY, name, {"status": "success"}, 200, time.time()))
+
+    while True:
+        if risk_book is not None and time.monotonic() >= next_resync:
+            # Resynced between jobs rather than by the book's own thread: MetaTrader5 is not thread-safe
+            risk_book.resync()
+            next_resync = time.monotonic() + risk_book.resync_interval
+        try:
+            job = inbox.get(timeout=None if risk_book is None else max(0.0, next_resync - time.monotonic()))
+        except queue.Empty:
+            continue
+        if job is None:
+            break
+        job_id, kind, payload = job
+        try:
+            if kind == _CALL:
+                command, args, kwargs = payload
+                body, status = getattr(mt5, command)(*args, **kwargs), 200
+            else:
+                signal, weight = payload
+                body, status = execute_signal(mt5, resolver, lot_sizer, signal, risk * weight, order_type, risk_book)
+        except Exception as e:
+            body, status = {"status": "error", "message": str(e)}, 500
+        outbox.put((job_id, name, body, status, time.time()))
+    mt5.shutdown()
+
+
+class AccountStats:
+    __slots__ = ("orders", "failures", "latency_total", "latency_max", "latency_last")
+
+    def __init__(self):
+        self.orders = 0
+        self.failures = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.latency_last = 0.0
+
+    def record(self, latency, ok):
+        self.orders += 1
+        self.failures += not ok
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        self.latency_last = latency
+
+    def as_dict(self):
+        return {
+            "orders": self.orders,
+            "failures": self.failures,
+            "avg_latency_ms": self.latency_total / self.orders * 1e3 if self.orders else 0.0,
+            "max_latency_ms": self.latency_max * 1e3,
+            "last_latency_ms": self.latency_last * 1e3,
+        }
+
+
+class FanoutDispatcher:
+    """
+    Copies each parsed signal to several MT5 accounts, one worker process per account.
+
+    Every worker owns its own terminal connection and risk setting, so orders for all accounts go
+    out in parallel. With risk_limits (RiskBook keyword arguments) each worker checks its orders
+    against its own account's book. terminal() gives a module-like view of one account that runs its
+    calls in the worker, so the parent can manage the fan-out positions with a PositionMonitor.
+    mt5_module names the module workers import, which lets a stand-in replace MetaTrader5.
+    """
+
+    def __init__(self, accounts, mt5_module="MetaTrader5", order_type="MARKET", aliases=None, asset_classes=None,
+                 overrides=None, default_risk=50, risk_limits=None, timeout=30.0):
+        self.accounts = accounts
+        self.mt5_module = mt5_module
+        self.order_type = order_type
+        self.aliases = aliases or {}
+        self.asset_classes = asset_classes or {}  # asset class -> broker symbols
+        self.overrides = overrides or {}
+        self.default_risk = default_risk
+        self.risk_limits = risk_limits
+        self.timeout = timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._outbox = self._context.Queue()
+        self._inboxes = {}
+        self._processes = []
+        self._job_ids = itertools.count(1)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._collector = None
+        self.ready = {}
+        self.account_stats = {account["name"]: AccountStats() for account in accounts}
+        self.skew_last = 0.0
+        self.skew_max = 0.0
+
+    def start(self, ready_timeout=60.0):
+        """Start one worker per account and wait until each has connected (or failed to)."""
+        for account in self.accounts:
+            inbox = self._context.Queue()
+            process = self._context.Process(
+                target=_account_worker,
+                args=(account, self.mt5_module, self.order_type, self.aliases, self.asset_classes, self.overrides,
+                      self.default_risk, self.risk_limits, inbox, self._outbox),
+                name=f"mt5-account-{account['name']}",
+                daemon=True,
+            )
+            process.start()
+            self._inboxes[account["name"]] = inbox
+            self._processes.append(process)
+
+        deadline = time.monotonic() + ready_timeout
+        while len(self.ready) < len(self.accounts) and time.monotonic() < deadline:
+            try:
+                _, name, body, status, _ = self._outbox.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            self.ready[name] = status == 200
+            if status != 200:
+                log.error("Account %s failed to start: %s", name, body["message"])
+
+        self._collector = threading.Thread(target=self._collect, name="fanout-collector", daemon=True)
+        self._collector.start()
+
+    def stop(self, timeout=10.0):
+        for inbox in self._inboxes.values():
+            inbox.put(None)
+        for process in self._processes:
+            process.join(timeout)
+        self._outbox.put(None)
+        if self._collector is not None:
+            self._collector.join(timeout)
+            self._collector = None
+
+    def dispatch(self, signal, weight=1):
+        """Send a signal to every ready account and wait for their results; weight scales each account's risk."""
+        names = [name for name, ok in self.ready.items() if ok]
+        job_id, job, sent_at = self._run(names, _SIGNAL, (signal, weight))
+
+        accounts = {}
+        fill_times = []
+        for name in names:
+            if name not in job["results"]:
+                accounts[name] = {"status": 504, "result": {"status": "error", "message": "Timed out"}}
+                continue
+            body, status, finished_at = job["results"][name]
+            latency = finished_at - sent_at
+            self.account_stats[name].record(latency, status == 200)
+            if status == 200:
+                fill_times.append(finished_at)
+            accounts[name] = {"status": status, "result": body, "latency_ms": latency * 1e3}
+
+        skew = max(fill_times) - min(fill_times) if fill_times else 0.0
+        self.skew_last = skew
+        self.skew_max = max(self.skew_max, skew)
+        return {"signal_id": job_id, "accounts": accounts, "skew_ms": skew * 1e3}
+
+    def call(self, name, command, *args, **kwargs):
+        """Run mt5.<command>(*args, **kwargs) in one account's worker and return the result, None on failure."""
+        _, job, _ = self._run([name], _CALL, (command, args, kwargs))
+        body, status, _ = job["results"].get(name, ("timed out", 504, None))
+        if status != 200:
+            log.error("%s on account %s failed: %s", command, name, body)
+            return None
+        return body
+
+    def terminal(self, name):
+        return AccountTerminal(self, name)
+
+    def _run(self, names, kind, payload):
+        """Send one job to the named workers and wait for their results. Returns (job_id, job, sent_at)."""
+        job_id = next(self._job_ids)
+        job = {"results": {}, "expected": len(names), "done": threading.Event()}
+        if not names:
+            job["done"].set()
+        with self._lock:
+            self._pending[job_id] = job
+
+        sent_at = time.time()
+        for name in names:
+            self._inboxes[name].put((job_id, kind, payload))
+        job["done"].wait(self.timeout)
+        with self._lock:
+            self._pending.pop(job_id, None)
+        return job_id, job, sent_at
+
+    def stats(self):
+        return {
+            "accounts": {name: dict(stats.as_dict(), ready=self.ready.get(name, False))
+                         for name, stats in self.account_stats.items()},
+            "last_skew_ms": self.skew_last * 1e3,
+            "max_skew_ms": self.skew_max * 1e3,
+        }
+
+    def _collect(self):
+        while True:
+            item = self._outbox.get()
+            if item is None:
+                return
+            job_id, name, body, status, finished_at = item
+            if job_id == _READY:
+                self.ready[name] = status == 200
+                continue
+            with self._lock:
+                job = self._pending.get(job_id)
+            if job is None:
+                continue
+            job["results"][name] = (body, status, finished_at)
+            if len(job["results"]) >= job["expected"]:
+                job["done"].set()
+
+
+class AccountTerminal:
+    """Module-like view of one fan-out account: calls run in its worker process, constants are read locally."""
+
+    def __init__(self, dispatcher, name):
+        self._dispatcher = dispatcher
+        self._name = name
+        self._module = importlib.import_module(dispatcher.mt5_module)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name.isupper():
+            return getattr(self._module, name)
+
+        def call(*args, **kwargs):
+            return self._dispatcher.call(self._name, name, *args, **kwargs)
+
+        call.__name__ = name
+        self.__dict__[name] = call
+        return call
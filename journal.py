@@ -0,0 +1,183 @@
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    ticket INTEGER,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS events_kind ON events (kind, id);
+CREATE INDEX IF NOT EXISTS events_ticket ON events (ticket, kind);
+"""
+
+# Event kinds
+SIGNAL = "signal"  # parsed alert
+ORDER = "order"  # order_send result
+MANAGE = "manage"  # position handed to the monitor
+RELEASE = "release"  # position no longer managed
+STAGE = "stage"  # managed position moved on to its next step
+
+
+class Journal:
+    """
+    Append-only event log in SQLite (WAL mode) with group commit.
+
+    record() only puts the event on a queue. A writer thread takes everything that arrives within
+    commit_interval of the first pending event and commits it as one transaction, so a burst of
+    orders costs one fsync instead of one per event. When it starts and every compact_interval
+    seconds after that, the writer also runs compact(). This keeps startup replay and the file
+    size bounded.
+    """
+
+    def __init__(self, path, commit_interval=0.05, max_batch=500, retention=0, compact_interval=3600):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.max_batch = max_batch
+        self.retention = retention  # seconds signals and orders are kept; 0 keeps them for reports indefinitely
+        self.compact_interval = compact_interval  # 0 disables compaction by the writer
+        self._queue = queue.SimpleQueue()
+        self._stopping = threading.Event()
+        self._thread = None
+        self.written = 0
+        self.commits = 0
+        self.failed = 0
+        self.compacted = 0
+        connection = self._connect()
+        connection.executescript(SCHEMA)
+        connection.close()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def record(self, kind, ticket=None, **payload):
+        self._queue.put((time.time(), kind, ticket, json.dumps(payload) if payload else None))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="journal-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stop the writer after it has committed everything recorded so far."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        connection = self._connect()
+        next_compact = time.monotonic()
+        try:
+            while not (self._stopping.is_set() and self._queue.empty()):
+                if self.compact_interval and time.monotonic() >= next_compact:
+                    self._compact(connection)
+                    next_compact = time.monotonic() + self.compact_interval
+                try:
+                    batch = [self._queue.get(timeout=0.2)]
+                except queue.Empty:
+                    continue
+                deadline = time.monotonic() + self.commit_interval
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                self._commit(connection, batch)
+        finally:
+            connection.close()
+
+    def _commit(self, connection, batch):
+        try:
+            with connection:
+                connection.executemany("INSERT INTO events (ts, kind, ticket, payload) VALUES (?, ?, ?, ?)", batch)
+        except sqlite3.Error as e:
+            self.failed += len(batch)
+            log.error("Failed to write %d journal events: %s", len(batch), e)
+            return
+        self.written += len(batch)
+        self.commits += 1
+
+    def compact(self):
+        """
+        Delete the manage/stage/release events of released positions and, with a retention, older
+        signals and orders, then checkpoint the WAL. Returns the number of events deleted.
+        """
+        connection = self._connect()
+        try:
+            return self._compact(connection)
+        finally:
+            connection.close()
+
+    def _compact(self, connection):
+        started = time.monotonic()
+        try:
+            with connection:
+                # Everything up to a position's last release; a ticket managed again later keeps its new events
+                deleted = connection.execute(
+                    "DELETE FROM events WHERE kind IN (?, ?, ?) AND id <= "
+                    "(SELECT MAX(r.id) FROM events AS r WHERE r.ticket = events.ticket AND r.kind = ?)",
+                    (MANAGE, STAGE, RELEASE, RELEASE)).rowcount
+                if self.retention:
+                    deleted += connection.execute(
+                        "DELETE FROM events WHERE ts < ? AND kind NOT IN (?, ?)",
+                        (time.time() - self.retention, MANAGE, STAGE)).rowcount
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            log.error("Journal compaction failed: %s", e)
+            return 0
+        self.compacted += deleted
+        log.info("Journal compacted: %d events deleted in %.2fs", deleted, time.monotonic() - started,
+                 extra={"deleted": deleted})
+        return deleted
+
+    def managed_positions(self, account=None):
+        """
+        Replay manage/stage/release events and return {ticket: payload} for positions still under management.
+
+        Stage events are merged into the position's manage payload, so it holds the latest stage. Only
+        positions of account are returned: a fan-out account's name, or None for the bot's own account.
+        """
+        connection = self._connect()
+        try:
+            rows = connection.execute("SELECT kind, ticket, payload FROM events WHERE kind IN (?, ?, ?) ORDER BY id",
+                                      (MANAGE, STAGE, RELEASE))
+            managed = {}
+            for kind, ticket, payload in rows:
+                if kind == MANAGE:
+                    entry = json.loads(payload)
+                    if entry.get("account") == account:
+                        managed[ticket] = entry
+                elif kind == STAGE:
+                    if ticket in managed:
+                        managed[ticket].update(json.loads(payload))
+                else:
+                    managed.pop(ticket, None)
+            return managed
+        finally:
+            connection.close()
+
+    def events(self, kind):
+        """Return (ts, ticket, payload) for every event of one kind, oldest first."""
+        connection = self._connect()
+        try:
+            rows = connection.execute("SELECT ts, ticket, payload FROM events WHERE kind = ? ORDER BY id", (kind,))
+            return [(ts, ticket, json.loads(payload) if payload else {}) for ts, ticket, payload in rows]
+        finally:
+            connection.close()
+
+    def stats(self):
+        return {"pending": self._queue.qsize(), "written": self.written, "commits": self.commits, "failed": self.failed,
+                "compacted": self.compacted}
@@ -0,0 +1,163 @@
+"""
+Structured logging: JSON lines written by a background thread.
+
+Modules log through the standard library (logging.getLogger(__name__)). LogWriter puts a queue
+handler on the root logger, so the calling thread only builds the record and queues it; JSON
+encoding and file I/O happen on a QueueListener thread. Every record carries the correlation ID
+bound with correlation(), which lets one signal be followed from the webhook through its order to
+the position monitor.
+"""
+import contextlib
+import contextvars
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import uuid
+from datetime import datetime, timezone
+
+correlation_id = contextvars.ContextVar("correlation_id", default=None)
+
+# Attributes every LogRecord has; anything else on a record was passed with extra= and is logged as a field
+RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def new_id():
+    return uuid.uuid4().hex
+
+
+@contextlib.contextmanager
+def correlation(value):
+    """Tag every record logged in this context (thread or task) with value."""
+    token = correlation_id.set(value)
+    try:
+        yield value
+    finally:
+        correlation_id.reset(token)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, thread, message, correlation ID and extra fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in RECORD_ATTRIBUTES:
+                entry[name] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class Sampler(logging.Filter):
+    """
+    Passes one record in every rate from the loggers named in rates; warnings and errors always pass.
+
+    Passed records get a sample_rate field so counts can be scaled back up.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = dict(rates)
+        self._counters = {name: itertools.count() for name in self.rates}
+
+    def filter(self, record):
+        rate = self.rates.get(record.name)
+        if not rate or rate <= 1 or record.levelno >= logging.WARNING:
+            return True
+        if next(self._counters[record.name]) % rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queues records without blocking; formatting is left to the listener thread."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Resolve the message now, since its arguments may change once the caller moves on
+        record.msg = record.getMessage()
+        record.args = None
+        record.correlation_id = correlation_id.get()
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogWriter:
+    """
+    Routes every logger to a size-rotated JSON file and, optionally, the console, from one background thread.
+
+    levels maps logger names to level names, e.g. {"position_monitor": "DEBUG"}; sampling maps logger
+    names to N for high-volume loggers that should only keep one record in N. When the queue is full,
+    records are dropped (counted in dropped) rather than slowing the caller.
+    """
+
+    def __init__(self, path=None, level="INFO", levels=None, sampling=None, max_bytes=10 * 1024 * 1024,
+                 backup_count=5, console=True, queue_size=10000):
+        self.path = path
+        self.level = level
+        self.levels = levels or {}
+        self.sampling = sampling or {}
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.console = console
+        self.queue = queue.Queue(maxsize=queue_size)
+        self._handler = None
+        self._listener = None
+
+    def start(self):
+        if self._listener is not None:
+            return
+        formatter = JsonFormatter()
+        outputs = []
+        if self.path:
+            outputs.append(logging.handlers.RotatingFileHandler(
+                self.path, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding="utf-8"))
+        if self.console:
+            outputs.append(logging.StreamHandler(sys.stdout))
+        for output in outputs:
+            output.setFormatter(formatter)
+        self._listener = logging.handlers.QueueListener(self.queue, *outputs)
+        self._listener.start()
+
+        self._handler = _QueueHandler(self.queue)
+        self._handler.addFilter(Sampler(self.sampling))
+        root = logging.getLogger()
+        root.setLevel(self.level)
+        root.addHandler(self._handler)
+        for name, level in self.levels.items():
+            logging.getLogger(name).setLevel(level)
+
+    def stop(self):
+        """Write out every queued record, then close the files."""
+        if self._listener is None:
+            return
+        logging.getLogger().removeHandler(self._handler)
+        self._listener.stop()
+        for output in self._listener.handlers:
+            output.close()
+        self._listener = None
+
+    @property
+    def dropped(self):
+        return self._handler.dropped if self._handler is not None else 0
+
+    def stats(self):
+        return {"queued": self.queue.qsize(), "dropped": self.dropped}
@@ -0,0 +1,62 @@
+import numpy as np
+
+
+class LotSizer:
+    """
+    Risk-based lot sizing for many signals at once.
+
+    lots = risk / |entry - stop| / contract_size, replaced by a fixed lot where the symbol's asset
+    class has an override, then floored to volume_step and clamped to volume_min/volume_max.
+    """
+
+    def __init__(self, symbols, asset_classes, overrides=None, precision=2):
+        self.symbols = symbols
+        self.asset_classes = asset_classes  # symbol -> asset class name
+        self.overrides = overrides or {}  # asset class name -> fixed lot size
+        self.precision = precision
+
+    def asset_class(self, symbol):
+        return self.asset_classes.get(symbol.strip())
+
+    def _symbol_arrays(self, symbols):
+        """Look up each distinct symbol once and scatter its metadata back to every position."""
+        unique, inverse = np.unique(np.asarray(symbols, dtype=str), return_inverse=True)
+        table = np.empty((len(unique), 5))
+        for i, symbol in enumerate(unique):
+            info = self.symbols.get(symbol)
+            if info is None:
+                raise ValueError(f"Symbol {symbol} is not found")
+            fixed = self.overrides.get(self.asset_class(symbol), np.nan)
+            table[i] = (info.trade_contract_size, info.volume_min, info.volume_step, info.volume_max, fixed)
+        return table[inverse].T
+
+    def size(self, entries, stops, symbols, risk):
+        """
+        Return lot sizes for arrays of entries, stops and symbols.
+
+        risk may be a scalar or a 1-D array of risk profiles; with k profiles and n signals the
+        result has shape (k, n).
+        """
+        entries = np.asarray(entries, dtype=float)
+        stops = np.asarray(stops, dtype=float)
+        contract, volume_min, volume_step, volume_max, fixed = self._symbol_arrays(symbols)
+
+        distance = np.abs(entries - stops)
+        if (distance == 0).any():
+            raise ValueError("Stop loss distance is too small, unable to calculate risk")
+
+        risk = np.asarray(risk, dtype=float)
+        if risk.ndim:
+            risk = risk[:, np.newaxis]
+
+        lots = risk / distance / contract
+        lots = np.where(np.isnan(fixed), lots, fixed)
+        step = np.where(volume_step > 0, volume_step, 10.0 ** -self.precision)
+        # Floor, so the position never risks more than asked; the epsilon absorbs float error on exact multiples
+        lots = np.floor(lots / step + 1e-9) * step
+        lots = np.clip(lots, volume_min, volume_max)
+        return np.round(lots, self.precision)
+
+    def size_one(self, entry_price, stop_loss, symbol, risk):
+        """Scalar convenience wrapper around size()."""
+        return float(self.size([entry_price], [stop_loss], [symbol], risk)[0])
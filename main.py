@@ -1,9 +1,22 @@
-import json
-import math
-import requests
-import re
-from flask import Flask, request
-import MetaTrader5 as mt5
+import logging
+import time
+from flask import Flask, Response, g, request
+import MetaTrader5
+from signal_parser import default_parser
+from bracket import BracketPlacer
+from connection import ConnectionSupervisor
+from dedupe import DedupCache
+from jsonlog import LogWriter, correlation, correlation_id, new_id
+from lot_sizing import LotSizer
+from market_data import MarketData
+from metrics import Registry
+from mt5_executor import MT5Executor
+from notifier import TelegramNotifier
+from order_pipeline import OrderPipeline
+from risk_book import RiskBook
+from server import WebServer
+from symbol_cache import SymbolCache
+from symbol_resolver import SymbolResolver
 from config import (
     TELEGRAM_TOKEN,
     CHANNEL_USERNAME,
@@ -11,115 +24,314 @@ from config import (
     MT5_SERVER,
     MT5_PASSWORD,
     MT5_PATH,
+    MT5_CONNECT_ATTEMPTS,
+    MT5_HEARTBEAT_INTERVAL,
+    MT5_HEARTBEAT_TIMEOUT,
+    MT5_RECONNECT_BACKOFF_INITIAL,
+    MT5_RECONNECT_BACKOFF_MAX,
     TRADE_RISK,
-    ORDER_TYPE  # Dynamically handle market or limit orders
+    LOT_SIZE_OVERRIDES,
+    SYMBOL_ALIASES,
+    ASSET_CLASSES,
+    ORDER_TYPE,  # Dynamically handle market or limit orders
+    BRACKET_ORDERS,
+    BRACKET_VOLUME_PERCENTS,
+    SYMBOL_CACHE_TTL,
+    TELEGRAM_API_URL,
+    TELEGRAM_QUEUE_SIZE,
+    TELEGRAM_COALESCE_WINDOW,
+    TELEGRAM_TIMEOUT,
+    ASYNC_WEBHOOK,
+    ORDER_QUEUE_SIZE,
+    ORDER_WORKERS,
+    SERVER_HOST,
+    SERVER_PORT,
+    PRODUCTION_SERVER,
+    SERVER_THREADS,
+    SERVER_CONNECTION_LIMIT,
+    SERVER_KEEPALIVE_TIMEOUT,
+    MAX_REQUEST_BODY_SIZE,
+    SHUTDOWN_DRAIN_TIMEOUT,
+    DEDUP_MAX_ENTRIES,
+    DEDUP_TTL,
+    DEDUP_HEADER,
+    DEDUP_WAIT_TIMEOUT,
+    MARKET_DATA_SYMBOLS,
+    MARKET_DATA_INTERVAL,
+    MARKET_DATA_USE_COPY_TICKS,
+    MARKET_DATA_MAX_AGE,
+    TICK_BUFFER_SIZE,
+    LOG_PATH,
+    LOG_LEVEL,
+    LOG_LEVELS,
+    LOG_SAMPLING,
+    LOG_MAX_BYTES,
+    LOG_BACKUP_COUNT,
+    LOG_CONSOLE,
+    LOG_QUEUE_SIZE,
+    RISK_LIMITS_ENABLED,
+    RISK_MAX_POSITIONS,
+    RISK_MAX_OPEN_RISK,
+    RISK_MAX_CURRENCY_EXPOSURE,
+    RISK_MAX_CLASS_EXPOSURE,
+    RISK_MIN_MARGIN_LEVEL,
+    RISK_RESYNC_INTERVAL
 )
 
+log = logging.getLogger(__name__)
+
 
 class TradingBot:
     def __init__(self):
+        started = time.perf_counter()
+        self.log_writer = LogWriter(
+            LOG_PATH,
+            level=LOG_LEVEL,
+            levels=LOG_LEVELS,
+            sampling=LOG_SAMPLING,
+            max_bytes=LOG_MAX_BYTES,
+            backup_count=LOG_BACKUP_COUNT,
+            console=LOG_CONSOLE,
+            queue_size=LOG_QUEUE_SIZE,
+        )
+        self.log_writer.start()
         self.app = Flask(__name__)
+        self.executor = MT5Executor(MetaTrader5)
+        self.executor.start()
+        self.mt5 = self.executor.proxy()
+        self.connection = ConnectionSupervisor(
+            self.executor,
+            {"path": MT5_PATH, "login": MT5_LOGIN, "server": MT5_SERVER, "password": MT5_PASSWORD},
+            heartbeat_interval=MT5_HEARTBEAT_INTERVAL,
+            heartbeat_timeout=MT5_HEARTBEAT_TIMEOUT,
+            backoff_initial=MT5_RECONNECT_BACKOFF_INITIAL,
+            backoff_max=MT5_RECONNECT_BACKOFF_MAX,
+        )
         self.setup_mt5()
+        self.symbols = SymbolCache(self.mt5, ttl=SYMBOL_CACHE_TTL)
+        self.resolver = SymbolResolver(self.mt5, self.symbols, SYMBOL_ALIASES, ASSET_CLASSES, LOT_SIZE_OVERRIDES)
+        self.risk = RiskBook(
+            self.mt5,
+            self.symbols,
+            self.resolver.classes,
+            max_positions=RISK_MAX_POSITIONS,
+            max_open_risk=RISK_MAX_OPEN_RISK,
+            max_currency_exposure=RISK_MAX_CURRENCY_EXPOSURE,
+            class_limits=RISK_MAX_CLASS_EXPOSURE,
+            min_margin_level=RISK_MIN_MARGIN_LEVEL,
+            resync_interval=RISK_RESYNC_INTERVAL,
+        )
+        self.preload()
+        self.connection.on_connect.append(self.preload)
+        self.notifier = TelegramNotifier(
+            TELEGRAM_TOKEN,
+            CHANNEL_USERNAME,
+            base_url=TELEGRAM_API_URL,
+            max_queue=TELEGRAM_QUEUE_SIZE,
+            coalesce_window=TELEGRAM_COALESCE_WINDOW,
+            timeout=TELEGRAM_TIMEOUT,
+        )
+        self.notifier.start()
+        self.market_data = MarketData(
+            self.mt5,
+            capacity=TICK_BUFFER_SIZE,
+            interval=MARKET_DATA_INTERVAL,
+            use_copy_ticks=MARKET_DATA_USE_COPY_TICKS,
+            max_age=MARKET_DATA_MAX_AGE,
+        )
+        for symbol in MARKET_DATA_SYMBOLS:
+            self.market_data.subscribe(symbol)
+        self.market_data.start()
         self.app.route("/webhook", methods=["POST"])(self.webhook)
-        self.forex_symbols = ['EURUSD', 'USDCAD', 'USDJPY', 'US100']
-        self.stocks_symbols = ['PFE', 'BAC', 'AMZN', 'GOOG', 'NVDA', 'WMT', 'ZM', 'T', 'BABA']
-        self.gold_silver_symbol = ['XAUUSD', 'XAGUSD']
-        self.btc_symbol = ['BTCUSD']
+        self.app.route("/orders/<signal_id>", methods=["GET"])(self.order_status)
+        self.parser = default_parser()
+        self.dedup = DedupCache(max_entries=DEDUP_MAX_ENTRIES, ttl=DEDUP_TTL)
+        self.pipeline = OrderPipeline(self.process_signal, max_queue=ORDER_QUEUE_SIZE, workers=ORDER_WORKERS)
+        if ASYNC_WEBHOOK:
+            self.pipeline.start()
+        self.lot_sizer = LotSizer(self.symbols, self.resolver.classes, LOT_SIZE_OVERRIDES)
+        self.brackets = BracketPlacer(self.executor, self.symbols, BRACKET_VOLUME_PERCENTS)
+        self.setup_metrics()
+        if RISK_LIMITS_ENABLED:
+            self.risk.start()
+        self.connection.start()
+        self.startup_seconds = time.perf_counter() - started
+        log.info("Ready in %.2fs", self.startup_seconds)
+
+    def setup_metrics(self):
+        """Create the latency histograms and counters exposed at /metrics."""
+        self.metrics = Registry()
+        self.request_latency = self.metrics.histogram(
+            "mt5_bot_request_seconds", "HTTP request latency by endpoint", ("endpoint",))
+        self.stage_latency = self.metrics.histogram(
+            "mt5_bot_stage_seconds", "Time spent in each stage of the webhook-to-fill path", ("stage",))
+        self.mt5_wait = self.metrics.histogram(
+            "mt5_bot_mt5_queue_wait_seconds", "Time MT5 commands wait for the executor thread", ("command",))
+        self.mt5_exec = self.metrics.histogram(
+            "mt5_bot_mt5_exec_seconds", "Time MT5 commands take in the terminal", ("command",))
+        self.order_retcodes = self.metrics.counter(
+            "mt5_bot_order_retcodes_total", "Broker retcodes returned by order_send", ("retcode",))
+        self.rejections = self.metrics.counter(
+            "mt5_bot_rejections_total", "Signals rejected before reaching the broker or by it", ("reason",))
+        self.metrics.register_collector(self.collect_metrics)
+        self.executor.observer = self.observe_mt5_command
+        self.app.before_request(self.start_request_timer)
+        self.app.after_request(self.observe_request)
+        self.app.route("/metrics", methods=["GET"])(self.metrics_endpoint)
+
+    def observe_mt5_command(self, name, wait, execution):
+        self.mt5_wait.observe(wait, name)
+        self.mt5_exec.observe(execution, name)
+
+    @staticmethod
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    def observe_request(self, response):
+        started = g.get("request_started")
+        if started is not None:
+            self.request_latency.observe(time.perf_counter() - started, request.endpoint or "unknown")
+        return response
+
+    def collect_metrics(self):
+        """Export counters that components keep for themselves."""
+        yield "mt5_bot_parsed_total", "counter", "Messages parsed by format", [
+            ({"format": name}, count) for name, count in self.parser.parsed.items()]
+        yield "mt5_bot_parse_failures_total", "counter", "Messages that could not be parsed by format", [
+            ({"format": name}, count) for name, count in self.parser.failures.items()]
+        yield "mt5_bot_queue_depth", "gauge", "Items waiting in internal queues", [
+            ({"queue": "mt5_executor"}, self.executor.queue_depth),
+            ({"queue": "telegram"}, self.notifier.queue_depth),
+            ({"queue": "orders"}, self.pipeline.queue_depth),
+            ({"queue": "log"}, self.log_writer.queue.qsize()),
+        ]
+        connection = self.connection.stats()
+        yield "mt5_bot_mt5_connected", "gauge", "Whether the terminal answered the last heartbeat", [
+            ({}, int(connection["connected"]))]
+        yield "mt5_bot_mt5_reconnects_total", "counter", "Reconnects after a failed heartbeat", [
+            ({}, connection["reconnects"])]
+        yield "mt5_bot_mt5_heartbeat_failures_total", "counter", "Heartbeats that failed", [
+            ({}, connection["heartbeat_failures"])]
+        yield "mt5_bot_startup_seconds", "gauge", "Cold start to ready, and its initialize() part", [
+            ({"stage": "ready"}, self.startup_seconds),
+            ({"stage": "connect"}, connection["connect_seconds"]),
+        ]
+        yield "mt5_bot_mt5_reconnect_seconds", "gauge", "Time to reconnect and pre-load", [
+            ({"stat": "last"}, connection["last_reconnect_seconds"]),
+            ({"stat": "max"}, connection["max_reconnect_seconds"]),
+        ]
+        notifier = self.notifier.stats()
+        yield "mt5_bot_telegram_messages_total", "counter", "Telegram messages by outcome", [
+            ({"outcome": outcome}, notifier[outcome])
+            for outcome in ("sent_messages", "dropped", "failed", "rate_limited")]
+        yield "mt5_bot_order_queue_rejected_total", "counter", "Signals refused because the order queue was full", [
+            ({}, self.pipeline.rejected_full)]
+        dedup = self.dedup.stats()
+        yield "mt5_bot_dedup_lookups_total", "counter", "Signal deduplication lookups by result", [
+            ({"result": "hit"}, dedup["hits"]), ({"result": "miss"}, dedup["misses"])]
+        yield "mt5_bot_dedup_evictions_total", "counter", "Signals evicted from the deduplication cache", [
+            ({}, dedup["evictions"])]
+        yield "mt5_bot_dedup_entries", "gauge", "Signals held in the deduplication cache", [({}, dedup["entries"])]
+        yield "mt5_bot_symbol_cache_lookups_total", "counter", "Symbol cache lookups by result", [
+            ({"result": "hit"}, self.symbols.hits), ({"result": "miss"}, self.symbols.misses)]
+        yield "mt5_bot_symbol_resolver_fallbacks_total", "counter", "Tickers resolved by asking the terminal", [
+            ({}, self.resolver.fallbacks)]
+        risk = self.risk.stats()
+        yield "mt5_bot_risk_open_risk", "gauge", "Loss if every open stop loss is hit, from the risk book", [
+            ({}, risk["open_risk"])]
+        yield "mt5_bot_risk_margin", "gauge", "Used margin according to the risk book", [({}, risk["margin"])]
+        yield "mt5_bot_risk_rejections_total", "counter", "Orders refused by the pre-trade risk limits by limit", [
+            ({"limit": limit}, count) for limit, count in risk["rejected"].items()]
+        yield "mt5_bot_risk_check_seconds", "gauge", "Duration of the pre-trade risk check", [
+            ({"stat": "last"}, risk["last_check_seconds"]),
+            ({"stat": "avg"}, risk["avg_check_seconds"]),
+        ]
+
+    def metrics_endpoint(self):
+        """Prometheus scrape endpoint."""
+        return Response(self.metrics.render(), mimetype="text/plain; version=0.0.4")
 
     def setup_mt5(self):
-        """Initialize MetaTrader 5 connection using credentials from the config."""
-        if not mt5.initialize(
-                path=MT5_PATH,
-                login=MT5_LOGIN,
-                server=MT5_SERVER,
-                password=MT5_PASSWORD
-        ):
-            print("initialize() failed, error code =", mt5.last_error())
+        """Initialize MetaTrader 5 connection using credentials from the config, retrying with backoff."""
+        if not self.connection.connect(MT5_CONNECT_ATTEMPTS):
+            log.critical("MetaTrader 5 did not initialize after %d attempts", MT5_CONNECT_ATTEMPTS)
+            self.log_writer.stop()
             quit()
+        log.info("MetaTrader 5 initialized in %.2fs", self.connection.connect_seconds)
 
-    def calculate_lot_size(self, entry_price, stop_loss, symbol):
-        """Calculate lot size based on risk management, stop loss, and config-based risk."""
-        contract_size = mt5.symbol_info(symbol).trade_contract_size
-        print(f"Contract size is: {contract_size}")
-        risk_ticks = abs(entry_price - stop_loss)
-        trade_risk = TRADE_RISK
-        if risk_ticks == 0:
-            raise ValueError("Stop loss distance is too small, unable to calculate risk")
-
-        #lot_size = trade_risk / risk_ticks
-        x = trade_risk / risk_ticks
-        lot_size = x / contract_size
-        symbol = symbol.strip()
-        if symbol in self.forex_symbols:
-            final_lot_size = lot_size
-            print(f"Matched Forex symbol: {symbol}")
-        elif symbol in self.stocks_symbols:
-            #final_lot_size = math.floor(lot_size)
-            #final_lot_size = float("{:.2f}".format(final_lot_size))
-            final_lot_size = 100.00
-            print(f"Matched Stock symbol: {symbol}")
-        elif symbol in self.gold_silver_symbol:
-            final_lot_size = lot_size
-            print(f"Matched Gold symbol: {symbol}")
-        elif symbol in self.btc_symbol:
-            final_lot_size = 0.09
-            print(f"Matched BTC symbol: {symbol}")
+    def preload(self):
+        """Load account info, symbol metadata and Market Watch so the first trade after a (re)connect skips them."""
+        self.account = self.mt5.account_info()
+        if self.account is None:
+            log.error("account_info() failed, error code = %s", self.mt5.last_error())
         else:
-            final_lot_size = lot_size
-            print(f"No match found. Using default lot size: {final_lot_size}")
+            log.info("Logged in to account %s, balance %s %s", self.account.login, self.account.balance,
+                     self.account.currency)
+        self.symbols.warm()
+        self.resolver.build()
+        self.resolver.preselect()
+        self.risk.resync()
 
-        LOT_PRECISION = 2
-        final_lot_size = round(final_lot_size, LOT_PRECISION)
-        return final_lot_size
+    def calculate_lot_size(self, entry_price, stop_loss, symbol):
+        """Calculate lot size based on risk management, stop loss, and config-based risk."""
+        lot_size = self.lot_sizer.size_one(entry_price, stop_loss, symbol, TRADE_RISK)
+        asset_class = self.lot_sizer.asset_class(symbol)
+        log.info("Lot size for %s (%s): %s", symbol, asset_class or "no asset class match", lot_size,
+                 extra={"symbol": symbol, "lot_size": lot_size})
+        return lot_size
 
-    @staticmethod
-    def format_price(price, symbol):
+    def format_price(self, price, symbol):
         """Format price to match the symbol's precision."""
-        symbol_info = mt5.symbol_info(symbol)
+        symbol_info = self.symbols.get(symbol)
         if symbol_info is None:
             raise ValueError(f"Symbol {symbol} is not found")
 
         digits = symbol_info.digits
         return round(price, digits)
 
-    @staticmethod
-    def send_telegram_message(message):
-        """Send a message to a Telegram channel using config values."""
-        url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-        payload = {"chat_id": CHANNEL_USERNAME, "text": message}
-        response = requests.post(url, json=payload)
-        if response.status_code == 200:
-            print("Telegram message sent successfully.")
-        else:
-            print("Error sending Telegram message:", response.text)
+    def get_quote(self, symbol):
+        """Latest bid/ask from the market data buffer, falling back to a direct tick request."""
+        self.market_data.subscribe(symbol)
+        quote = self.market_data.latest(symbol)
+        if quote is None:
+            quote = self.mt5.symbol_info_tick(symbol)
+        return quote
+
+    def send_telegram_message(self, message):
+        """Queue a message for the Telegram channel without waiting for delivery."""
+        if not self.notifier.notify(message):
+            log.warning("Telegram queue is full, message dropped.")
 
     def place_order(self, action, symbol, entry_price, lot_size, tp_levels, stop_loss):
         """Place an order using MetaTrader 5 with error handling and handling LIMIT/MARKET orders."""
         try:
-            symbol_info = mt5.symbol_info(symbol)
+            symbol_info = self.symbols.get(symbol)
             if symbol_info is None:
-                print(f"Failed to get symbol info for {symbol}")
+                log.error("Failed to get symbol info for %s", symbol)
                 return {"status": "error", "message": "Failed to get symbol info"}, 500
 
-            ticks = mt5.symbol_info_tick(symbol)
+            with self.stage_latency.time("quote"):
+                ticks = self.get_quote(symbol)
             if ticks is None:
-                print(f"Failed to get tick data for {symbol}")
+                log.error("Failed to get tick data for %s", symbol)
                 return {"status": "error", "message": "Failed to get tick data"}, 500
 
             if ORDER_TYPE.upper() == 'LIMIT':
                 if action.lower() == 'buy' and entry_price >= ticks.ask:
-                    print(f"Invalid buy limit price: {entry_price}. Must be lower than ask: {ticks.ask}")
+                    log.warning("Invalid buy limit price: %s. Must be lower than ask: %s", entry_price, ticks.ask)
+                    self.rejections.inc("limit_price")
                     return {"status": "error", "message": "Invalid buy limit price"}, 400
                 elif action.lower() == 'sell' and entry_price <= ticks.bid:
-                    print(f"Invalid sell limit price: {entry_price}. Must be higher than bid: {ticks.bid}")
+                    log.warning("Invalid sell limit price: %s. Must be higher than bid: %s", entry_price, ticks.bid)
+                    self.rejections.inc("limit_price")
                     return {"status": "error", "message": "Invalid sell limit price"}, 400
 
-                order_type = mt5.ORDER_TYPE_BUY_LIMIT if action.lower() == 'buy' else mt5.ORDER_TYPE_SELL_LIMIT
+                order_type = self.mt5.ORDER_TYPE_BUY_LIMIT if action.lower() == 'buy' else self.mt5.ORDER_TYPE_SELL_LIMIT
             else:
-                order_type = mt5.ORDER_TYPE_BUY if action.lower() == 'buy' else mt5.ORDER_TYPE_SELL
+                order_type = self.mt5.ORDER_TYPE_BUY if action.lower() == 'buy' else self.mt5.ORDER_TYPE_SELL
 
             order_request = {
-                "action": mt5.TRADE_ACTION_DEAL,
+                "action": self.mt5.TRADE_ACTION_DEAL,
                 "symbol": symbol,
                 "volume": lot_size,
                 "type": order_type,
@@ -129,166 +341,198 @@ class TradingBot:
                 "deviation": 20,
                 "magic": 123456,
                 "comment": "MB_Strategy",
-                "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_IOC,
+                "type_time": self.mt5.ORDER_TIME_GTC,
+                "type_filling": self.mt5.ORDER_FILLING_IOC,
             }
-
-            result = mt5.order_send(order_request)
-            if result is None or result.retcode != mt5.TRADE_RETCODE_DONE:
-                error_code = mt5.last_error()
-                print(f"Failed to place order: {result}, MT5 error: {error_code}")
+            if BRACKET_ORDERS and len(tp_levels) > 1:
+                return self.place_bracket(action, order_request, tp_levels)
+
+            with self.stage_latency.time("order_send"):
+                result = self.mt5.order_send(order_request)
+            self.order_retcodes.inc(str(result.retcode) if result is not None else "none")
+            if result is None or result.retcode != self.mt5.TRADE_RETCODE_DONE:
+                error_code = self.mt5.last_error()
+                log.error("Failed to place order: %s, MT5 error: %s", result, error_code, extra={"symbol": symbol})
+                self.rejections.inc("broker")
                 return {
                     "status": "error",
                     "message": "Order placement failed",
                     "details": str(result),
                 }, 500
 
-            print(f"Order placed successfully: {result.order}")
+            self.risk.add(result.order, symbol, action, result.volume or lot_size,
+                          result.price or order_request["price"], stop_loss)
+            log.info("Order placed successfully: %s", result.order,
+                     extra={"ticket": result.order, "symbol": symbol, "volume": lot_size, "price": result.price})
             return {"status": "success", "order_id": result.order}, 200
 
         except Exception as e:
-            print(f"Failed to place order due to an exception: {e}")
+            log.exception("Failed to place order due to an exception: %s", e)
             return {"status": "error", "message": str(e)}, 500
 
+    def place_bracket(self, action, order_request, tp_levels):
+        """Open one position per TP level, each with its own TP, and report how long all legs took."""
+        legs, timings = self.brackets.place(order_request, tp_levels)
+        self.stage_latency.observe(timings["check_seconds"], "bracket_check")
+        self.stage_latency.observe(timings["send_seconds"], "bracket_send")
+        summary = {
+            "legs": [
+                {
+                    "tp": leg.tp,
+                    "volume": leg.volume,
+                    "order_id": getattr(leg.result, "order", None),
+                    "retcode": getattr(leg.result or leg.check, "retcode", None),
+                }
+                for leg in legs
+            ],
+            "check_ms": timings["check_seconds"] * 1e3,
+            "send_ms": timings["send_seconds"] * 1e3,
+            "total_ms": timings["total_seconds"] * 1e3,
+        }
+        if any(leg.result is None for leg in legs):
+            log.error("Bracket order check failed: %s", [getattr(leg.check, "comment", None) for leg in legs])
+            self.rejections.inc("order_check")
+            return dict(summary, status="error", message="Order check failed"), 400
+
+        for leg in legs:
+            self.order_retcodes.inc(str(leg.result.retcode))
+            if leg.result.retcode == self.mt5.TRADE_RETCODE_DONE:
+                self.risk.add(leg.result.order, leg.request["symbol"], action, leg.volume,
+                              leg.result.price or leg.request["price"], leg.request["sl"])
+        placed = sum(leg.result.retcode == self.mt5.TRADE_RETCODE_DONE for leg in legs)
+        log.info("Bracket placed %d/%d legs in %.1f ms", placed, len(legs), summary["total_ms"],
+                 extra={"tickets": [leg["order_id"] for leg in summary["legs"]]})
+        if placed < len(legs):
+            self.rejections.inc("broker")
+            return dict(summary, status="error", message="Some bracket legs failed"), 500
+        return dict(summary, status="success"), 200
+
+    def order_status(self, signal_id):
+        """Report where an asynchronously accepted signal is in the order pipeline."""
+        record = self.pipeline.get(signal_id)
+        if record is None:
+            return {"status": "error", "message": f"Unknown signal {signal_id}"}, 404
+        return record.as_dict(), 200
+
     def webhook(self):
         """Handles incoming webhooks and processes the trading order."""
-        message = request.data.decode("utf-8")
-        print("Webhook message received:", message)
-        self.send_telegram_message(message)
-
-        action, symbol, entry_price, tp_levels, stop_loss = self.parse_plain_text_message(message)
+        # Every record logged for this signal carries its ID
+        with correlation(new_id()):
+            return self.handle_webhook()
 
-        if not action or not symbol or entry_price is None or stop_loss is None:
+    def handle_webhook(self):
+        """Parse, deduplicate and trade one webhook message."""
+        message = request.data.decode("utf-8")
+        log.info("Webhook message received", extra={"raw_message": message})
+        with self.stage_latency.time("telegram"):
+            self.send_telegram_message(message)
+
+        with self.stage_latency.time("parse"):
+            signal = self.parser.parse(message)
+        if signal is None:
+            self.rejections.inc("parse")
             return {"status": "error", "message": "Failed to parse the message"}, 400
 
-        symbol = symbol.replace("USDT", "USD")
-        if symbol == "US500":
-            symbol = "US500.cash"
-        elif symbol == "US100":
-            symbol = "US100.cash"
-
-        entry_price = self.format_price(entry_price, symbol)
-        stop_loss = self.format_price(stop_loss, symbol)
-        if tp_levels:
-            tp_levels = [self.format_price(tp, symbol) for tp in tp_levels]
+        key = self.dedup.key_for(signal, request.headers.get(DEDUP_HEADER))
+        future, first = self.dedup.claim(key)
+        if not first:
+            log.info("Duplicate %s %s signal, answering with the first response.", signal.action, signal.symbol)
+            try:
+                body, status = future.result(timeout=DEDUP_WAIT_TIMEOUT)
+            except Exception:
+                return {"status": "error", "message": "Duplicate of a signal that is still being processed"}, 409
+            return body, status, {"Idempotent-Replayed": "true"}
 
-        symbol_info = mt5.symbol_info(symbol)
+        try:
+            body, status = self.submit_signal(signal)
+        except Exception as e:
+            self.dedup.forget(key)
+            future.set_exception(e)
+            raise
+        if status == 503:
+            # Nothing was sent to the broker, so a resend should be tried again
+            self.dedup.forget(key)
+        future.set_result((body, status))
+        return body, status
+
+    def submit_signal(self, signal):
+        """Queue the signal in asynchronous mode, otherwise trade it before answering."""
+        if ASYNC_WEBHOOK:
+            record = self.pipeline.submit(signal, correlation_id.get())
+            if record is None:
+                self.rejections.inc("queue_full")
+                return {"status": "error", "message": "Order queue is full"}, 503
+            return {"status": "accepted", "signal_id": record.signal_id}, 202
+
+        return self.process_signal(signal)
+
+    def process_signal(self, signal):
+        """Resolve the symbol, size the position and send the order for a parsed signal."""
+        resolved = self.resolver.resolve(signal.symbol)
+        if resolved is None:
+            log.warning("Unknown symbol %s", signal.symbol)
+            self.rejections.inc("unknown_symbol")
+            return {"status": "error", "message": f"Symbol {signal.symbol} is not found"}, 400
+        symbol = resolved.symbol
+
+        entry_price = self.format_price(signal.entry_price, symbol)
+        stop_loss = self.format_price(signal.stop_loss, symbol)
+        tp_levels = [self.format_price(tp, symbol) for tp in signal.tp_levels]
+
+        symbol_info = self.symbols.get(symbol)
         if symbol_info is None or not symbol_info.visible:
-            if not mt5.symbol_select(symbol, True):
-                print(f"Failed to select symbol {symbol}")
+            with self.stage_latency.time("symbol_select"):
+                selected = self.mt5.symbol_select(symbol, True)
+            if not selected:
+                log.warning("Failed to select symbol %s", symbol)
+                self.rejections.inc("symbol_select")
                 return {"status": "error", "message": f"Failed to select symbol {symbol}"}, 400
-
-        lot_size = self.calculate_lot_size(entry_price, stop_loss, symbol)
-
-        return self.place_order(action, symbol, entry_price, lot_size, tp_levels, stop_loss)
-
-    def parse_plain_text_message(self, message):
-        """Parse plain text message to extract trading parameters based on Type 1 and Type 2 formats."""
+            self.symbols.mark_visible(symbol)
+
+        with self.stage_latency.time("lot_sizing"):
+            lot_size = self.calculate_lot_size(entry_price, stop_loss, symbol)
+
+        if not RISK_LIMITS_ENABLED:
+            return self.place_order(signal.action, symbol, entry_price, lot_size, tp_levels, stop_loss)
+        with self.stage_latency.time("risk_check"):
+            reservation, breach = self.risk.reserve(symbol, signal.action, lot_size, entry_price, stop_loss)
+        if breach is not None:
+            log.warning("Order refused by risk limits: %s", breach, extra={"symbol": symbol, "lot_size": lot_size})
+            self.rejections.inc("risk_limit")
+            return {"status": "error", "message": breach}, 400
         try:
-            if re.search(r"TP-levels", message, re.IGNORECASE):
-                action_match = re.search(r"(Buy|Sell)", message, re.IGNORECASE)
-                action = action_match.group(0).capitalize() if action_match else None
-                symbol_match = re.search(r",\s*([A-Z]+[A-Z0-9]*)", message)
-                symbol = symbol_match.group(1) if symbol_match else None
-                entry_price_match = re.search(r"price\s*=\s*([\d.]+)", message)
-                entry_price = float(entry_price_match.group(1)) if entry_price_match else None
-                tp_levels_match = re.findall(r"TP-levels\s*:\s*([\d.]+)", message)
-                tp_levels = [float(tp) for tp in tp_levels_match] if tp_levels_match else []
-                sl_match = re.search(r"SL\s*:\s*([\d.]+)", message)
-                stop_loss = float(sl_match.group(1)) if sl_match else None
-
-
-            elif re.search(r"Smart Signal Alert!", message, re.IGNORECASE):
-
-                action_match = re.search(r"(Buy|Sell)", message, re.IGNORECASE)
-
-                action = action_match.group(1).capitalize() if action_match else None
-
-                symbol_match = re.search(r"(BTCUSDT|[A-Z]{6})", message)
-
-                symbol = symbol_match.group(1) if symbol_match else None
-
-                entry_price_match = re.search(r"Entry:\s*([\d.]+)", message)
-
-                entry_price = float(entry_price_match.group(1)) if entry_price_match else None
-
-                tp_levels_match = re.findall(r"TP(\d):\s*([\d.]+)", message)
-
-                tp_levels = [float(tp[1]) for tp in tp_levels_match] if tp_levels_match else []
-
-                sl_match = re.search(r"SL\s*:\s*([\d.]+)", message)
-
-                stop_loss = float(sl_match.group(1)) if sl_match else None
-            elif re.search(r"(Long entry|Short entry)", message, re.IGNORECASE):
-                # Type 3 parsing logic
-                action_match = re.search(r"(Long|Short) entry", message, re.IGNORECASE)
-                action = "Buy" if action_match.group(1).lower() == "long" else "Sell"
-                symbol_match = re.search(r"Symbol:\s*([A-Z]+)", message)
-                symbol = symbol_match.group(1) if symbol_match else None
-                entry_price_match = re.search(r"Entry price:\s*([\d.]+)", message)
-                entry_price = float(entry_price_match.group(1)) if entry_price_match else None
-                tp_levels_match = re.findall(r"TP\d:\s*([\d.]+)", message)
-                tp_levels = [float(tp) for tp in tp_levels_match] if tp_levels_match else []
-                sl_match = re.search(r"SL:\s*([\d.]+)", message)
-                stop_loss = float(sl_match.group(1)) if sl_match else None
-            elif re.search(r"Symbol:", message, re.IGNORECASE) and not re.search(r"Direction:", message, re.IGNORECASE):
-                symbol_match = re.search(r"Symbol:\s*([A-Z]+)", message)
-                json_start = message.find("{")
-
-                if symbol_match and json_start != -1:
-                    symbol = symbol_match.group(1)
-                    json_part = message[json_start:]
-                    json_data = json.loads(json_part)
-                    action = "Buy" if json_data.get('side', '').upper() == "LONG" else "Sell"
-                    entry_price = float(json_data.get('entry', None))
-                    tp_levels = [
-                        float(json_data.get(f'tp{i}', None)) for i in range(1, 5)
-                        if json_data.get(f'tp{i}', None)
-                    ]
-                    stop_loss = float(json_data.get('stop', None))
-                else:
-                    print("Unknown message format:", message)
-                    return None, None, None, None, None
-            elif re.search(r"Direction:", message, re.IGNORECASE):
-                    # Look for the 'Symbol' and 'Direction' fields
-                    symbol_match = re.search(r"Symbol:\s*([A-Z0-9]+)", message)
-                    action_match = re.search(r"Direction:\s*(Buy|Sell)", message, re.IGNORECASE)
-
-                    # Ensure that both symbol and action (Buy/Sell) are identified
-                    if symbol_match and action_match:
-                        symbol = symbol_match.group(1)
-                        action = action_match.group(1).capitalize()
-
-                        # Parse entry price, TP levels, and SL
-                        entry_price_match = re.search(r"Entry:\s*([\d.]+)", message)
-                        entry_price = float(entry_price_match.group(1)) if entry_price_match else None
-
-                        # TP levels (could be more than one TP level)
-                        tp_levels = []
-                        tp1_match = re.search(r"TP1:\s*([\d.]+)", message)
-                        tp2_match = re.search(r"TP2:\s*([\d.]+)", message)
-                        if tp1_match:
-                            tp_levels.append(float(tp1_match.group(1)))
-                        if tp2_match:
-                            tp_levels.append(float(tp2_match.group(1)))
-
-                        # Stop Loss
-                        sl_match = re.search(r"SL:\s*([\d.]+)", message)
-                        stop_loss = float(sl_match.group(1)) if sl_match else None
-                    else:
-                        print("Unknown Type 4 message format:", message)
-                        return None, None, None, None, None
-
-            else:
-                print("Unknown message format:", message)
-                return None, None, None, None, None
-
-            return action, symbol, entry_price, tp_levels, stop_loss
-        except Exception as e:
-            print(f"Failed to parse message: {e}")
-            return None, None, None, None, None
+            return self.place_order(signal.action, symbol, entry_price, lot_size, tp_levels, stop_loss)
+        finally:
+            self.risk.release(reservation)
+
+    def shutdown(self, timeout=30.0):
+        """Finish queued orders, then stop the background workers and close the MT5 connection."""
+        self.connection.stop()
+        self.pipeline.stop(timeout)
+        self.risk.stop()
+        self.market_data.stop()
+        self.notifier.stop()
+        self.mt5.shutdown()
+        self.executor.stop()
+        self.log_writer.stop()
+
+    def run(self):
+        """Serve the app with the production server, or Flask's development server if configured."""
+        if not PRODUCTION_SERVER:
+            self.app.run(host=SERVER_HOST, port=SERVER_PORT)
+            return
+        WebServer(
+            self,
+            host=SERVER_HOST,
+            port=SERVER_PORT,
+            threads=SERVER_THREADS,
+            connection_limit=SERVER_CONNECTION_LIMIT,
+            keepalive_timeout=SERVER_KEEPALIVE_TIMEOUT,
+            max_body_size=MAX_REQUEST_BODY_SIZE,
+            drain_timeout=SHUTDOWN_DRAIN_TIMEOUT,
+        ).serve_forever()
 
 
 if __name__ == "__main__":
     bot = TradingBot()
-    bot.app.run(host='0.0.0.0', port=80)
+    bot.run()
@@ -0,0 +1,210 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+tick_log = logging.getLogger(__name__ + ".ticks")  # per-quote records, sampled (see jsonlog.Sampler)
+
+TICK_DTYPE = np.dtype([("time_msc", "i8"), ("bid", "f8"), ("ask", "f8")])
+
+
+@dataclass(slots=True, frozen=True)
+class Quote:
+    """Latest bid/ask for a symbol, shaped like the fields of mt5.symbol_info_tick() the bot reads."""
+    symbol: str
+    time_msc: int
+    bid: float
+    ask: float
+
+
+class TickRing:
+    """Fixed-size ring buffer of (time_msc, bid, ask) rows backed by one NumPy structured array."""
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self._buffer = np.zeros(capacity, dtype=TICK_DTYPE)
+        self._written = 0  # total rows ever appended; the write position is _written % capacity
+
+    def __len__(self):
+        return min(self._written, self.capacity)
+
+    @property
+    def nbytes(self):
+        return self._buffer.nbytes
+
+    @property
+    def last_time_msc(self):
+        if not self._written:
+            return 0
+        return int(self._buffer["time_msc"][(self._written - 1) % self.capacity])
+
+    def append(self, time_msc, bid, ask):
+        self._buffer[self._written % self.capacity] = (time_msc, bid, ask)
+        self._written += 1
+
+    def extend(self, ticks):
+        """Append a structured array that has time_msc, bid and ask fields, e.g. from copy_ticks_from."""
+        count = len(ticks)
+        if not count:
+            return
+        if count > self.capacity:
+            ticks = ticks[-self.capacity:]
+            self._written += count - self.capacity
+            count = self.capacity
+
+        start = self._written % self.capacity
+        first = min(count, self.capacity - start)
+        for name in TICK_DTYPE.names:
+            self._buffer[name][start:start + first] = ticks[name][:first]
+            self._buffer[name][:count - first] = ticks[name][first:]
+        self._written += count
+
+    def latest(self):
+        if not self._written:
+            return None
+        return self._buffer[(self._written - 1) % self.capacity]
+
+    def window(self, n=None):
+        """Return the last n rows in time order (a copy, because the ring may wrap)."""
+        size = len(self)
+        n = size if n is None else min(n, size)
+        end = self._written % self.capacity or (self.capacity if self._written else 0)
+        if end >= n:
+            return self._buffer[end - n:end]
+        return np.concatenate((self._buffer[self.capacity - (n - end):], self._buffer[:end]))
+
+    def spread_stats(self, n=None):
+        """Mean and max ask-bid spread over the last n ticks."""
+        rows = self.window(n)
+        if not len(rows):
+            return None
+        spread = rows["ask"] - rows["bid"]
+        return {"mean": float(spread.mean()), "max": float(spread.max()), "last": float(spread[-1])}
+
+    def volatility(self, n=None):
+        """Standard deviation of tick-to-tick log returns of the mid price over the last n ticks."""
+        rows = self.window(n)
+        if len(rows) < 3:
+            return None
+        mid = (rows["bid"] + rows["ask"]) / 2
+        return float(np.diff(np.log(mid)).std())
+
+
+class MarketData:
+    """
+    Background poller that keeps a TickRing per subscribed symbol.
+
+    Trade decisions read latest() from memory instead of calling symbol_info_tick themselves.
+    With use_copy_ticks every tick since the last stored one is fetched with copy_ticks_from, in
+    batches until caught up, falling back to symbol_info_tick for the newest quote; otherwise the
+    poller samples symbol_info_tick once per symbol per interval. Every callable in listeners is
+    called with (symbol, bid, ask) of the newest tick whenever a symbol gets one.
+    """
+
+    def __init__(self, mt5, capacity=4096, interval=0.1, use_copy_ticks=False, max_age=2.0, max_batches=8):
+        self.mt5 = mt5
+        self.capacity = capacity
+        self.interval = interval
+        self.use_copy_ticks = use_copy_ticks
+        self.max_age = max_age
+        self.max_batches = max_batches  # copy_ticks_from calls per symbol per poll when catching up
+        self._rings = {}
+        self._received = {}  # symbol -> monotonic time of the last update
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def subscribe(self, symbol):
+        with self._lock:
+            if symbol not in self._rings:
+                self._rings[symbol] = TickRing(self.capacity)
+
+    def unsubscribe(self, symbol):
+        with self._lock:
+            self._rings.pop(symbol, None)
+            self._received.pop(symbol, None)
+
+    def ring(self, symbol):
+        return self._rings.get(symbol)
+
+    def latest(self, symbol):
+        """Return the newest Quote for a subscribed symbol, or None if it is missing or stale."""
+        ring = self._rings.get(symbol)
+        received = self._received.get(symbol)
+        if ring is None or received is None or time.monotonic() - received > self.max_age:
+            return None
+        row = ring.latest()
+        return Quote(symbol, int(row["time_msc"]), float(row["bid"]), float(row["ask"]))
+
+    def memory_usage(self):
+        """Bytes held by each symbol's ring buffer."""
+        return {symbol: ring.nbytes for symbol, ring in list(self._rings.items())}
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="market-data", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                log.exception("Market data poll failed: %s", e)
+            self._stopping.wait(self.interval)
+
+    def poll_once(self):
+        """Bring every subscribed symbol up to date."""
+        for symbol, ring in list(self._rings.items()):
+            previous = ring.last_time_msc
+            if not (self.use_copy_ticks and previous and self._catch_up(symbol, ring)):
+                # Sampling, the first poll, or copy_ticks_from did not reach the present: read the newest quote
+                tick = self.mt5.symbol_info_tick(symbol)
+                if tick is None:
+                    continue
+                if tick.time_msc > ring.last_time_msc:
+                    ring.append(tick.time_msc, tick.bid, tick.ask)
+            if ring.last_time_msc > previous:
+                # Only the newest tick is published; the triggers never see prices from the backlog
+                row = ring.latest()
+                self._publish(symbol, float(row["bid"]), float(row["ask"]))
+            self._received[symbol] = time.monotonic()
+
+    def _catch_up(self, symbol, ring):
+        """
+        Append every tick after the ring's newest with copy_ticks_from, a batch of capacity ticks at a time.
+
+        A full batch means more ticks are waiting, e.g. after a reconnect. Returns True once a batch
+        comes back short, False if max_batches were not enough or a call failed.
+        """
+        for _ in range(self.max_batches):
+            last = ring.last_time_msc
+            ticks = self.mt5.copy_ticks_from(symbol, last // 1000, self.capacity, self.mt5.COPY_TICKS_INFO)
+            if ticks is None:
+                return False
+            ring.extend(ticks[ticks["time_msc"] > last])
+            if len(ticks) < self.capacity:
+                return True
+            if ring.last_time_msc == last:
+                # More than capacity ticks share the second the request starts from
+                return False
+        return False
+
+    def _publish(self, symbol, bid, ask):
+        if tick_log.isEnabledFor(logging.DEBUG):
+            tick_log.debug("Quote", extra={"symbol": symbol, "bid": bid, "ask": ask})
+        for listener in self.listeners:
+            try:
+                listener(symbol, bid, ask)
+            except Exception as e:
+                log.exception("Market data listener failed for %s: %s", symbol, e)
@@ -0,0 +1,179 @@
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+PRIORITY_TRADE = 0
+PRIORITY_CONTROL = 1
+PRIORITY_POLL = 2
+PRIORITY_READ = 3
+
+# Orders and SL/TP modifications (both go through order_send) jump ahead of polling and metadata reads
+COMMAND_PRIORITIES = {
+    "order_send": PRIORITY_TRADE,
+    "order_check": PRIORITY_TRADE,
+    "initialize": PRIORITY_CONTROL,
+    "login": PRIORITY_CONTROL,
+    "shutdown": PRIORITY_CONTROL,
+    "terminal_info": PRIORITY_CONTROL,
+    "last_error": PRIORITY_CONTROL,
+    "symbol_select": PRIORITY_CONTROL,
+    "positions_get": PRIORITY_POLL,
+    "orders_get": PRIORITY_POLL,
+    "symbol_info_tick": PRIORITY_POLL,
+    "copy_ticks_from": PRIORITY_POLL,
+}
+
+
+class CommandStats:
+    """Queue wait and execution time totals for one command type."""
+    __slots__ = ("count", "wait_total", "wait_max", "exec_total", "exec_max")
+
+    def __init__(self):
+        self.count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.exec_total = 0.0
+        self.exec_max = 0.0
+
+    def record(self, wait, execution):
+        self.count += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.exec_total += execution
+        self.exec_max = max(self.exec_max, execution)
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "avg_wait_seconds": self.wait_total / self.count if self.count else 0.0,
+            "max_wait_seconds": self.wait_max,
+            "avg_exec_seconds": self.exec_total / self.count if self.count else 0.0,
+            "max_exec_seconds": self.exec_max,
+        }
+
+
+class MT5Executor:
+    """
+    Single thread that owns the terminal connection and runs every MetaTrader5 call.
+
+    The MetaTrader5 package is not thread-safe, so Flask request threads and background loops
+    submit commands here instead of calling it directly. Commands are served by priority, FIFO
+    within the same priority. While paused, only control commands run; the rest, orders included,
+    are held and requeued in their original order by resume().
+    """
+
+    def __init__(self, mt5):
+        self.mt5 = mt5
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._thread = None
+        self._stats = {}
+        self._paused = False
+        self._held = []
+        self._pause_lock = threading.Lock()
+        self.observer = None  # optional callable(name, wait_seconds, exec_seconds), e.g. to feed histograms
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="mt5-executor", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stop after every command that is already queued has run."""
+        self.resume()
+        if self._thread is not None:
+            self._queue.put((PRIORITY_READ + 1, next(self._sequence), None))
+            self._thread.join(timeout)
+            self._thread = None
+
+    def pause(self):
+        """Hold every command but control commands until resume(), e.g. while the terminal reconnects."""
+        with self._pause_lock:
+            self._paused = True
+
+    def resume(self):
+        with self._pause_lock:
+            self._paused = False
+            held, self._held = self._held, []
+        for item in held:
+            self._queue.put(item)
+
+    @property
+    def paused(self):
+        return self._paused
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize() + len(self._held)
+
+    def submit(self, name, *args, priority=None, **kwargs):
+        """Queue mt5.<name>(*args, **kwargs) and return a Future for its result."""
+        if priority is None:
+            priority = COMMAND_PRIORITIES.get(name, PRIORITY_READ)
+        future = Future()
+        self._queue.put((priority, next(self._sequence), (name, args, kwargs, future, time.perf_counter())))
+        return future
+
+    def call(self, name, *args, **kwargs):
+        """Run mt5.<name> on the executor thread and wait for the result."""
+        if threading.current_thread() is self._thread:
+            return getattr(self.mt5, name)(*args, **kwargs)
+        return self.submit(name, *args, **kwargs).result()
+
+    def stats(self):
+        return {name: stats.as_dict() for name, stats in list(self._stats.items())}
+
+    def proxy(self):
+        return MT5Proxy(self)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            priority, _, command = item
+            if command is None:
+                return
+            if priority != PRIORITY_CONTROL:
+                with self._pause_lock:
+                    if self._paused:
+                        self._held.append(item)
+                        continue
+            name, args, kwargs, future, queued_at = command
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            started = time.perf_counter()
+            try:
+                result = getattr(self.mt5, name)(*args, **kwargs)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            finished = time.perf_counter()
+
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = CommandStats()
+            stats.record(started - queued_at, finished - started)
+            if self.observer is not None:
+                self.observer(name, started - queued_at, finished - started)
+
+
+class MT5Proxy:
+    """Module-like object that forwards MetaTrader5 calls to an MT5Executor and reads constants directly."""
+
+    def __init__(self, executor):
+        self._executor = executor
+
+    def __getattr__(self, name):
+        attr = getattr(self._executor.mt5, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            return self._executor.call(name, *args, **kwargs)
+
+        call.__name__ = name
+        self.__dict__[name] = call
+        return call
@@ -0,0 +1,638 @@
+"""
+Simulated MetaTrader5 module for load testing and CI.
+
+Install it before importing the bot so `import MetaTrader5` resolves to the simulator:
+
+    import mt5_sim
+    mt5_sim.install(mt5_sim.SimulatedMT5(latency={"order_send": 0.02}))
+    from app4 import TradingBot
+"""
+import itertools
+import math
+import random
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+SymbolInfo = namedtuple("SymbolInfo", [
+    "name", "description", "path", "currency_base", "currency_profit", "currency_margin", "digits", "point",
+    "spread", "trade_contract_size", "trade_tick_size", "trade_tick_value", "volume_min", "volume_step",
+    "volume_max", "visible", "select", "filling_mode", "trade_stops_level", "bid", "ask",
+])
+Tick = namedtuple("Tick", ["time", "bid", "ask", "last", "volume", "time_msc", "flags", "volume_real"])
+OrderSendResult = namedtuple("OrderSendResult", [
+    "retcode", "deal", "order", "volume", "price", "bid", "ask", "comment", "request_id", "retcode_external",
+    "request",
+])
+OrderCheckResult = namedtuple("OrderCheckResult", [
+    "retcode", "balance", "equity", "profit", "margin", "margin_free", "margin_level", "comment", "request",
+])
+TradePosition = namedtuple("TradePosition", [
+    "ticket", "time", "time_msc", "time_update", "time_update_msc", "type", "magic", "identifier", "reason",
+    "volume", "price_open", "sl", "tp", "price_current", "swap", "profit", "symbol", "comment", "external_id",
+])
+TradeOrder = namedtuple("TradeOrder", [
+    "ticket", "time_setup", "time_setup_msc", "type", "magic", "volume_initial", "volume_current", "price_open",
+    "sl", "tp", "price_current", "symbol", "comment", "external_id",
+])
+TradeDeal = namedtuple("TradeDeal", [
+    "ticket", "order", "time", "time_msc", "type", "entry", "magic", "position_id", "reason", "volume", "price",
+    "commission", "swap", "profit", "fee", "symbol", "comment", "external_id",
+])
+AccountInfo = namedtuple("AccountInfo", [
+    "login", "server", "currency", "leverage", "balance", "equity", "profit", "margin", "margin_free",
+    "margin_level",
+])
+TerminalInfo = namedtuple("TerminalInfo", ["connected", "trade_allowed", "name", "path", "ping_last"])
+
+# symbol -> (start price, digits, contract size, volume min, volume step, volume max, spread in points, path)
+DEFAULT_CATALOG = {
+    "EURUSD": (1.085, 5, 100000, 0.01, 0.01, 100, 12, "Forex\\Majors\\EURUSD"),
+    "USDJPY": (150.2, 3, 100000, 0.01, 0.01, 100, 15, "Forex\\Majors\\USDJPY"),
+    "USDCAD": (1.36, 5, 100000, 0.01, 0.01, 100, 18, "Forex\\Majors\\USDCAD"),
+    "XAUUSD": (2650.0, 2, 100, 0.01, 0.01, 50, 25, "Metals\\XAUUSD"),
+    "XAGUSD": (31.0, 3, 5000, 0.01, 0.01, 50, 30, "Metals\\XAGUSD"),
+    "BTCUSD": (65000.0, 2, 1, 0.01, 0.01, 10, 1500, "Crypto\\BTCUSD"),
+    "ETHUSD": (3000.0, 2, 1, 0.1, 0.1, 100, 200, "Crypto\\ETHUSD"),
+    "LTCUSD": (70.0, 2, 1, 1, 1, 1000, 20, "Crypto\\LTCUSD"),
+    "US100.cash": (20000.0, 2, 1, 0.1, 0.1, 100, 150, "Indices\\US100.cash"),
+    "US500.cash": (5800.0, 2, 1, 0.1, 0.1, 100, 60, "Indices\\US500.cash"),
+    "NVDA": (120.0, 2, 1, 1, 1, 10000, 4, "Stocks\\US\\NVDA"),
+}
+
+TRADE_ACTION_DEAL = 1
+TRADE_ACTION_PENDING = 5
+TRADE_ACTION_SLTP = 6
+TRADE_ACTION_MODIFY = 7
+TRADE_ACTION_REMOVE = 8
+
+ORDER_TYPE_BUY = 0
+ORDER_TYPE_SELL = 1
+ORDER_TYPE_BUY_LIMIT = 2
+ORDER_TYPE_SELL_LIMIT = 3
+ORDER_TYPE_BUY_STOP = 4
+ORDER_TYPE_SELL_STOP = 5
+
+POSITION_TYPE_BUY = 0
+POSITION_TYPE_SELL = 1
+
+DEAL_TYPE_BUY = 0
+DEAL_TYPE_SELL = 1
+DEAL_ENTRY_IN = 0
+DEAL_ENTRY_OUT = 1
+
+ORDER_TIME_GTC = 0
+ORDER_FILLING_FOK = 0
+ORDER_FILLING_IOC = 1
+ORDER_FILLING_RETURN = 2
+
+COPY_TICKS_ALL = -1
+COPY_TICKS_INFO = 1
+COPY_TICKS_TRADE = 2
+
+TIMEFRAME_M1 = 1
+TIMEFRAME_M5 = 5
+TIMEFRAME_M15 = 15
+TIMEFRAME_M30 = 30
+TIMEFRAME_H1 = 16385
+TIMEFRAME_H4 = 16388
+TIMEFRAME_D1 = 16408
+TIMEFRAME_W1 = 32769
+
+TIMEFRAME_SECONDS = {
+    TIMEFRAME_M1: 60, TIMEFRAME_M5: 300, TIMEFRAME_M15: 900, TIMEFRAME_M30: 1800,
+    TIMEFRAME_H1: 3600, TIMEFRAME_H4: 14400, TIMEFRAME_D1: 86400, TIMEFRAME_W1: 604800,
+}
+RATE_DTYPE = np.dtype([("time", "i8"), ("open", "f8"), ("high", "f8"), ("low", "f8"), ("close", "f8"),
+                       ("tick_volume", "u8"), ("spread", "i4"), ("real_volume", "u8")])
+
+TRADE_RETCODE_REQUOTE = 10004
+TRADE_RETCODE_PLACED = 10008
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_INVALID = 10013
+TRADE_RETCODE_INVALID_VOLUME = 10014
+TRADE_RETCODE_INVALID_PRICE = 10015
+TRADE_RETCODE_INVALID_STOPS = 10016
+TRADE_RETCODE_MARKET_CLOSED = 10018
+TRADE_RETCODE_NO_MONEY = 10019
+TRADE_RETCODE_POSITION_CLOSED = 10036
+
+RES_S_OK = 1
+RES_E_FAIL = -1
+RES_E_INVALID_PARAMS = -2
+RES_E_NOT_FOUND = -4
+RES_E_INTERNAL_FAIL = -10001
+
+
+class _SymbolState:
+    __slots__ = ("name", "base_price", "price", "digits", "point", "contract_size", "volume_min", "volume_step", "volume_max",
+                 "spread", "path", "visible", "last_time", "ticks")
+
+    def __init__(self, name, price, digits, contract_size, volume_min, volume_step, volume_max, spread, path):
+        self.name = name
+        self.base_price = price
+        self.price = price
+        self.digits = digits
+        self.point = 10.0 ** -digits
+        self.contract_size = contract_size
+        self.volume_min = volume_min
+        self.volume_step = volume_step
+        self.volume_max = volume_max
+        self.spread = spread
+        self.path = path
+        self.visible = False
+        self.last_time = None
+        self.ticks = []
+
+    @property
+    def bid(self):
+        return round(self.price, self.digits)
+
+    @property
+    def ask(self):
+        return round(self.price + self.spread * self.point, self.digits)
+
+
+class SimulatedMT5:
+    """
+    In-process stand-in for the MetaTrader5 package.
+
+    Prices follow a seeded random walk advanced by wall-clock time whenever a symbol is read.
+    Market orders fill at bid/ask plus random slippage up to slippage_points, and are requoted
+    when that exceeds the request's deviation. Open positions are closed when price crosses
+    their SL or TP, and limit orders fill when price reaches them. latency maps a function name
+    (or "default") to seconds slept on every call, to emulate the terminal round trip.
+    """
+
+    def __init__(self, catalog=None, seed=1, volatility=0.0002, slippage_points=0, latency=None,
+                 balance=100000.0, leverage=100, reject_rate=0.0, fail_initialize=False, max_ticks=10000):
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._symbols = {
+            name: _SymbolState(name, *spec) for name, spec in (catalog or DEFAULT_CATALOG).items()
+        }
+        self.volatility = volatility  # relative standard deviation of price per second
+        self.slippage_points = slippage_points
+        self.latency = latency or {}
+        self.balance = balance
+        self.leverage = leverage
+        self.reject_rate = reject_rate
+        self.fail_initialize = fail_initialize
+        self.max_ticks = max_ticks
+        self.connected = False
+        self.login_id = 0
+        self.server = ""
+        self._tickets = itertools.count(1000001)
+        self._positions = {}
+        self._orders = {}
+        self._deals = []
+        self._last_error = (RES_S_OK, "Success")
+        self.calls = {}
+
+    def __getattr__(self, name):
+        # Constants live at module level so `mt5.ORDER_TYPE_BUY` works on the instance too
+        value = globals().get(name)
+        if name.isupper() and value is not None:
+            return value
+        raise AttributeError(name)
+
+    def _call(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        delay = self.latency.get(name, self.latency.get("default", 0))
+        if delay:
+            time.sleep(delay)
+
+    def _error(self, code, message):
+        self._last_error = (code, message)
+        return None
+
+    # Connection
+
+    def initialize(self, path=None, login=None, password=None, server=None, timeout=None, portable=False):
+        self._call("initialize")
+        if self.fail_initialize:
+            self._error(RES_E_INTERNAL_FAIL, "Terminal: Authorization failed")
+            return False
+        self.connected = True
+        self.login_id = login
+        self.server = server
+        self._last_error = (RES_S_OK, "Success")
+        return True
+
+    def login(self, login, password=None, server=None, timeout=None):
+        self._call("login")
+        self.login_id = login
+        self.server = server
+        return True
+
+    def shutdown(self):
+        self._call("shutdown")
+        self.connected = False
+        return True
+
+    def last_error(self):
+        return self._last_error
+
+    def terminal_info(self):
+        self._call("terminal_info")
+        if not self.connected:
+            return self._error(RES_E_FAIL, "Terminal: Not connected")
+        return TerminalInfo(True, True, "Simulated MetaTrader 5", "", 1000)
+
+    def account_info(self):
+        self._call("account_info")
+        if not self.connected:
+            return self._error(RES_E_FAIL, "Terminal: Not connected")
+        with self._lock:
+            for symbol in {p.symbol for p in self._positions.values()}:
+                self._advance(self._symbols[symbol])
+            profit = sum(self._position_profit(p) for p in self._positions.values())
+            margin = sum(self._margin(self._symbols[p.symbol], p.volume, p.price_open)
+                         for p in self._positions.values())
+        equity = self.balance + profit
+        return AccountInfo(self.login_id, self.server, "USD", self.leverage,
+                           self.balance, equity, profit, margin, equity - margin,
+                           equity / margin * 100 if margin else 0.0)
+
+    # Symbols and market data
+
+    def _symbol_info(self, state):
+        return SymbolInfo(
+            state.name, state.name, state.path, state.name[:3], "USD", state.name[:3], state.digits, state.point,
+            state.spread, state.contract_size, state.point, state.contract_size * state.point, state.volume_min,
+            state.volume_step, state.volume_max, state.visible, state.visible,
+            3, 0, state.bid, state.ask,  # filling_mode: FOK | IOC
+        )
+
+    def symbols_total(self):
+        return len(self._symbols)
+
+    def symbols_get(self, group=None):
+        self._call("symbols_get")
+        with self._lock:
+            return tuple(self._symbol_info(state) for state in self._symbols.values())
+
+    def symbol_info(self, symbol):
+        self._call("symbol_info")
+        state = self._symbols.get(symbol)
+        if state is None:
+            return self._error(RES_E_NOT_FOUND, f"Symbol {symbol} not found")
+        with self._lock:
+            self._advance(state)
+            return self._symbol_info(state)
+
+    def symbol_select(self, symbol, enable=True):
+        self._call("symbol_select")
+        state = self._symbols.get(symbol)
+        if state is None:
+            self._error(RES_E_NOT_FOUND, f"Symbol {symbol} not found")
+            return False
+        state.visible = enable
+        return True
+
+    def symbol_info_tick(self, symbol):
+        self._call("symbol_info_tick")
+        state = self._symbols.get(symbol)
+        if state is None:
+            return self._error(RES_E_NOT_FOUND, f"Symbol {symbol} not found")
+        with self._lock:
+            self._advance(state)
+            return state.ticks[-1]
+
+    def copy_ticks_from(self, symbol, date_from, count, flags):
+        self._call("copy_ticks_from")
+        state = self._symbols.get(symbol)
+        if state is None:
+            return self._error(RES_E_NOT_FOUND, f"Symbol {symbol} not found")
+        with self._lock:
+            self._advance(state)
+            since = date_from.timestamp() if hasattr(date_from, "timestamp") else float(date_from)
+            ticks = [tick for tick in state.ticks if tick.time_msc >= since * 1000][:count]
+        dtype = [("time", "i8"), ("bid", "f8"), ("ask", "f8"), ("last", "f8"), ("volume", "u8"),
+                 ("time_msc", "i8"), ("flags", "u4"), ("volume_real", "f8")]
+        return np.array([tuple(tick) for tick in ticks], dtype=dtype)
+
+    def _history(self, state, timeframe, first, last):
+        """
+        Bars opening between first and last (epoch seconds, inclusive), up to the bar that is forming now.
+
+        History is a deterministic function of the bar time, so the same range always returns the same
+        bars and a later call extends an earlier one.
+        """
+        seconds = TIMEFRAME_SECONDS.get(timeframe)
+        if seconds is None:
+            return self._error(RES_E_INVALID_PARAMS, f"Invalid timeframe {timeframe}")
+        first = -(-int(first) // seconds) * seconds
+        last = min(int(last), int(time.time())) // seconds * seconds
+        times = np.arange(first, last + 1, seconds, dtype=np.int64)
+
+        def mid(t):
+            t = t.astype(np.float64)
+            noise = np.sin(t * 12.9898 + len(state.name)) * 43758.5453
+            noise = noise - np.floor(noise) - 0.5
+            return state.base_price * np.exp(0.02 * np.sin(t / 86400.0) + 0.005 * np.sin(t / 3600.0)
+                                             + 0.0005 * noise)
+
+        rates = np.zeros(len(times), dtype=RATE_DTYPE)
+        rates["time"] = times
+        rates["open"] = np.round(mid(times), state.digits)
+        rates["close"] = np.round(mid(times + seconds - 1), state.digits)
+        swing = np.abs(rates["close"] - rates["open"]) * 0.5 + state.spread * state.point
+        rates["high"] = np.round(np.maximum(rates["open"], rates["close"]) + swing, state.digits)
+        rates["low"] = np.round(np.minimum(rates["open"], rates["close"]) - swing, state.digits)
+        rates["tick_volume"] = seconds // 2 + (times // seconds) % 17
+        rates["spread"] = state.spread
+        return rates
+
+    def _timestamp(self, value):
+        return value.timestamp() if hasattr(value, "timestamp") else float(value)
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        self._call("copy_rates_range")
+        state = self._symbols.get(symbol)
+        if state is None:
+            return self._error(RES_E_NOT_FOUND, f"Symbol {symbol} not found")
+        return self._history(state, timeframe, self._timestamp(date_from), self._timestamp(date_to))
+
+    def copy_rates_from(self, symbol, timeframe, date_from, count):
+        """The count bars that end at date_from, oldest first."""
+        self._call("copy_rates_from")
+        state = self._symbols.get(symbol)
+        if state is None or timeframe not in TIMEFRAME_SECONDS:
+            return self._error(RES_E_INVALID_PARAMS, f"Invalid symbol {symbol} or timeframe {timeframe}")
+        seconds = TIMEFRAME_SECONDS[timeframe]
+        last = int(self._timestamp(date_from)) // seconds * seconds
+        return self._history(state, timeframe, last - (count - 1) * seconds, last)
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        """The count bars that end start_pos bars before the current one, oldest first."""
+        self._call("copy_rates_from_pos")
+        state = self._symbols.get(symbol)
+        if state is None or timeframe not in TIMEFRAME_SECONDS:
+            return self._error(RES_E_INVALID_PARAMS, f"Invalid symbol {symbol} or timeframe {timeframe}")
+        seconds = TIMEFRAME_SECONDS[timeframe]
+        last = int(time.time()) // seconds * seconds - start_pos * seconds
+        return self._history(state, timeframe, last - (count - 1) * seconds, last)
+
+    def _advance(self, state):
+        """Move the symbol's random walk forward to now and settle anything its new price triggers."""
+        now = time.time()
+        if state.last_time is not None:
+            elapsed = now - state.last_time
+            if elapsed <= 0:
+                return
+            state.price *= math.exp(self._random.gauss(0, self.volatility * math.sqrt(elapsed)))
+        state.last_time = now
+        time_msc = int(now * 1000)
+        state.ticks.append(Tick(int(now), state.bid, state.ask, 0.0, 0, time_msc, 6, 0.0))
+        if len(state.ticks) > self.max_ticks:
+            del state.ticks[:len(state.ticks) - self.max_ticks]
+        self._check_triggers(state)
+
+    # Trading
+
+    def _margin(self, state, volume, price):
+        return volume * state.contract_size * price / self.leverage
+
+    def _position_profit(self, position):
+        state = self._symbols[position.symbol]
+        close = state.bid if position.type == POSITION_TYPE_BUY else state.ask
+        sign = 1 if position.type == POSITION_TYPE_BUY else -1
+        return sign * (close - position.price_open) * position.volume * state.contract_size
+
+    def _result(self, retcode, request, deal=0, order=0, volume=0.0, price=0.0, comment=""):
+        state = self._symbols.get(request.get("symbol", ""))
+        bid, ask = (state.bid, state.ask) if state else (0.0, 0.0)
+        return OrderSendResult(retcode, deal, order, volume, price, bid, ask, comment, 0, 0, request)
+
+    def _validate_volume(self, state, volume):
+        if volume < state.volume_min - 1e-9 or volume > state.volume_max + 1e-9:
+            return False
+        steps = volume / state.volume_step
+        return abs(steps - round(steps)) < 1e-6
+
+    def order_check(self, request):
+        self._call("order_check")
+        with self._lock:
+            state = self._symbols.get(request.get("symbol"))
+            if state is None:
+                return OrderCheckResult(TRADE_RETCODE_INVALID, self.balance, self.balance, 0.0, 0.0, self.balance,
+                                        0.0, "Invalid symbol", request)
+            self._advance(state)
+            if not self._validate_volume(state, request.get("volume", 0)):
+                return OrderCheckResult(TRADE_RETCODE_INVALID_VOLUME, self.balance, self.balance, 0.0, 0.0,
+                                        self.balance, 0.0, "Invalid volume", request)
+            price = request.get("price") or state.ask
+            margin = self._margin(state, request["volume"], price)
+            free = self.balance - margin
+            retcode = 0 if free >= 0 else TRADE_RETCODE_NO_MONEY
+            return OrderCheckResult(retcode, self.balance, self.balance, 0.0, margin, free,
+                                    self.balance / margin * 100 if margin else 0.0, "Done", request)
+
+    def order_send(self, request):
+        self._call("order_send")
+        if not self.connected:
+            return self._error(RES_E_FAIL, "Terminal: Not connected")
+        with self._lock:
+            action = request.get("action")
+            if action == TRADE_ACTION_SLTP:
+                return self._modify(request)
+            if action == TRADE_ACTION_REMOVE:
+                order = self._orders.pop(request.get("order"), None)
+                retcode = TRADE_RETCODE_DONE if order else TRADE_RETCODE_INVALID
+                return self._result(retcode, request, order=request.get("order", 0))
+
+            state = self._symbols.get(request.get("symbol"))
+            if state is None:
+                return self._result(TRADE_RETCODE_INVALID, request, comment="Invalid symbol")
+            self._advance(state)
+            if not self._validate_volume(state, request.get("volume", 0)):
+                return self._result(TRADE_RETCODE_INVALID_VOLUME, request, comment="Invalid volume")
+            if self.reject_rate and self._random.random() < self.reject_rate:
+                return self._result(TRADE_RETCODE_MARKET_CLOSED, request, comment="Market closed")
+
+            if action == TRADE_ACTION_PENDING:
+                return self._place_pending(state, request)
+            if action == TRADE_ACTION_DEAL and request.get("position"):
+                return self._close(state, request)
+            if action == TRADE_ACTION_DEAL:
+                return self._open(state, request)
+            return self._result(TRADE_RETCODE_INVALID, request, comment="Unsupported action")
+
+    def _fill_price(self, state, buy, request):
+        price = state.ask if buy else state.bid
+        slippage = self._random.randint(0, self.slippage_points) if self.slippage_points else 0
+        if slippage > request.get("deviation", 0):
+            return None
+        return round(price + (slippage if buy else -slippage) * state.point, state.digits)
+
+    def _open(self, state, request, order_ticket=None):
+        buy = request["type"] in (ORDER_TYPE_BUY, ORDER_TYPE_BUY_LIMIT)
+        price = self._fill_price(state, buy, request)
+        if price is None:
+            return self._result(TRADE_RETCODE_REQUOTE, request, comment="Requote")
+        margin = self._margin(state, request["volume"], price)
+        if margin > self.balance - sum(self._margin(self._symbols[p.symbol], p.volume, p.price_open)
+                                       for p in self._positions.values()):
+            return self._result(TRADE_RETCODE_NO_MONEY, request, comment="No money")
+
+        ticket = order_ticket or next(self._tickets)
+        now = time.time()
+        position = TradePosition(
+            ticket, int(now), int(now * 1000), int(now), int(now * 1000),
+            POSITION_TYPE_BUY if buy else POSITION_TYPE_SELL, request.get("magic", 0), ticket, 0,
+            request["volume"], price, request.get("sl") or 0.0, request.get("tp") or 0.0, price, 0.0, 0.0,
+            state.name, request.get("comment", ""), "",
+        )
+        self._positions[ticket] = position
+        deal = self._record_deal(position, DEAL_TYPE_BUY if buy else DEAL_TYPE_SELL, DEAL_ENTRY_IN,
+                                 request["volume"], price, 0.0, request.get("magic", 0),
+                                 request.get("comment", ""), ticket)
+        return self._result(TRADE_RETCODE_DONE, request, deal=deal, order=ticket, volume=request["volume"],
+                            price=price, comment="Request executed")
+
+    def _close(self, state, request, price=None, comment=None):
+        position = self._positions.get(request["position"])
+        if position is None:
+            return self._result(TRADE_RETCODE_POSITION_CLOSED, request, comment="Position closed")
+        volume = min(request.get("volume", position.volume), position.volume)
+        closing_buy = position.type == POSITION_TYPE_SELL
+        if price is None:
+            price = self._fill_price(state, closing_buy, request)
+            if price is None:
+                return self._result(TRADE_RETCODE_REQUOTE, request, comment="Requote")
+
+        sign = 1 if position.type == POSITION_TYPE_BUY else -1
+        profit = sign * (price - position.price_open) * volume * state.contract_size
+        self.balance += profit
+        remaining = round(position.volume - volume, 8)
+        if remaining <= 1e-9:
+            del self._positions[position.ticket]
+        else:
+            self._positions[position.ticket] = position._replace(volume=remaining)
+        ticket = next(self._tickets)
+        deal = self._record_deal(position, DEAL_TYPE_BUY if closing_buy else DEAL_TYPE_SELL, DEAL_ENTRY_OUT,
+                                 volume, price, profit, request.get("magic", position.magic),
+                                 comment if comment is not None else request.get("comment", ""), ticket)
+        return self._result(TRADE_RETCODE_DONE, request, deal=deal, order=ticket, volume=volume, price=price,
+                            comment="Request executed")
+
+    def _modify(self, request):
+        position = self._positions.get(request.get("position"))
+        if position is None:
+            return self._result(TRADE_RETCODE_POSITION_CLOSED, request, comment="Position closed")
+        self._positions[position.ticket] = position._replace(
+            sl=request.get("sl") or 0.0, tp=request.get("tp") or 0.0, time_update=int(time.time()),
+        )
+        return self._result(TRADE_RETCODE_DONE, request, order=position.ticket, comment="Request executed")
+
+    def _place_pending(self, state, request):
+        buy = request["type"] == ORDER_TYPE_BUY_LIMIT
+        price = request.get("price", 0)
+        if (buy and price >= state.ask) or (not buy and price <= state.bid):
+            return self._result(TRADE_RETCODE_INVALID_PRICE, request, comment="Invalid price")
+        ticket = next(self._tickets)
+        now = time.time()
+        self._orders[ticket] = TradeOrder(
+            ticket, int(now), int(now * 1000), request["type"], request.get("magic", 0), request["volume"],
+            request["volume"], price, request.get("sl") or 0.0, request.get("tp") or 0.0, state.bid, state.name,
+            request.get("comment", ""), "",
+        )
+        return self._result(TRADE_RETCODE_PLACED, request, order=ticket, volume=request["volume"], price=price,
+                            comment="Request placed")
+
+    def _record_deal(self, position, deal_type, entry, volume, price, profit, magic, comment, order):
+        now = time.time()
+        ticket = next(self._tickets)
+        self._deals.append(TradeDeal(
+            ticket, order, int(now), int(now * 1000), deal_type, entry, magic, position.ticket, 0, volume, price,
+            0.0, 0.0, profit, 0.0, position.symbol, comment, "",
+        ))
+        return ticket
+
+    def _check_triggers(self, state):
+        for order in [o for o in self._orders.values() if o.symbol == state.name]:
+            buy = order.type == ORDER_TYPE_BUY_LIMIT
+            if (buy and state.ask <= order.price_open) or (not buy and state.bid >= order.price_open):
+                del self._orders[order.ticket]
+                request = {"symbol": state.name, "volume": order.volume_current, "type": order.type,
+                           "sl": order.sl, "tp": order.tp, "magic": order.magic, "comment": order.comment,
+                           "deviation": self.slippage_points}
+                self._open(state, request, order_ticket=order.ticket)
+
+        for position in [p for p in self._positions.values() if p.symbol == state.name]:
+            buy = position.type == POSITION_TYPE_BUY
+            close = state.bid if buy else state.ask
+            hit_sl = position.sl and (close <= position.sl if buy else close >= position.sl)
+            hit_tp = position.tp and (close >= position.tp if buy else close <= position.tp)
+            if hit_sl or hit_tp:
+                request = {"position": position.ticket, "volume": position.volume, "magic": position.magic}
+                self._close(state, request, price=close, comment="[sl]" if hit_sl else "[tp]")
+
+    # Account state
+
+    def positions_total(self):
+        return len(self._positions)
+
+    def positions_get(self, symbol=None, group=None, ticket=None):
+        self._call("positions_get")
+        with self._lock:
+            for state in {self._symbols[p.symbol] for p in self._positions.values()}:
+                self._advance(state)
+            positions = list(self._positions.values())
+            result = []
+            for position in positions:
+                if symbol is not None and position.symbol != symbol:
+                    continue
+                if ticket is not None and position.ticket != ticket:
+                    continue
+                state = self._symbols[position.symbol]
+                current = state.bid if position.type == POSITION_TYPE_BUY else state.ask
+                result.append(position._replace(price_current=current, profit=self._position_profit(position)))
+        return tuple(result)
+
+    def orders_total(self):
+        return len(self._orders)
+
+    def orders_get(self, symbol=None, group=None, ticket=None):
+        self._call("orders_get")
+        with self._lock:
+            return tuple(
+                order for order in self._orders.values()
+                if (symbol is None or order.symbol == symbol) and (ticket is None or order.ticket == ticket)
+            )
+
+    def history_deals_get(self, date_from=None, date_to=None, group=None, ticket=None, position=None):
+        self._call("history_deals_get")
+        start = date_from.timestamp() if hasattr(date_from, "timestamp") else (date_from or 0)
+        end = date_to.timestamp() if hasattr(date_to, "timestamp") else (date_to or float("inf"))
+        with self._lock:
+            return tuple(
+                deal for deal in self._deals
+                if start <= deal.time <= end
+                and (ticket is None or deal.ticket == ticket)
+                and (position is None or deal.position_id == position)
+            )
+
+
+_default = None
+
+
+def __getattr__(name):
+    """Forward module-level calls to a default simulator, so `import mt5_sim` works as a MetaTrader5 stand-in."""
+    global _default
+    if name.startswith("__"):
+        raise AttributeError(name)
+    if _default is None:
+        _default = SimulatedMT5()
+    return getattr(_default, name)
+
+
+def install(simulator=None):
+    """Register a simulator as the MetaTrader5 module and return it."""
+    simulator = simulator or SimulatedMT5()
+    sys.modules["MetaTrader5"] = simulator
+    return simulator
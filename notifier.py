@@ -0,0 +1,154 @@
+import logging
+import queue
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+log = logging.getLogger(__name__)
+
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+
+
+class TelegramNotifier:
+    """
+    Background Telegram dispatcher.
+
+    notify() only enqueues and never blocks. A single worker thread drains the bounded queue,
+    coalesces messages that arrive within a short window into one sendMessage call, reuses
+    pooled connections and backs off when Telegram answers 429.
+    """
+
+    def __init__(self, token, chat_id, base_url="https://api.telegram.org", max_queue=1000,
+                 coalesce_window=0.5, timeout=5.0, separator="\n\n"):
+        self.url = f"{base_url.rstrip('/')}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.coalesce_window = coalesce_window
+        self.timeout = timeout
+        self.separator = separator
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.session = requests.Session()
+        retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504),
+                      allowed_methods=frozenset(["POST"]))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=retry))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=retry))
+        self._carry = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self.enqueued = 0
+        self.dropped = 0
+        self.sent_messages = 0
+        self.sent_batches = 0
+        self.failed = 0
+        self.rate_limited = 0
+
+    @property
+    def queue_depth(self):
+        return self.queue.qsize()
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue_depth,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "sent_messages": self.sent_messages,
+            "sent_batches": self.sent_batches,
+            "failed": self.failed,
+            "rate_limited": self.rate_limited,
+        }
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="telegram-notifier", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stop the worker after it has flushed whatever is already queued."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def notify(self, message):
+        """Queue a message for delivery. Returns False if the queue is full and the message was dropped."""
+        try:
+            self.queue.put_nowait(message[:TELEGRAM_MAX_MESSAGE_LENGTH])
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    def _next_batch(self):
+        """Block for the first message, then collect more until the window closes or the text is full."""
+        if self._carry is not None:
+            first, self._carry = self._carry, None
+        else:
+            try:
+                first = self.queue.get(timeout=0.2)
+            except queue.Empty:
+                return None
+
+        batch = [first]
+        length = len(first)
+        deadline = time.monotonic() + self.coalesce_window
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                message = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if length + len(self.separator) + len(message) > TELEGRAM_MAX_MESSAGE_LENGTH:
+                self._carry = message
+                break
+            batch.append(message)
+            length += len(self.separator) + len(message)
+        return batch
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._carry is None and self.queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._send(batch)
+
+    def _send(self, batch):
+        payload = {"chat_id": self.chat_id, "text": self.separator.join(batch)}
+        while True:
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                self.failed += len(batch)
+                log.error("Error sending Telegram message: %s", e)
+                return
+
+            if response.status_code == 429:
+                self.rate_limited += 1
+                delay = self._retry_after(response)
+                log.warning("Telegram rate limit hit, retrying in %ss", delay)
+                if self._stopping.wait(delay):
+                    self.failed += len(batch)
+                    return
+                continue
+
+            if response.status_code == 200:
+                self.sent_messages += len(batch)
+                self.sent_batches += 1
+            else:
+                self.failed += len(batch)
+                log.error("Error sending Telegram message: %s", response.text)
+            return
+
+    @staticmethod
+    def _retry_after(response):
+        try:
+            return float(response.json()["parameters"]["retry_after"])
+        except (ValueError, KeyError, TypeError):
+            pass
+        try:
+            return float(response.headers.get("Retry-After", 1))
+        except ValueError:
+            return 1.0
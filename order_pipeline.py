@@ -0,0 +1,140 @@
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from jsonlog import correlation, new_id
+
+log = logging.getLogger(__name__)
+
+QUEUED = "queued"
+PROCESSING = "processing"
+FILLED = "filled"
+REJECTED = "rejected"
+FAILED = "failed"
+
+
+@dataclass(slots=True)
+class OrderRecord:
+    """Progress of one accepted signal through the order pipeline."""
+    signal_id: str
+    signal: object
+    state: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    result: dict = None
+
+    def update(self, state, result=None):
+        self.state = state
+        self.result = result
+        self.updated_at = time.time()
+
+    def finish(self, body, status):
+        """Settle the record from the handler's (body, status) pair."""
+        if status < 300:
+            self.update(FILLED, body)
+        elif status < 500:
+            self.update(REJECTED, body)
+        else:
+            self.update(FAILED, body)
+
+    def as_dict(self):
+        return {
+            "signal_id": self.signal_id,
+            "state": self.state,
+            "symbol": self.signal.symbol,
+            "action": self.signal.action,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "result": self.result,
+        }
+
+
+class OrderPipeline:
+    """
+    Bounded in-process work queue between the webhook and the broker.
+
+    submit() returns immediately with a record whose state moves from queued to processing and
+    then to filled, rejected or failed. handler(signal) must return the (body, status) pair the
+    synchronous webhook would have returned.
+    """
+
+    def __init__(self, handler, max_queue=100, workers=1, max_records=10000):
+        self.handler = handler
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.workers = workers
+        self.max_records = max_records
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads = []
+        self.rejected_full = 0
+
+    @property
+    def queue_depth(self):
+        return self.queue.qsize()
+
+    def start(self):
+        for i in range(self.workers - len(self._threads)):
+            thread = threading.Thread(target=self._run, name=f"order-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=10.0):
+        """Finish every queued signal, then stop the workers."""
+        for _ in self._threads:
+            self.queue.put(None)
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def submit(self, signal, signal_id=None):
+        """Queue a parsed signal. Returns its OrderRecord, or None if the queue is full."""
+        record = OrderRecord(signal_id or new_id(), signal)
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.rejected_full += 1
+            return None
+        self._remember(record)
+        return record
+
+    def track(self, signal, future, signal_id=None):
+        """Record a signal traded outside the queue (e.g. by the coalescer) and settle it when its Future does."""
+        record = OrderRecord(signal_id or new_id(), signal)
+        self._remember(record)
+
+        def settle(done):
+            if done.exception() is not None:
+                record.update(FAILED, {"status": "error", "message": str(done.exception())})
+            else:
+                record.finish(*done.result())
+
+        future.add_done_callback(settle)
+        return record
+
+    def _remember(self, record):
+        with self._lock:
+            self._records[record.signal_id] = record
+            while len(self._records) > self.max_records:
+                self._records.popitem(last=False)
+
+    def get(self, signal_id):
+        return self._records.get(signal_id)
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            if record is None:
+                return
+            record.update(PROCESSING)
+            with correlation(record.signal_id):
+                try:
+                    body, status = self.handler(record.signal)
+                except Exception as e:
+                    log.exception("Failed to process signal %s: %s", record.signal_id, e)
+                    record.update(FAILED, {"status": "error", "message": str(e)})
+                    continue
+                record.finish(body, status)
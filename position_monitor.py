@@ -0,0 +1,342 @@
+import logging
+import math
+import queue
+import threading
+import time
+from dataclasses import dataclass
+
+from journal import MANAGE, RELEASE, STAGE
+from jsonlog import correlation, correlation_id
+from triggers import BREAKEVEN, BUY, TP1, TRAIL, Trigger, TriggerBook
+
+log = logging.getLogger(__name__)
+tick_log = logging.getLogger(__name__ + ".ticks")  # per-quote records, sampled (see jsonlog.Sampler)
+
+
+@dataclass(slots=True)
+class ManagedPosition:
+    """A position the bot manages after entry: partial close at TP1, then TP2 with SL at entry."""
+    ticket: int
+    symbol: str
+    tp_levels: list
+    entry_price: float
+    side: str = BUY
+    volume: float = 0.0
+    sl: float = None
+    trigger: Trigger = None  # the pending trigger for the position's next step
+    correlation_id: str = None  # ID of the signal that opened the position, logged with every action
+    stage: str = TP1  # the next step: TP1 (partial close), BREAKEVEN (SL to entry) or TRAIL
+
+
+class PositionMonitor:
+    """
+    Manages every registered position from one thread, driven by price triggers.
+
+    Each position has one pending trigger in a TriggerBook: TP1 until the partial close is done,
+    then, with a trailing stop configured, the next trailing step. on_quote() is meant to be called
+    for every new quote (MarketData listeners) and hands crossed triggers to the monitor thread, so
+    an action starts within milliseconds of the quote that caused it. Every interval the thread also
+    reconciles with one positions_get() call, dropping closed positions, and feeds the latest quote
+    of each managed symbol through on_quote() in case no listener is attached. With a journal,
+    registrations, stage changes and releases are recorded so that resume() can pick the positions up
+    again after a restart without repeating the partial close or giving up a trailed stop.
+    """
+
+    def __init__(self, mt5, symbols, notify, quotes=None, interval=1.0, tp1_percent=50, journal=None,
+                 tp1_tolerance=0.1, trail_points=0, trail_step_points=0, account=None):
+        self.mt5 = mt5
+        self.symbols = symbols
+        self.notify = notify
+        self.quotes = quotes or mt5.symbol_info_tick
+        self.interval = interval
+        self.tp1_percent = tp1_percent
+        self.journal = journal
+        self.tp1_tolerance = tp1_tolerance  # price distance before TP1 at which the partial close fires
+        self.trail_points = trail_points  # trailing stop distance after TP1, in points; 0 disables trailing
+        self.trail_step_points = trail_step_points  # minimum stop improvement per trailing modification
+        self.account = account  # fan-out account name, which keeps its journal entries apart; None for the bot's own
+        self.book = TriggerBook()
+        self._positions = {}
+        self._actions = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self.cycles = 0
+        self.last_cycle_seconds = 0.0
+        self.max_cycle_seconds = 0.0
+        self.total_cycle_seconds = 0.0
+        self.triggers_fired = 0
+        self.last_trigger_seconds = 0.0
+        self.max_trigger_seconds = 0.0
+        self.total_trigger_seconds = 0.0
+
+    def register(self, ticket, symbol, tp_levels, entry_price, side=BUY, volume=0.0, stage=TP1):
+        """Manage a position; with stage=BREAKEVEN, reaching TP1 only moves the SL to entry."""
+        signal_id = correlation_id.get()
+        self._track(ManagedPosition(ticket, symbol, list(tp_levels), entry_price, side.lower(), volume,
+                                    correlation_id=signal_id, stage=stage))
+        if self.journal is not None:
+            self.journal.record(MANAGE, ticket, symbol=symbol, tp_levels=list(tp_levels), entry_price=entry_price,
+                                side=side.lower(), correlation_id=signal_id, stage=stage, account=self.account)
+
+    def _track(self, item):
+        with self._lock:
+            previous = self._positions.get(item.ticket)
+            self._positions[item.ticket] = item
+        if previous is not None and previous.trigger is not None:
+            self.book.remove(previous.trigger)
+        if item.stage == TRAIL:
+            self._arm_trail(item)
+        else:
+            self._arm(item, item.stage, self._tp1_level(item))
+
+    def _tp1_level(self, item):
+        if item.side == BUY:
+            return item.tp_levels[0] - self.tp1_tolerance
+        return item.tp_levels[0] + self.tp1_tolerance
+
+    def _arm(self, item, kind, level):
+        item.trigger = Trigger(item.ticket, item.symbol, item.side, kind, level, rising=item.side == BUY)
+        self.book.add(item.trigger)
+
+    def deregister(self, ticket, reason="released"):
+        with self._lock:
+            item = self._positions.pop(ticket, None)
+        if item is None:
+            return None
+        if item.trigger is not None:
+            self.book.remove(item.trigger)
+        if self.journal is not None:
+            self.journal.record(RELEASE, ticket, reason=reason)
+        return item
+
+    def _advance(self, item, stage, volume=None):
+        """Move a position to its next stage and journal it with the remaining volume and current SL."""
+        item.stage = stage
+        if self.journal is not None:
+            self.journal.record(STAGE, item.ticket, stage=stage, volume=item.volume if volume is None else volume,
+                                sl=item.sl)
+
+    def resume(self):
+        """Re-register the journaled positions that are still open, checked against one positions_get() snapshot."""
+        entries = self.journal.managed_positions(self.account)
+        if not entries:
+            return 0
+        positions = self.mt5.positions_get()
+        if positions is None:
+            log.error("positions_get() failed, error code = %s", self.mt5.last_error())
+            return 0
+        open_positions = {position.ticket: position for position in positions}
+        for ticket, entry in entries.items():
+            position = open_positions.get(ticket)
+            if position is not None:
+                # Past TP1 the partial close is not repeated: the SL moves to entry at TP1, or trails from the stored SL
+                self._track(ManagedPosition(ticket, entry["symbol"], entry["tp_levels"], entry["entry_price"],
+                                            entry.get("side", BUY), position.volume,
+                                            sl=entry.get("sl") or position.sl or None,
+                                            correlation_id=entry.get("correlation_id"),
+                                            stage=entry.get("stage", TP1)))
+        for ticket in entries.keys() - open_positions.keys():
+            self.journal.record(RELEASE, ticket, reason="closed while offline")
+        resumed = len(entries.keys() & open_positions.keys())
+        log.info("Resumed monitoring of %d positions, %d closed while offline.", resumed, len(entries) - resumed)
+        return resumed
+
+    def managed(self):
+        with self._lock:
+            return list(self._positions.values())
+
+    def stats(self):
+        return {
+            "managed_positions": len(self._positions),
+            "pending_triggers": len(self.book),
+            "cycles": self.cycles,
+            "last_cycle_seconds": self.last_cycle_seconds,
+            "max_cycle_seconds": self.max_cycle_seconds,
+            "avg_cycle_seconds": self.total_cycle_seconds / self.cycles if self.cycles else 0.0,
+            "triggers_fired": self.triggers_fired,
+            "last_trigger_seconds": self.last_trigger_seconds,
+            "max_trigger_seconds": self.max_trigger_seconds,
+            "avg_trigger_seconds": self.total_trigger_seconds / self.triggers_fired if self.triggers_fired else 0.0,
+        }
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="position-monitor", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stopping.set()
+        self._actions.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def on_quote(self, symbol, bid, ask):
+        """Queue the actions of every trigger this quote crosses. Cheap enough to call on every tick."""
+        if tick_log.isEnabledFor(logging.DEBUG):
+            tick_log.debug("Quote", extra={"symbol": symbol, "bid": bid, "ask": ask})
+        fired = self.book.crossed(symbol, bid, ask)
+        if fired:
+            received = time.perf_counter()
+            for trigger in fired:
+                self._actions.put((trigger, bid, ask, received))
+
+    def _run(self):
+        next_cycle = time.monotonic() + self.interval
+        while not self._stopping.is_set():
+            try:
+                action = self._actions.get(timeout=max(0.0, next_cycle - time.monotonic()))
+            except queue.Empty:
+                action = None
+            if action is not None:
+                try:
+                    self.fire(*action)
+                except Exception as e:
+                    log.exception("Position monitor action failed: %s", e)
+            if time.monotonic() >= next_cycle:
+                try:
+                    self.run_cycle()
+                except Exception as e:
+                    log.exception("Position monitor cycle failed: %s", e)
+                next_cycle = time.monotonic() + self.interval
+
+    def run_cycle(self):
+        """Drop positions that are no longer open and check every managed symbol's latest quote."""
+        managed = self.managed()
+        if not managed:
+            return
+
+        started = time.perf_counter()
+        positions = self.mt5.positions_get()
+        if positions is None:
+            log.error("positions_get() failed, error code = %s", self.mt5.last_error())
+            return
+        open_positions = {position.ticket: position for position in positions}
+        for item in managed:
+            position = open_positions.get(item.ticket)
+            if position is None:
+                with correlation(item.correlation_id):
+                    log.info("Order %s not found, released.", item.ticket, extra={"ticket": item.ticket})
+                self.deregister(item.ticket, "closed")
+            else:
+                item.volume = position.volume
+
+        for symbol in {item.symbol for item in managed}:
+            tick = self.quotes(symbol)
+            if tick is not None:
+                self.on_quote(symbol, tick.bid, tick.ask)
+
+        elapsed = time.perf_counter() - started
+        self.cycles += 1
+        self.last_cycle_seconds = elapsed
+        self.total_cycle_seconds += elapsed
+        self.max_cycle_seconds = max(self.max_cycle_seconds, elapsed)
+
+    def fire(self, trigger, bid, ask, received):
+        """Run the action of a crossed trigger and record how long it took from the quote."""
+        item = self._positions.get(trigger.ticket)
+        if item is None or item.trigger is not trigger:
+            return
+        item.trigger = None
+        price = bid if item.side == BUY else ask
+        with correlation(item.correlation_id):
+            if trigger.kind == TP1:
+                self.take_tp1(item, price)
+            elif trigger.kind == BREAKEVEN:
+                self.break_even(item)
+            elif trigger.kind == TRAIL:
+                self.trail(item, price)
+
+        elapsed = time.perf_counter() - received
+        self.triggers_fired += 1
+        self.last_trigger_seconds = elapsed
+        self.total_trigger_seconds += elapsed
+        self.max_trigger_seconds = max(self.max_trigger_seconds, elapsed)
+
+    def take_tp1(self, item, current_price):
+        """Close part of the position at TP1, then move SL to entry and TP to TP2."""
+        log.info("TP1 reached for order %s. Taking %s%% profit and adjusting position.", item.ticket, self.tp1_percent,
+                 extra={"ticket": item.ticket, "price": current_price})
+
+        # Floor the partial volume to the volume step; both parts must meet the minimum volume
+        info = self.symbols.get(item.symbol)
+        volume_part = round(math.floor(item.volume * self.tp1_percent / 100 / info.volume_step + 1e-9)
+                            * info.volume_step, 2)
+        min_volume = info.volume_min
+        if volume_part < min_volume or round(item.volume - volume_part, 2) < min_volume:
+            log.warning("Cannot close %s%% of position %s - volume below minimum required (%s).", self.tp1_percent,
+                        item.ticket, min_volume, extra={"ticket": item.ticket})
+            self.deregister(item.ticket, "tp1")
+            return
+
+        close_request = {
+            "action": self.mt5.TRADE_ACTION_DEAL,
+            "position": item.ticket,
+            "symbol": item.symbol,
+            "volume": volume_part,
+            "type": self.mt5.ORDER_TYPE_SELL if item.side == BUY else self.mt5.ORDER_TYPE_BUY,
+            "price": current_price,
+            "deviation": 20,
+            "magic": 234000,
+            "comment": "Partial close at TP1",
+        }
+        # Journaled before the close is sent, so a restart can never close part of the position twice
+        self._advance(item, BREAKEVEN, round(item.volume - volume_part, 2))
+        close_result = self.mt5.order_send(close_request)
+        if close_result is None or close_result.retcode != self.mt5.TRADE_RETCODE_DONE:
+            log.error("Failed to close %s%% of position %s. Error: %s, %s", self.tp1_percent, item.ticket,
+                      getattr(close_result, "retcode", None), self.mt5.last_error(), extra={"ticket": item.ticket})
+            self.deregister(item.ticket, "tp1")
+            return
+        item.volume = round(item.volume - volume_part, 2)
+        log.info("%s%% of position %s closed successfully at TP1.", self.tp1_percent, item.ticket,
+                 extra={"ticket": item.ticket, "volume": volume_part})
+
+        self.break_even(item, "tp1")
+
+    def break_even(self, item, reason=BREAKEVEN):
+        """Set SL to entry and TP to TP2, then trail the stop or release the position."""
+        if not self.modify(item, item.entry_price):
+            self.deregister(item.ticket, reason)
+            return
+        self.notify(f"Order {item.ticket} modified to TP2 with SL at entry.")
+        if self.trail_points:
+            self._advance(item, TRAIL)
+            self._arm_trail(item)
+        else:
+            self.deregister(item.ticket, reason)
+
+    def _arm_trail(self, item):
+        """Arm the level at which the stop can be moved one step further behind the price."""
+        point = self.symbols.get(item.symbol).point
+        distance = (self.trail_points + self.trail_step_points) * point
+        self._arm(item, TRAIL, item.sl + distance if item.side == BUY else item.sl - distance)
+
+    def trail(self, item, current_price):
+        """Move the stop loss to trail_points behind the price and arm the next step."""
+        point = self.symbols.get(item.symbol).point
+        distance = self.trail_points * point
+        new_sl = current_price - distance if item.side == BUY else current_price + distance
+        if self.modify(item, round(new_sl, self.symbols.get(item.symbol).digits)):
+            self._advance(item, TRAIL)
+            self._arm_trail(item)
+        else:
+            self.deregister(item.ticket, "trail_failed")
+
+    def modify(self, item, sl):
+        """Send an SL/TP modification keeping TP2 as the target. Returns True on success."""
+        modify_request = {
+            "action": self.mt5.TRADE_ACTION_SLTP,
+            "position": item.ticket,
+            "sl": sl,
+            "tp": item.tp_levels[1] if len(item.tp_levels) > 1 else None,
+        }
+        modify_result = self.mt5.order_send(modify_request)
+        if modify_result is not None and modify_result.retcode == self.mt5.TRADE_RETCODE_DONE:
+            item.sl = sl
+            log.info("Stop loss of order %s moved to %s", item.ticket, sl, extra={"ticket": item.ticket, "sl": sl})
+            return True
+        log.error("Failed to modify order %s. Error: %s, %s", item.ticket, getattr(modify_result, "retcode", None),
+                  self.mt5.last_error(), extra={"ticket": item.ticket})
+        return False
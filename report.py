@@ -0,0 +1,204 @@
+"""
+Trade analytics report: how each signal format, symbol and asset class performs.
+
+Deals are pulled from the terminal with history_deals_get in chunked date ranges. Positions opened
+by the bot (magic 123456, comment MB_Strategy) are rebuilt from their deals, TP1 partial closes are
+recognised by the monitor's magic 234000 / "Partial close at TP1", and each position is joined to
+the signal it came from through the order journal (format, signal entry and stop loss). Everything
+after loading is grouped pandas/NumPy arithmetic, and the result is one self-contained HTML file.
+
+Run from the repository root:
+    python report.py --days 90 --journal journal.db --out report.html
+"""
+import argparse
+import html
+import importlib
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from config import ASSET_CLASSES, JOURNAL_PATH
+from journal import ORDER, Journal
+
+ORDER_MAGIC = 123456  # set on every order the bot opens
+ORDER_COMMENT = "MB_Strategy"
+TP1_MAGIC = 234000  # set by PositionMonitor on the TP1 partial close
+TP1_COMMENT = "Partial close at TP1"
+
+DEAL_TYPE_BUY = 0
+DEAL_ENTRY_IN = 0
+DEAL_ENTRY_OUT = 1
+DEAL_ENTRY_OUT_BY = 3
+
+DEAL_COLUMNS = ["ticket", "time", "type", "entry", "magic", "position_id", "volume", "price", "commission", "swap",
+                "profit", "fee", "symbol", "comment"]
+
+
+def fetch_deals(mt5, date_from, date_to, chunk_days=30):
+    """Return every deal between two datetimes as a DataFrame, requesting chunk_days at a time."""
+    frames = []
+    start = date_from
+    while start < date_to:
+        end = min(start + timedelta(days=chunk_days), date_to)
+        deals = mt5.history_deals_get(start, end)
+        if deals is None:
+            print("history_deals_get() failed, error code =", mt5.last_error())
+        elif deals:
+            frame = pd.DataFrame.from_records(deals, columns=deals[0]._fields)
+            frames.append(frame[DEAL_COLUMNS])
+        start = end
+    if not frames:
+        return pd.DataFrame(columns=DEAL_COLUMNS)
+    # Chunk boundaries are inclusive on both sides, so a deal on a boundary comes back twice
+    return pd.concat(frames, ignore_index=True).drop_duplicates("ticket")
+
+
+def load_signal_orders(path):
+    """Return the journaled orders as a DataFrame indexed by ticket: format, signal entry and stop loss."""
+    rows = [
+        (ticket, payload.get("format") or "unknown", payload.get("entry_price"), payload.get("stop_loss"))
+        for _, ticket, payload in Journal(path).events(ORDER)
+        if ticket
+    ]
+    frame = pd.DataFrame(rows, columns=["position_id", "format", "entry_price", "stop_loss"])
+    return frame.drop_duplicates("position_id", keep="last").set_index("position_id")
+
+
+def build_positions(deals, signals, tick_values, asset_classes=None):
+    """
+    One row per bot position: fill, exits, net cash, TP1 hit, slippage against the signal entry and R-multiple.
+
+    tick_values maps symbol -> (trade_tick_value, trade_tick_size), which turns the signal's stop distance
+    into account currency so that R = net cash / money at risk.
+    """
+    deals = deals.copy()
+    opening = (deals["entry"] == DEAL_ENTRY_IN) & ((deals["magic"] == ORDER_MAGIC)
+                                                   | deals["comment"].str.startswith(ORDER_COMMENT))
+    deals = deals[deals["position_id"].isin(deals.loc[opening, "position_id"])]
+    deals["cash"] = deals["profit"] + deals["commission"] + deals["swap"] + deals["fee"]
+    deals["value"] = deals["price"] * deals["volume"]
+    entries = deals[deals["entry"] == DEAL_ENTRY_IN]
+    exits = deals[deals["entry"].isin((DEAL_ENTRY_OUT, DEAL_ENTRY_OUT_BY))]
+
+    positions = entries.groupby("position_id").agg(
+        symbol=("symbol", "first"), type=("type", "first"), open_time=("time", "min"),
+        volume=("volume", "sum"), value=("value", "sum"),
+    )
+    positions["fill"] = positions["value"] / positions["volume"]
+    closes = exits.groupby("position_id").agg(
+        closed_volume=("volume", "sum"), close_time=("time", "max"), exit_value=("value", "sum"))
+    positions = positions.join(closes).join(deals.groupby("position_id")["cash"].sum())
+    positions["closed_volume"] = positions["closed_volume"].fillna(0.0)
+    tp1 = exits["position_id"][(exits["magic"] == TP1_MAGIC) | (exits["comment"] == TP1_COMMENT)]
+    positions["tp1_hit"] = positions.index.isin(tp1)
+    positions["closed"] = positions["closed_volume"] >= positions["volume"] - 1e-9
+
+    positions = positions.join(signals, how="left")
+    positions["format"] = positions["format"].fillna("unknown")
+    positions["entry_price"] = positions["entry_price"].fillna(positions["fill"])
+    direction = np.where(positions["type"] == DEAL_TYPE_BUY, 1.0, -1.0)
+    risk_price = (positions["entry_price"] - positions["stop_loss"]).abs()
+    risk_price = risk_price.where(risk_price > 0)
+    positions["slippage"] = direction * (positions["fill"] - positions["entry_price"])  # positive is adverse
+    positions["slippage_r"] = positions["slippage"] / risk_price
+    tick_value = positions["symbol"].map(lambda symbol: tick_values.get(symbol, (np.nan, np.nan))[0])
+    tick_size = positions["symbol"].map(lambda symbol: tick_values.get(symbol, (np.nan, np.nan))[1])
+    positions["risk_money"] = risk_price / tick_size * tick_value * positions["volume"]
+    positions["r_multiple"] = positions["cash"] / positions["risk_money"]
+    positions["win"] = positions["cash"] > 0
+    classes = {symbol: asset_class for asset_class, members in (asset_classes or {}).items() for symbol in members}
+    positions["asset_class"] = positions["symbol"].map(classes).fillna("other")
+    return positions.drop(columns=["value", "exit_value"])
+
+
+def summarize(positions, by):
+    """Per-group trade count, win rate, R-multiples, TP1-hit rate, slippage and net result of closed positions."""
+    closed = positions[positions["closed"]]
+    summary = closed.groupby(by).agg(
+        trades=("cash", "size"),
+        win_rate=("win", "mean"),
+        avg_r=("r_multiple", "mean"),
+        total_r=("r_multiple", "sum"),
+        tp1_rate=("tp1_hit", "mean"),
+        avg_slippage=("slippage", "mean"),
+        avg_slippage_r=("slippage_r", "mean"),
+        net=("cash", "sum"),
+    )
+    return summary.sort_values("trades", ascending=False)
+
+
+def render(positions, path, title="Trade analytics", inline_js=False):
+    """Write the summary tables and charts to one HTML file."""
+    closed = positions[positions["closed"]].sort_values("close_time")
+    sections = []
+    for heading, by in (("By format", ["format"]), ("By format and symbol", ["format", "symbol"]),
+                        ("By asset class", ["asset_class"])):
+        table = summarize(positions, by).to_html(float_format=lambda value: f"{value:,.3f}", border=0)
+        sections.append(f"<h2>{heading}</h2>{table}")
+
+    by_format = summarize(positions, ["format"]).reset_index()
+    closed = closed.assign(
+        close_date=pd.to_datetime(closed["close_time"], unit="s"),
+        cumulative_r=closed.groupby("format")["r_multiple"].cumsum(),
+    )
+    figures = [
+        px.bar(by_format, x="format", y=["win_rate", "tp1_rate"], barmode="group",
+               title="Win rate and TP1-hit rate by format"),
+        px.bar(summarize(positions, ["format", "symbol"]).reset_index(), x="symbol", y="avg_r", color="format",
+               barmode="group", title="Average R-multiple by symbol and format"),
+        px.line(closed, x="close_date", y="cumulative_r", color="format", render_mode="webgl",
+                title="Cumulative R by format"),
+        px.histogram(closed, x="r_multiple", color="format", nbins=80, title="R-multiple distribution"),
+        px.box(closed, x="symbol", y="slippage_r", title="Entry slippage against the signal, in R"),
+    ]
+    charts = [
+        figure.to_html(full_html=False, include_plotlyjs=(True if inline_js else "cdn") if i == 0 else False)
+        for i, figure in enumerate(figures)
+    ]
+    open_positions = int((~positions["closed"]).sum())
+    with open(path, "w", encoding="utf-8") as report:
+        report.write(
+            f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title></head><body>"
+            f"<h1>{html.escape(title)}</h1><p>{len(closed)} closed positions, {open_positions} still open.</p>"
+            + "".join(sections) + "".join(charts) + "</body></html>"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=float, default=90, help="history to include, counted back from now")
+    parser.add_argument("--journal", default=JOURNAL_PATH, help="order journal that links positions to signals")
+    parser.add_argument("--out", default="report.html")
+    parser.add_argument("--chunk-days", type=float, default=30, help="date range per history_deals_get call")
+    parser.add_argument("--inline-js", action="store_true", help="embed plotly.js so the report works offline")
+    parser.add_argument("--mt5-module", default="MetaTrader5",
+                        help="module providing the terminal connection, e.g. mt5_sim for offline runs")
+    args = parser.parse_args()
+
+    mt5 = importlib.import_module(args.mt5_module)
+    if not mt5.initialize():
+        raise SystemExit(f"initialize() failed, error code = {mt5.last_error()}")
+    try:
+        started = time.perf_counter()
+        date_to = datetime.now() + timedelta(days=1)
+        deals = fetch_deals(mt5, date_to - timedelta(days=args.days + 1), date_to, args.chunk_days)
+        fetched = time.perf_counter()
+        tick_values = {}
+        for symbol in deals["symbol"].unique():
+            info = mt5.symbol_info(symbol)
+            if info is not None:
+                tick_values[symbol] = (info.trade_tick_value, info.trade_tick_size)
+    finally:
+        mt5.shutdown()
+
+    positions = build_positions(deals, load_signal_orders(args.journal), tick_values, ASSET_CLASSES)
+    render(positions, args.out, inline_js=args.inline_js)
+    print(f"{len(deals)} deals, {len(positions)} positions: fetched in {fetched - started:.2f}s, "
+          f"report written to {args.out} in {time.perf_counter() - fetched:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
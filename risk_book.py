@@ -0,0 +1,251 @@
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+log = logging.getLogger(__name__)
+
+POSITION_TYPE_BUY = 0
+
+
+@dataclass(slots=True)
+class Exposure:
+    """What one open position, or one order on its way to the broker, adds to the book."""
+    symbol: str
+    asset_class: str
+    base: str
+    quote: str
+    direction: int  # 1 for buy, -1 for sell
+    volume: float
+    price: float
+    stop_loss: float
+    notional: float  # in account currency
+    risk: float  # money lost if the stop is hit; the notional when there is no stop
+    margin: float
+    added_at: float = 0.0
+
+    def currencies(self):
+        """Signed exposure per currency: buying EURUSD is long EUR and short USD."""
+        signed = self.direction * self.notional
+        if self.base and self.base != self.quote:
+            return (self.base, signed), (self.quote, -signed)
+        return ((self.quote, signed),)
+
+
+class RiskBook:
+    """
+    In-memory account exposure for pre-trade limit checks without terminal round trips.
+
+    The book starts from one account_info()/positions_get() snapshot, is updated from the bot's own
+    fills and is rebuilt from a fresh snapshot every resync_interval seconds, which also picks up
+    partial closes, stop moves and positions closed or opened elsewhere. Between resyncs the book
+    errs on the safe side: a position that was reduced or closed still counts in full.
+
+    reserve() checks an order against the limits and, if it passes, holds its exposure until
+    release(), so concurrent signals cannot pass the same headroom twice; add() books the fill.
+    Values use the symbol's tick value, so they are in account currency; margin is estimated as
+    notional / leverage. A limit of 0 disables that check; class_limits maps asset class -> maximum
+    gross notional. Until the first successful resync equity and margin are unknown, so the margin
+    checks are skipped rather than failing every order.
+    """
+
+    def __init__(self, mt5, symbols, asset_classes=None, max_positions=0, max_open_risk=0.0,
+                 max_currency_exposure=0.0, class_limits=None, min_margin_level=0.0, resync_interval=5.0):
+        self.mt5 = mt5
+        self.symbols = symbols
+        self.asset_classes = asset_classes or {}  # broker symbol -> asset class
+        self.max_positions = max_positions
+        self.max_open_risk = max_open_risk
+        self.max_currency_exposure = max_currency_exposure  # net, per currency
+        self.class_limits = class_limits or {}
+        self.min_margin_level = min_margin_level  # equity / margin after the trade, in percent
+        self.resync_interval = resync_interval
+        self._entries = {}  # ticket, or negative reservation number while the order is in flight -> Exposure
+        self._reservations = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self.leverage = 1
+        self.equity = 0.0
+        self.margin = 0.0  # the terminal's margin at the last resync plus estimates for later fills
+        self.open_risk = 0.0
+        self.by_currency = {}
+        self.by_class = {}
+        self.checks = 0
+        self.rejected = {}  # limit -> count
+        self.resyncs = 0
+        self.last_check_seconds = 0.0
+        self.total_check_seconds = 0.0
+        self.last_resync_seconds = 0.0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="risk-book", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopping.wait(self.resync_interval):
+            try:
+                self.resync()
+            except Exception as e:
+                log.exception("Risk book resync failed: %s", e)
+
+    def exposure(self, symbol, side, volume, price, stop_loss=None):
+        """Exposure of a position from its symbol metadata, or None if the symbol is unknown."""
+        meta = self.symbols.get(symbol)
+        if meta is None:
+            return None
+        if meta.trade_tick_size > 0 and meta.trade_tick_value > 0:
+            value_per_price = meta.trade_tick_value / meta.trade_tick_size
+        else:
+            value_per_price = meta.trade_contract_size
+        direction = 1 if side == POSITION_TYPE_BUY or str(side).lower() == "buy" else -1
+        notional = price * value_per_price * volume
+        if stop_loss:
+            risk = max(0.0, direction * (price - stop_loss) * value_per_price * volume)
+        else:
+            risk = notional
+        return Exposure(symbol, self.asset_classes.get(symbol, "other"), meta.currency_base, meta.currency_profit,
+                        direction, volume, price, stop_loss, notional, risk, notional / self.leverage)
+
+    def _apply(self, entry, sign):
+        self.open_risk += sign * entry.risk
+        self.margin += sign * entry.margin
+        self.by_class[entry.asset_class] = self.by_class.get(entry.asset_class, 0.0) + sign * entry.notional
+        for currency, amount in entry.currencies():
+            self.by_currency[currency] = self.by_currency.get(currency, 0.0) + sign * amount
+
+    def _breach(self, entry):
+        """The first limit the book would break with entry added, as (limit, message), or None."""
+        if self.max_positions and len(self._entries) >= self.max_positions:
+            return "max_positions", f"{len(self._entries)} positions open, the limit is {self.max_positions}"
+        if self.max_open_risk and round(self.open_risk + entry.risk, 2) > self.max_open_risk:
+            return "open_risk", (f"Open risk would be {self.open_risk + entry.risk:.2f}, "
+                                 f"the limit is {self.max_open_risk:.2f}")
+        limit = self.class_limits.get(entry.asset_class)
+        gross = self.by_class.get(entry.asset_class, 0.0) + entry.notional
+        if limit and gross > limit:
+            return "class_exposure", f"{entry.asset_class} exposure would be {gross:.2f}, the limit is {limit:.2f}"
+        if self.max_currency_exposure:
+            for currency, amount in entry.currencies():
+                net = self.by_currency.get(currency, 0.0) + amount
+                # An order that reduces a currency's exposure is always allowed
+                if abs(net) > self.max_currency_exposure and abs(net) > abs(net - amount):
+                    return "currency_exposure", (f"{currency} exposure would be {net:.2f}, "
+                                                 f"the limit is {self.max_currency_exposure:.2f}")
+        if not self.resyncs:
+            return None
+        free = self.equity - self.margin
+        if entry.margin > free:
+            return "margin", f"Margin of {entry.margin:.2f} exceeds free margin of {free:.2f}"
+        margin_level = self.equity / (self.margin + entry.margin) * 100 if entry.margin else float("inf")
+        if self.min_margin_level and margin_level < self.min_margin_level:
+            return "margin_level", (f"Margin level would be {margin_level:.0f}%, "
+                                    f"the minimum is {self.min_margin_level:.0f}%")
+        return None
+
+    def reserve(self, symbol, side, volume, price, stop_loss=None):
+        """
+        Check an order against the limits and hold its exposure until release().
+
+        Returns (reservation, None) when it fits, otherwise (None, reason).
+        """
+        started = time.perf_counter()
+        entry = self.exposure(symbol, side, volume, price, stop_loss)
+        if entry is None:
+            return None, f"Symbol {symbol} is not found"
+        if not self.resyncs:
+            log.warning("Risk book has not synced with the account yet, skipping the margin checks for %s", symbol,
+                        extra={"symbol": symbol})
+        reservation = None
+        with self._lock:
+            breach = self._breach(entry)
+            if breach is None:
+                reservation = -next(self._reservations)  # tickets are positive
+                entry.added_at = time.monotonic()
+                self._entries[reservation] = entry
+                self._apply(entry, 1)
+            else:
+                self.rejected[breach[0]] = self.rejected.get(breach[0], 0) + 1
+        elapsed = time.perf_counter() - started
+        self.checks += 1
+        self.last_check_seconds = elapsed
+        self.total_check_seconds += elapsed
+        return reservation, breach[1] if breach else None
+
+    def add(self, ticket, symbol, side, volume, price, stop_loss=None):
+        """Book a position the bot has just opened, without checking the limits."""
+        entry = self.exposure(symbol, side, volume, price, stop_loss)
+        if entry is None:
+            return
+        entry.added_at = time.monotonic()
+        with self._lock:
+            previous = self._entries.pop(ticket, None)
+            if previous is not None:
+                self._apply(previous, -1)
+            self._entries[ticket] = entry
+            self._apply(entry, 1)
+
+    def release(self, reservation):
+        """Drop a reservation once its order has been booked with add() or was not filled."""
+        with self._lock:
+            entry = self._entries.pop(reservation, None)
+            if entry is not None:
+                self._apply(entry, -1)
+
+    def resync(self):
+        """Rebuild the book from account_info() and positions_get(), keeping what was added meanwhile."""
+        started = time.monotonic()
+        account = self.mt5.account_info()
+        positions = self.mt5.positions_get()
+        if account is None or positions is None:
+            log.error("Risk book snapshot failed, error code = %s", self.mt5.last_error())
+            return False
+        self.leverage = account.leverage or 1
+        snapshot = {}
+        for position in positions:
+            entry = self.exposure(position.symbol, position.type, position.volume, position.price_open, position.sl)
+            if entry is not None:
+                snapshot[position.ticket] = entry
+        with self._lock:
+            # Orders still in flight, and fills the snapshot was taken too early to include
+            pending = {key: entry for key, entry in self._entries.items()
+                       if key not in snapshot and (key < 0 or entry.added_at >= started)}
+            for entry in pending.values():
+                entry.margin = entry.notional / self.leverage  # with the leverage of this snapshot
+            self._entries = {**snapshot, **pending}
+            self.open_risk = 0.0
+            self.margin = 0.0
+            self.by_currency = {}
+            self.by_class = {}
+            for entry in self._entries.values():
+                self._apply(entry, 1)
+            # The terminal's margin is exact for the positions it reported
+            self.margin = account.margin + sum(entry.margin for entry in pending.values())
+            self.equity = account.equity
+        self.resyncs += 1
+        self.last_resync_seconds = time.monotonic() - started
+        return True
+
+    def stats(self):
+        return {
+            "positions": len(self._entries),
+            "open_risk": self.open_risk,
+            "margin": self.margin,
+            "equity": self.equity,
+            "by_currency": dict(self.by_currency),
+            "by_class": dict(self.by_class),
+            "checks": self.checks,
+            "rejected": dict(self.rejected),
+            "last_check_seconds": self.last_check_seconds,
+            "avg_check_seconds": self.total_check_seconds / self.checks if self.checks else 0.0,
+            "resyncs": self.resyncs,
+            "last_resync_seconds": self.last_resync_seconds,
+        }
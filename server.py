@@ -0,0 +1,87 @@
+import logging
+import signal
+import threading
+import time
+
+from flask import g
+from waitress.server import create_server
+
+log = logging.getLogger(__name__)
+
+
+class WebServer:
+    """
+    Serves a TradingBot's Flask app with waitress and shuts it down gracefully.
+
+    waitress runs requests on a pool of threads in this one process, so every request still shares
+    the bot's single MT5 connection, whose calls are serialized by the MT5 executor. On SIGINT or
+    SIGTERM new requests are answered with 503, requests already in progress are allowed to finish,
+    and then the bot drains its order queue and stops its background workers.
+    """
+
+    def __init__(self, bot, host="0.0.0.0", port=80, threads=8, connection_limit=100,
+                 keepalive_timeout=120, max_body_size=65536, drain_timeout=30):
+        self.bot = bot
+        self.drain_timeout = drain_timeout
+        self.draining = False
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        bot.app.config["MAX_CONTENT_LENGTH"] = max_body_size
+        bot.app.before_request(self._enter)
+        bot.app.teardown_request(self._leave)
+        self.server = create_server(
+            bot.app,
+            host=host,
+            port=port,
+            threads=threads,
+            connection_limit=connection_limit,
+            channel_timeout=keepalive_timeout,
+            max_request_body_size=max_body_size,
+            ident="mt5-connector",
+        )
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def _enter(self):
+        if self.draining:
+            return {"status": "error", "message": "Server is shutting down"}, 503, {"Connection": "close"}
+        with self._lock:
+            self._in_flight += 1
+        g.counted_in_flight = True
+
+    def _leave(self, exc=None):
+        if g.pop("counted_in_flight", False):
+            with self._lock:
+                self._in_flight -= 1
+
+    def serve_forever(self):
+        """Serve until SIGINT or SIGTERM, then drain and shut the bot down."""
+        signal.signal(signal.SIGINT, self._on_signal)
+        signal.signal(signal.SIGTERM, self._on_signal)
+        thread = threading.Thread(target=self.server.run, name="waitress", daemon=True)
+        thread.start()
+        log.info("Serving on http://%s:%s", self.server.effective_host, self.server.effective_port)
+        while not self._stop.wait(0.5):
+            pass
+        self.shutdown()
+
+    def _on_signal(self, signum, frame):
+        self._stop.set()
+
+    def shutdown(self):
+        """Refuse new requests, wait for in-flight ones, then stop the bot's workers."""
+        log.info("Shutting down: refusing new requests and draining in-flight orders.")
+        self.draining = True
+        deadline = time.monotonic() + self.drain_timeout
+        while self._in_flight and time.monotonic() < deadline:
+            time.sleep(0.05)
+        if self._in_flight:
+            log.warning("%d requests still in progress after %ss.", self._in_flight, self.drain_timeout)
+        # Give the server thread a moment to flush the last responses
+        time.sleep(0.2)
+        self.bot.shutdown(max(0.0, deadline - time.monotonic()))
+        self.server.close()
+        log.info("Shutdown complete.")
@@ -0,0 +1,216 @@
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class Signal:
+    """A normalized trading signal extracted from an alert message."""
+    action: str
+    symbol: str
+    entry_price: float
+    stop_loss: float
+    tp_levels: list = field(default_factory=list)
+    format: str = ""
+
+
+def _first_float(pattern, message):
+    match = pattern.search(message)
+    return float(match.group(1)) if match else None
+
+
+class MessageFormat:
+    """Base class for an alert format. Subclasses precompile their patterns at class level."""
+    name = None
+    marker = None  # regex that identifies the format, used in the combined detection scan
+    excludes = ()  # names of markers that must not be present for this format to apply
+
+    def parse(self, message):
+        """Return (action, symbol, entry_price, tp_levels, stop_loss) or None."""
+        raise NotImplementedError
+
+
+class SignalParser:
+    """Registry of message formats, detected with a single scan over the message."""
+
+    def __init__(self, formats=()):
+        self.formats = []
+        self._detector = None
+        self.parsed = {}  # format name -> messages parsed
+        self.failures = {}  # format name (or "unknown") -> messages rejected
+        for fmt in formats:
+            self.register(fmt)
+
+    def register(self, fmt):
+        """Register a format. Formats registered first take priority when several markers match."""
+        self.formats.append(fmt)
+        self._detector = re.compile(
+            "|".join(f"(?P<{f.name}>{f.marker})" for f in self.formats),
+            re.IGNORECASE,
+        )
+        return fmt
+
+    def detect(self, message):
+        """Return the format that applies to the message, or None."""
+        found = {match.lastgroup for match in self._detector.finditer(message)}
+        for fmt in self.formats:
+            if fmt.name in found and not found.intersection(fmt.excludes):
+                return fmt
+        return None
+
+    def parse(self, message):
+        """Parse a message into a Signal, or return None if it is unknown or incomplete."""
+        fmt = self.detect(message)
+        if fmt is None:
+            log.warning("Unknown message format", extra={"raw_message": message})
+            self._count(self.failures, "unknown")
+            return None
+        try:
+            fields = fmt.parse(message)
+        except Exception as e:
+            log.warning("Failed to parse message: %s", e, extra={"raw_message": message})
+            fields = None
+        else:
+            if fields is None:
+                log.warning("Unknown %s message format", fmt.name, extra={"raw_message": message})
+
+        if fields is not None:
+            action, symbol, entry_price, tp_levels, stop_loss = fields
+            if action and symbol and entry_price is not None and stop_loss is not None:
+                self._count(self.parsed, fmt.name)
+                return Signal(action, symbol, entry_price, stop_loss, tp_levels, fmt.name)
+        self._count(self.failures, fmt.name)
+        return None
+
+    @staticmethod
+    def _count(counts, name):
+        counts[name] = counts.get(name, 0) + 1
+
+
+class TpLevelsFormat(MessageFormat):
+    name = "tp_levels"
+    marker = r"TP-levels"
+    action_re = re.compile(r"(Buy|Sell)", re.IGNORECASE)
+    symbol_re = re.compile(r",\s*([A-Z]+[A-Z0-9]*)")
+    entry_re = re.compile(r"price\s*=\s*([\d.]+)")
+    tp_re = re.compile(r"TP-levels\s*:\s*([\d.]+)")
+    sl_re = re.compile(r"SL\s*:\s*([\d.]+)")
+
+    def parse(self, message):
+        action_match = self.action_re.search(message)
+        symbol_match = self.symbol_re.search(message)
+        return (
+            action_match.group(0).capitalize() if action_match else None,
+            symbol_match.group(1) if symbol_match else None,
+            _first_float(self.entry_re, message),
+            [float(tp) for tp in self.tp_re.findall(message)],
+            _first_float(self.sl_re, message),
+        )
+
+
+class SmartSignalFormat(MessageFormat):
+    name = "smart_signal"
+    marker = r"Smart Signal Alert!"
+    action_re = re.compile(r"(Buy|Sell)", re.IGNORECASE)
+    symbol_re = re.compile(r"(BTCUSDT|[A-Z]{6})")
+    entry_re = re.compile(r"Entry:\s*([\d.]+)")
+    tp_re = re.compile(r"TP\d:\s*([\d.]+)")
+    sl_re = re.compile(r"SL\s*:\s*([\d.]+)")
+
+    def parse(self, message):
+        action_match = self.action_re.search(message)
+        symbol_match = self.symbol_re.search(message)
+        return (
+            action_match.group(1).capitalize() if action_match else None,
+            symbol_match.group(1) if symbol_match else None,
+            _first_float(self.entry_re, message),
+            [float(tp) for tp in self.tp_re.findall(message)],
+            _first_float(self.sl_re, message),
+        )
+
+
+class LongShortEntryFormat(MessageFormat):
+    name = "long_short_entry"
+    marker = r"Long entry|Short entry"
+    action_re = re.compile(r"(Long|Short) entry", re.IGNORECASE)
+    symbol_re = re.compile(r"Symbol:\s*([A-Z]+)")
+    entry_re = re.compile(r"Entry price:\s*([\d.]+)")
+    tp_re = re.compile(r"TP\d:\s*([\d.]+)")
+    sl_re = re.compile(r"SL:\s*([\d.]+)")
+
+    def parse(self, message):
+        action_match = self.action_re.search(message)
+        symbol_match = self.symbol_re.search(message)
+        return (
+            "Buy" if action_match.group(1).lower() == "long" else "Sell",
+            symbol_match.group(1) if symbol_match else None,
+            _first_float(self.entry_re, message),
+            [float(tp) for tp in self.tp_re.findall(message)],
+            _first_float(self.sl_re, message),
+        )
+
+
+class SymbolJsonFormat(MessageFormat):
+    name = "symbol_json"
+    marker = r"Symbol:"
+    excludes = ("direction",)
+    symbol_re = re.compile(r"Symbol:\s*([A-Z]+)")
+
+    def parse(self, message):
+        symbol_match = self.symbol_re.search(message)
+        json_start = message.find("{")
+        if not symbol_match or json_start == -1:
+            return None
+
+        json_data = json.loads(message[json_start:])
+        return (
+            "Buy" if json_data.get('side', '').upper() == "LONG" else "Sell",
+            symbol_match.group(1),
+            float(json_data.get('entry', None)),
+            [
+                float(json_data.get(f'tp{i}', None)) for i in range(1, 5)
+                if json_data.get(f'tp{i}', None)
+            ],
+            float(json_data.get('stop', None)),
+        )
+
+
+class DirectionFormat(MessageFormat):
+    name = "direction"
+    marker = r"Direction:"
+    symbol_re = re.compile(r"Symbol:\s*([A-Z0-9]+)")
+    action_re = re.compile(r"Direction:\s*(Buy|Sell)", re.IGNORECASE)
+    entry_re = re.compile(r"Entry:\s*([\d.]+)")
+    tp1_re = re.compile(r"TP1:\s*([\d.]+)")
+    tp2_re = re.compile(r"TP2:\s*([\d.]+)")
+    sl_re = re.compile(r"SL:\s*([\d.]+)")
+
+    def parse(self, message):
+        symbol_match = self.symbol_re.search(message)
+        action_match = self.action_re.search(message)
+        if not symbol_match or not action_match:
+            return None
+
+        tp_levels = [tp for tp in (_first_float(self.tp1_re, message), _first_float(self.tp2_re, message))
+                     if tp is not None]
+        return (
+            action_match.group(1).capitalize(),
+            symbol_match.group(1),
+            _first_float(self.entry_re, message),
+            tp_levels,
+            _first_float(self.sl_re, message),
+        )
+
+
+def default_parser():
+    """Build a parser with the built-in formats, in the same priority order as the original if/elif chain."""
+    return SignalParser([
+        TpLevelsFormat(),
+        SmartSignalFormat(),
+        LongShortEntryFormat(),
+        SymbolJsonFormat(),
+        DirectionFormat(),
+    ])
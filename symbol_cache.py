@@ -0,0 +1,125 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, replace
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(slots=True, frozen=True)
+class SymbolMeta:
+    """The subset of mt5.symbol_info() that the order path needs."""
+    name: str
+    digits: int
+    point: float
+    trade_contract_size: float
+    volume_min: float
+    volume_step: float
+    volume_max: float
+    visible: bool
+    filling_mode: int
+    currency_base: str
+    currency_profit: str
+    trade_tick_value: float
+    trade_tick_size: float
+
+    @classmethod
+    def from_info(cls, info):
+        return cls(
+            name=info.name,
+            digits=info.digits,
+            point=info.point,
+            trade_contract_size=info.trade_contract_size,
+            volume_min=info.volume_min,
+            volume_step=info.volume_step,
+            volume_max=info.volume_max,
+            visible=info.visible,
+            filling_mode=info.filling_mode,
+            currency_base=info.currency_base,
+            currency_profit=info.currency_profit,
+            trade_tick_value=info.trade_tick_value,
+            trade_tick_size=info.trade_tick_size,
+        )
+
+
+class SymbolCache:
+    """TTL cache of symbol metadata in front of mt5.symbol_info, warmed from mt5.symbols_get."""
+
+    def __init__(self, mt5, ttl=300):
+        self.mt5 = mt5
+        self.ttl = ttl
+        self._entries = {}  # symbol -> (expires_at, SymbolMeta)
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.hits = 0
+        self.misses = 0
+
+    def warm(self):
+        """Load metadata for every symbol the terminal knows about in a single call."""
+        symbols = self.mt5.symbols_get()
+        if symbols is None:
+            log.error("symbols_get() failed, error code = %s", self.mt5.last_error())
+            return 0
+
+        expires_at = time.monotonic() + self.ttl
+        entries = {info.name: (expires_at, SymbolMeta.from_info(info)) for info in symbols}
+        with self._lock:
+            self._entries.update(entries)
+        log.info("Symbol cache warmed with %d symbols", len(entries))
+        return len(entries)
+
+    def get(self, symbol):
+        """
+        Return cached SymbolMeta for a symbol.
+
+        Expired entries are still served while a background warm() refreshes the whole cache,
+        so only symbols that were never seen cost a round trip on the calling thread.
+        """
+        entry = self._entries.get(symbol)
+        if entry is not None:
+            self.hits += 1
+            if entry[0] <= time.monotonic():
+                self._refresh_in_background()
+            return entry[1]
+
+        self.misses += 1
+        info = self.mt5.symbol_info(symbol)
+        if info is None:
+            return None
+        meta = SymbolMeta.from_info(info)
+        with self._lock:
+            self._entries[symbol] = (time.monotonic() + self.ttl, meta)
+        return meta
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, daemon=True).start()
+
+    def _refresh(self):
+        try:
+            self.warm()
+        finally:
+            self._refreshing = False
+
+    def names(self):
+        """Every symbol currently cached."""
+        return list(self._entries)
+
+    def mark_visible(self, symbol):
+        """Record a successful symbol_select without another round trip."""
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is not None:
+                expires_at, meta = entry
+                self._entries[symbol] = (expires_at, replace(meta, visible=True))
+
+    def invalidate(self, symbol=None):
+        """Drop one symbol, or every symbol when called without arguments."""
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(symbol, None)
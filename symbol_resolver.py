@@ -0,0 +1,100 @@
+import logging
+import re
+from dataclasses import dataclass
+
+log = logging.getLogger(__name__)
+
+_BASE_TICKER = re.compile(r"[A-Za-z0-9]*[A-Z0-9]")
+
+
+@dataclass(slots=True, frozen=True)
+class ResolvedSymbol:
+    """The broker symbol an incoming ticker trades as, with its asset class and fixed lot, if any."""
+    symbol: str
+    asset_class: str = None
+    fixed_lot: float = None
+
+
+class SymbolResolver:
+    """
+    Maps incoming tickers to broker symbols with one dict lookup.
+
+    The index is built once from the symbol cache (itself warmed from mt5.symbols_get()). Each broker
+    symbol is reachable by its own name, by its name without the broker's suffix (US100.cash,
+    EURUSDm, BTCUSD# -> US100, EURUSD, BTCUSD) and, for USD quotes, with USDT in place of USD.
+    Entries from the alias table override the derived ones, and exact broker names override both.
+    """
+
+    def __init__(self, mt5, symbols, aliases=None, asset_classes=None, overrides=None):
+        self.mt5 = mt5
+        self.symbols = symbols
+        self.aliases = aliases or {}  # incoming ticker -> broker symbol
+        self.overrides = overrides or {}  # asset class -> fixed lot size
+        self.classes = {}  # broker symbol -> asset class, for LotSizer
+        for asset_class, members in (asset_classes or {}).items():
+            for symbol in members:
+                self.classes.setdefault(symbol, asset_class)
+        self._index = {}
+        self.fallbacks = 0
+
+    def _resolved(self, symbol):
+        asset_class = self.classes.get(symbol)
+        return ResolvedSymbol(symbol, asset_class, self.overrides.get(asset_class))
+
+    @staticmethod
+    def tickers(name):
+        """Tickers derived from a broker symbol name."""
+        upper = name.upper()
+        match = _BASE_TICKER.match(name)
+        base = match.group(0).upper() if match else upper
+        derived = [upper, base]
+        for ticker in (upper, base):
+            if ticker.endswith("USD"):
+                derived.append(ticker + "T")
+        return derived
+
+    def build(self):
+        """(Re)build the index from every symbol the cache knows. Returns the number of tickers indexed."""
+        names = set(self.symbols.names())
+        index = {}
+        for name in sorted(names):
+            resolved = self._resolved(name)
+            for ticker in self.tickers(name)[1:]:
+                index.setdefault(ticker, resolved)
+        for alias, target in self.aliases.items():
+            if target in names:
+                index[alias.upper()] = self._resolved(target)
+            else:
+                log.warning("Symbol alias %s -> %s ignored, %s is not offered by the broker", alias, target, target)
+        for name in names:
+            index[name.upper()] = self._resolved(name)
+        self._index = index
+        return len(index)
+
+    def resolve(self, ticker):
+        """Return the ResolvedSymbol for an incoming ticker, or None if the broker has no such symbol."""
+        key = ticker.strip().upper()
+        resolved = self._index.get(key)
+        if resolved is None:
+            # Listed after the index was built: ask the terminal once and remember the answer
+            meta = self.symbols.get(ticker.strip())
+            if meta is None:
+                return None
+            self.fallbacks += 1
+            resolved = self._index[key] = self._resolved(meta.name)
+        return resolved
+
+    def preselect(self):
+        """symbol_select every configured symbol that is not in Market Watch yet, so trades skip that round trip."""
+        selected = 0
+        for symbol in sorted(set(self.classes) | set(self.aliases.values())):
+            meta = self.symbols.get(symbol)
+            if meta is None or meta.visible:
+                continue
+            if self.mt5.symbol_select(symbol, True):
+                self.symbols.mark_visible(symbol)
+                selected += 1
+            else:
+                log.warning("Failed to select symbol %s", symbol)
+        log.info("Selected %d symbols ahead of trading", selected)
+        return selected
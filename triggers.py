@@ -0,0 +1,81 @@
+import bisect
+import threading
+from dataclasses import dataclass
+
+BUY = "buy"
+SELL = "sell"
+
+# Trigger kinds
+TP1 = "tp1"  # partial close, SL to entry and TP to TP2
+TRAIL = "trail"  # move the stop loss up behind the price
+BREAKEVEN = "breakeven"  # SL to entry only, for bracket legs whose TP1 leg closes at the broker
+
+
+@dataclass(slots=True, eq=False)
+class Trigger:
+    """A price level that fires an action for one position when the market crosses it."""
+    ticket: int
+    symbol: str
+    side: str
+    kind: str
+    level: float
+    rising: bool  # fires when the price reaches the level from below, otherwise from above
+
+
+class TriggerBook:
+    """
+    Pending triggers for every symbol, kept in sorted lists so each quote finds the crossed ones by bisection.
+
+    Buy triggers are compared with the bid and sell triggers with the ask, which is the price each
+    side closes at. Rising triggers (TP1 and trailing steps of buys) fire once the price is at or above
+    their level and falling triggers (the same for sells) once it is at or below, so a quote costs
+    one bisection per list plus one step per fired trigger: O(log n + k).
+    """
+
+    def __init__(self):
+        self._lists = {}  # (symbol, side, rising) -> ([levels], [triggers]), sorted by level
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(levels) for levels, _ in self._lists.values())
+
+    def add(self, trigger):
+        with self._lock:
+            levels, triggers = self._lists.setdefault((trigger.symbol, trigger.side, trigger.rising), ([], []))
+            index = bisect.bisect_right(levels, trigger.level)
+            levels.insert(index, trigger.level)
+            triggers.insert(index, trigger)
+
+    def remove(self, trigger):
+        """Remove a pending trigger. Returns False if it already fired or was removed."""
+        with self._lock:
+            entry = self._lists.get((trigger.symbol, trigger.side, trigger.rising))
+            if entry is None:
+                return False
+            levels, triggers = entry
+            index = bisect.bisect_left(levels, trigger.level)
+            while index < len(levels) and levels[index] == trigger.level:
+                if triggers[index] is trigger:
+                    del levels[index], triggers[index]
+                    return True
+                index += 1
+            return False
+
+    def crossed(self, symbol, bid, ask):
+        """Remove and return every trigger on the symbol that the quote has reached."""
+        fired = []
+        with self._lock:
+            for side, price in ((BUY, bid), (SELL, ask)):
+                entry = self._lists.get((symbol, side, True))
+                if entry is not None and entry[0] and entry[0][0] <= price:
+                    levels, triggers = entry
+                    end = bisect.bisect_right(levels, price)
+                    fired.extend(triggers[:end])
+                    del levels[:end], triggers[:end]
+                entry = self._lists.get((symbol, side, False))
+                if entry is not None and entry[0] and entry[0][-1] >= price:
+                    levels, triggers = entry
+                    start = bisect.bisect_left(levels, price)
+                    fired.extend(triggers[start:])
+                    del levels[start:], triggers[start:]
+        return fired